@@ -6,6 +6,8 @@ import struct
 import websocket
 from datetime import datetime
 
+from order_status import order_status_registry
+
 logger = logging.getLogger(__name__)
 
 class AngelOneWebSocketManager:
@@ -190,6 +192,9 @@ class AngelOneWebSocketManager:
             data = json.loads(message)
             logger.debug(f"Order update received: {data}")
             
+            # Wake up anyone waiting for this order's fill confirmation
+            order_status_registry.update(data)
+            
             if self.on_order_update:
                 self.on_order_update(data)
         except json.JSONDecodeError:
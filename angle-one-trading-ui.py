@@ -4,11 +4,22 @@ import logging
 import os
 import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session
+from flask import Flask, request, jsonify, render_template, redirect, url_for, flash, session, make_response
 import pyotp
 from SmartApi import SmartConnect
 import pandas as pd
 from options_module import options_processor
+from expiry_calendar import projected_weekly_expiries
+from price_store import price_store
+from price_resolver import price_resolver
+from rate_limiter import AccountRateLimiter, RateLimitedSmartApi
+from single_flight import market_data_flights
+from client_pool import market_data_pool
+from greeks import greeks_engine
+from market_data_executor import market_data_executor
+from order_dispatcher import order_dispatcher
+from order_status import order_status_registry
+from signal_queue import signal_queue
 from trade_monitor_service import trade_monitor_service as TradeMonitorService
 from account_manager import AccountManager
 
@@ -31,6 +42,8 @@ app.secret_key = os.urandom(24)  # For session management
 
 # Dictionary to store active client instances
 active_clients = {}
+client_init_lock = threading.Lock()  # Signal queue workers may find no active clients at the same time
+market_data_pool.bind(active_clients)  # Read-only market data calls are spread across these
 account_manager = AccountManager()
 # Load configuration from config.json
 def load_config():
@@ -62,6 +75,31 @@ def load_config():
 # Global config
 CONFIG = load_config()
 
+# Only keep the configured segments of the instrument master in memory
+options_processor.set_traded_segments(CONFIG.get('instrument_segments'))
+
+# Option chains kept warm in the background
+options_processor.chain_snapshots.configure(
+    watch_list=CONFIG.get('option_chain_watch_list'),
+    expiry_count=CONFIG.get('option_chain_snapshot_expiries'),
+    refresh_interval=CONFIG.get('option_chain_snapshot_interval'),
+    max_age=CONFIG.get('option_chain_snapshot_max_age'),
+    idle_intervals=CONFIG.get('option_chain_snapshot_idle_intervals')
+)
+
+# Risk-free rate for the option chain's implied volatility and Greeks
+greeks_engine.configure(risk_free_rate=CONFIG.get('risk_free_rate'))
+
+# Durable webhook signal queue
+signal_queue.configure(journal_path=CONFIG.get('signal_journal_path'),
+                       replay_max_age=CONFIG.get('signal_replay_max_age'),
+                       dedup_window=CONFIG.get('signal_dedup_window'),
+                       workers=CONFIG.get('signal_workers'))
+
+# Shared price cache settings
+price_store.configure(ttl=CONFIG.get('price_cache_ttl', 5), max_size=CONFIG.get('price_cache_size', 5000),
+                      tick_ttl=CONFIG.get('ws_tick_max_age', 10))
+
 # Load accounts from JSON file
 def load_accounts():
     try:
@@ -112,7 +150,8 @@ class AngleOneClient:
         self.client_id = client_id
         self.password = password
         self.totp_key = totp_key
-        self.smart_api = SmartConnect(api_key=api_key)
+        self.rate_limiter = AccountRateLimiter(client_id)  # Per-endpoint token buckets for this account
+        self.smart_api = RateLimitedSmartApi(SmartConnect(api_key=api_key), self.rate_limiter)
         self.refresh_token = None
         self.jwt_token = None
         self.feed_token = None
@@ -492,7 +531,8 @@ def initialize_clients():
             logger.error(f"Error initializing client {account['client_id']}: {str(e)}")
     
     # Initialize services with active clients
-    options_processor.initialize(active_clients)
+    options_processor.initialize(active_clients, websocket_manager)
+    order_dispatcher.warm(active_clients.keys())
     
     # Initialize WebSocket with the first active client
     if active_clients:
@@ -531,6 +571,9 @@ def initialize_clients():
     TradeMonitorService.initialize(active_clients, options_processor, websocket_manager)
     TradeMonitorService.start_monitoring()
     
+    # Start rebuilding the watched option chains
+    options_processor.chain_snapshots.start()
+    
     logger.info(f"Client initialization complete. {len(active_clients)}/{len(accounts)} clients active")
 
 
@@ -594,18 +637,20 @@ def process_trading_signal(webhook_data):
     for field in required_fields:
         if field not in webhook_data:
             logger.error(f"Missing required field in webhook data: {field}")
-            return False
+            return False, [{"error": f"Missing required field: {field}"}]
     
     # Check if we have active clients
     if not active_clients:
         logger.error("No active clients available to process orders")
         
         # Try to initialize clients if they're not already active
-        initialize_clients()
+        with client_init_lock:
+            if not active_clients:
+                initialize_clients()
         
         if not active_clients:
             logger.error("Failed to initialize any clients")
-            return False
+            return False, [{"error": "No active clients available"}]
     
     # Map TradingView actions to Angle One transaction types
     action_map = {
@@ -671,22 +716,22 @@ def process_trading_signal(webhook_data):
     # For limit orders, ensure price is set
     if webhook_data["order_type"] == "LIMIT" and float(order_params["price"]) <= 0:
         logger.error("Price must be specified for LIMIT orders")
-        return False
+        return False, [{"error": "Price must be specified for LIMIT orders"}]
     
     # For stop loss orders, ensure trigger price is set
     if webhook_data["order_type"] in ["SL", "SL-M", "STOPLOSS_LIMIT", "STOPLOSS_MARKET"] and float(order_params["triggerprice"]) <= 0:
         logger.error("Trigger price must be specified for stop loss orders")
-        return False
+        return False, [{"error": "Trigger price must be specified for stop loss orders"}]
     
     # For bracket orders, validate parameters
     if is_bracket_order:
         if float(order_params["squareoff"]) <= 0:
             logger.error("Target price must be specified for bracket orders")
-            return False
+            return False, [{"error": "Target price must be specified for bracket orders"}]
         
         if float(order_params["stoploss"]) <= 0:
             logger.error("Stop loss price must be specified for bracket orders")
-            return False
+            return False, [{"error": "Stop loss price must be specified for bracket orders"}]
         
         # Bracket orders usually require a LIMIT type
         if order_params["ordertype"] == "MARKET":
@@ -701,40 +746,32 @@ def process_trading_signal(webhook_data):
     
     logger.info(f"Processing {webhook_data['action']} signal for {webhook_data['symbol']} across {len(active_clients)} clients")
     
-    # Process orders for each active client in parallel
-    threads = []
-    results = []
-    
+    # Process orders for each active client in parallel on its order worker
     def place_order_for_client(client_id, client):
         # First ensure the session is still active
         if not client.session_active:
             if not client.login():
                 logger.error(f"Failed to re-authenticate client {client_id} before placing order")
-                results.append({
+                return {
                     "client_id": client_id,
                     "success": False,
                     "order_id": None,
                     "message": "Authentication failed"
-                })
-                return
+                }
         
         # Place the order
         success, order_id = client.place_order(order_params)
-        results.append({
+        return {
             "client_id": client_id,
             "success": success,
             "order_id": order_id if success else None
-        })
-    
-    # Create threads for each client
-    for client_id, client in active_clients.items():
-        thread = threading.Thread(target=place_order_for_client, args=(client_id, client))
-        threads.append(thread)
-        thread.start()
+        }
     
-    # Wait for all threads to complete
-    for thread in threads:
-        thread.join()
+    results = []
+    for client_id, result in order_dispatcher.fan_out(dict(active_clients), place_order_for_client).items():
+        if isinstance(result, Exception):
+            result = {"client_id": client_id, "success": False, "order_id": None, "message": str(result)}
+        results.append(result)
     
     # Log the results
     successful_orders = sum(1 for r in results if r["success"])
@@ -747,7 +784,7 @@ def process_trading_signal(webhook_data):
         else:
             logger.error(f"Order placement failed for client {result['client_id']}")
     
-    return successful_orders > 0
+    return successful_orders > 0, results
 
 # Authentication decorator
 def login_required(f):
@@ -1144,13 +1181,15 @@ def tradingview_webhook():
     # Log the received webhook
     logger.info(f"Received webhook: {json.dumps(webhook_data)}")
     
-    # Process the trading signal
-    success = process_trading_signal(webhook_data)
+    # Reject signals that cannot be processed before queueing them
+    missing_fields = [field for field in ["action", "symbol", "exchange", "product_type", "order_type", "quantity"]
+                      if field not in webhook_data]
+    if missing_fields:
+        logger.error(f"Missing required fields in webhook data: {', '.join(missing_fields)}")
+        return jsonify({"status": "error", "message": f"Missing required fields: {', '.join(missing_fields)}"}), 400
     
-    if success:
-        return jsonify({"status": "success", "message": "Orders processed successfully"}), 200
-    else:
-        return jsonify({"status": "error", "message": "Failed to process orders"}), 500
+    # Queue the trading signal, orders are placed by the signal queue worker
+    return queue_signal("equity", webhook_data)
     
     
 @app.route('/test')
@@ -1188,6 +1227,47 @@ def options_webhook():
     # Log the received webhook
     logger.info(f"Received options webhook: {json.dumps(webhook_data)}")
     
+    if not webhook_data.get("symbol"):
+        logger.error("No symbol provided in webhook data")
+        return jsonify({"status": "error", "message": "No symbol provided"}), 400
+    
+    # Queue the options signal, orders are placed by the signal queue worker
+    return queue_signal("options", webhook_data)
+
+
+def queue_signal(kind, webhook_data):
+    """Persist a validated webhook signal and answer 202 with its ID, or 200 for a repeated delivery"""
+    try:
+        signal_id, duplicate = signal_queue.submit(kind, webhook_data)
+    except Exception as e:
+        logger.error(f"Error queueing {kind} signal: {str(e)}")
+        return jsonify({"status": "error", "message": f"Failed to queue signal: {str(e)}"}), 500
+    
+    # Acknowledge retries of a signal that was already received without placing its orders again
+    if duplicate:
+        return jsonify({
+            "status": "duplicate",
+            "message": "Signal already received",
+            "signal_id": signal_id,
+            "status_url": url_for('api_signal_status', signal_id=signal_id)
+        }), 200
+    
+    logger.info(f"Queued {kind} signal {signal_id}")
+    return jsonify({
+        "status": "accepted",
+        "message": "Signal queued for processing",
+        "signal_id": signal_id,
+        "status_url": url_for('api_signal_status', signal_id=signal_id)
+    }), 202
+
+
+def process_options_signal(webhook_data):
+    """Place the orders of a queued options signal, returns (success, per-account results)"""
+    # Alerts without an expiry trade the nearest one, unless the configured preference is turned on for alerts
+    if (not webhook_data.get("expiry_preference") and CONFIG.get("apply_default_expiry_to_alerts")
+            and CONFIG.get("default_expiry_preference")):
+        webhook_data["expiry_preference"] = CONFIG["default_expiry_preference"]
+    
     # Filter active clients - only use clients that correspond to active accounts
     active_account_clients = {}
     active_account_ids = [acc['client_id'] for acc in account_manager.get_active_accounts()]
@@ -1199,12 +1279,12 @@ def options_webhook():
     logger.info(f"Processing options webhook with {len(active_account_clients)} active clients")
     
     # Process the options trading signal with filtered clients
-    success, results = options_processor.process_option_signal(webhook_data, active_account_clients)
-    
-    if success:
-        return jsonify({"status": "success", "message": "Options orders processed successfully", "results": results}), 200
-    else:
-        return jsonify({"status": "error", "message": "Failed to process options orders", "results": results}), 500
+    return options_processor.process_option_signal(webhook_data, active_account_clients)
+
+
+# Orders of queued webhook signals are placed by these
+signal_queue.register("equity", process_trading_signal)
+signal_queue.register("options", process_options_signal)
 
 
 
@@ -1293,15 +1373,17 @@ def api_search_symbols():
     if not query or len(query) < 2:
         return jsonify({"status": "error", "message": "Please provide a search query of at least 2 characters"}), 400
     
-    # Get the first active client for API calls
-    if not active_clients:
-        return jsonify({"status": "error", "message": "No active clients available"}), 500
-    
-    client = next(iter(active_clients.values()))
-    
     try:
-        # Search for symbols in the specified exchange
-        search_results = client.search_symbols(exchange, query)
+        # Search the local instrument master first, it costs no broker API quota
+        search_results = options_processor.search_symbols(query, exchange)
+        
+        if search_results is None:
+            # Not covered by the local instrument master, fall back to the broker search
+            client = market_data_pool.get_client("searchScrip")
+            if not client:
+                return jsonify({"status": "error", "message": "No active clients available"}), 500
+            
+            search_results = client.search_symbols(exchange, query)
         
         # Also search common indices if query matches
         if query.lower() in ['nifty', 'bank', 'fin', 'sensex']:
@@ -1345,12 +1427,12 @@ def api_get_expiry_dates():
         exchange = "BFO"
         logger.info(f"Exchange adjusted to BFO for index: {symbol}")
     
-    # Get the first active client for API calls
-    if not active_clients:
+    # Spread market data calls across all logged-in accounts
+    client = market_data_pool.get_client()
+    if not client:
         logger.error("No active clients available for expiry dates API")
         return jsonify({"status": "error", "message": "No active clients available"}), 500
     
-    client = next(iter(active_clients.values()))
     logger.info(f"Using client {client.client_id} for expiry dates API")
     
     try:
@@ -1369,26 +1451,9 @@ def api_get_expiry_dates():
         if not expiry_dates:
             logger.warning(f"No expiry dates returned for {symbol}")
             
-            # Provide hardcoded defaults for common indices if API fails
+            # Provide projected defaults for common indices if the master is unavailable
             if symbol.upper() in ["NIFTY", "BANKNIFTY", "FINNIFTY"]:
-                # Get current date and generate likely expiry dates
-                from datetime import datetime, timedelta
-                
-                current_date = datetime.now()
-                # Create weekly Thursday expiry for next 4 weeks
-                default_expiries = []
-                
-                # Find next Thursday
-                days_until_thursday = (3 - current_date.weekday()) % 7
-                if days_until_thursday == 0 and current_date.hour >= 15:  # After market close
-                    days_until_thursday = 7
-                
-                next_thursday = current_date + timedelta(days=days_until_thursday)
-                
-                for i in range(4):  # Next 4 weekly expiries
-                    expiry_date = next_thursday + timedelta(days=i*7)
-                    expiry_str = expiry_date.strftime("%d%b%Y").upper()
-                    default_expiries.append(expiry_str)
+                default_expiries = projected_weekly_expiries(4)
                 
                 logger.info(f"Using default expiry dates for {symbol}: {default_expiries}")
                 return jsonify({"status": "success", "data": default_expiries})
@@ -1423,11 +1488,11 @@ def api_get_current_price():
     if not symbol:
         return jsonify({"status": "error", "message": "Please provide a symbol"}), 400
     
-    # Get the first active client for API calls
-    if not active_clients:
+    # Spread market data calls across all logged-in accounts
+    client = market_data_pool.get_client()
+    if not client:
         return jsonify({"status": "error", "message": "No active clients available"}), 500
     
-    client = next(iter(active_clients.values()))
     
     try:
         # For indices
@@ -1442,11 +1507,9 @@ def api_get_current_price():
             if not token:
                 return jsonify({"status": "error", "message": "Could not find token for symbol"}), 404
             
-            # Get price using ltpData
-            response = client.smart_api.ltpData(exchange, symbol, token)
-            if response.get('status'):
-                price = float(response['data']['ltp'])
-            else:
+            # Live tick, recent price or one ltpData call shared with concurrent requests
+            price = price_resolver.resolve_ltp(client, exchange, symbol, token)
+            if price is None:
                 return jsonify({"status": "error", "message": "Failed to get current price"}), 500
         
         return jsonify({
@@ -1527,12 +1590,20 @@ def api_get_option_chain():
         logger.error(f"Missing required parameters - symbol: {symbol}, expiry: {expiry}")
         return jsonify({"status": "error", "message": "Please provide symbol and expiry date"}), 400
     
-    # Get the first active client for API calls
-    if not active_clients:
+    # Watched chains are rebuilt in the background, serve the latest snapshot right away
+    snapshot = options_processor.chain_snapshots.get(symbol, expiry)
+    if snapshot is not None:
+        data = dict(snapshot.data)
+        data["snapshot_age"] = round(snapshot.age(), 2)
+        data["as_of"] = datetime.fromtimestamp(snapshot.built_at).strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify({"status": "success", "data": data})
+    
+    # Spread market data calls across all logged-in accounts
+    client = market_data_pool.get_client("getMarketData")
+    if not client:
         logger.error("No active clients available for option chain API")
         return jsonify({"status": "error", "message": "No active clients available"}), 500
     
-    client = next(iter(active_clients.values()))
     logger.info(f"Using client {client.client_id} for option chain API")
     
     try:
@@ -1585,58 +1656,8 @@ def api_get_option_chain():
             
             # For testing/demo purposes, generate a mock option chain for common indices
             if symbol.upper() in ["NIFTY", "BANKNIFTY", "FINNIFTY"]:
-                step = 100 if symbol.upper() == "NIFTY" or symbol.upper() == "FINNIFTY" else 500
-                
-                # Calculate ATM strike (round to nearest step)
-                atm_strike = round(current_price / step) * step
-                
-                # Generate 5 strikes above and below ATM
-                strikes = [atm_strike + (i - 5) * step for i in range(11)]
-                
-                # Create mock calls and puts
-                mock_calls = []
-                mock_puts = []
-                
-                for strike in strikes:
-                    # Calculate moneyness
-                    if abs(strike - current_price) / current_price <= 0.005:
-                        moneyness = "ATM"
-                    elif (option_type == "CE" and strike < current_price) or (option_type == "PE" and strike > current_price):
-                        moneyness = "ITM"
-                    else:
-                        moneyness = "OTM"
-                    
-                    # Calculate mock prices (simplified)
-                    if strike < current_price:
-                        call_price = max(0.01, current_price - strike + 50)
-                        put_price = max(0.01, 50)
-                    else:
-                        call_price = max(0.01, 50)
-                        put_price = max(0.01, strike - current_price + 50)
-                    
-                    # Call option
-                    call = {
-                        'symbol': f"{symbol}{expiry[:5]}{strike}CE",
-                        'token': f"1{str(strike).zfill(5)}1",
-                        'expiry': expiry,
-                        'strike_price': strike,
-                        'option_type': 'CE',
-                        'last_price': round(call_price, 2),
-                        'moneyness': moneyness
-                    }
-                    mock_calls.append(call)
-                    
-                    # Put option
-                    put = {
-                        'symbol': f"{symbol}{expiry[:5]}{strike}PE",
-                        'token': f"1{str(strike).zfill(5)}2",
-                        'expiry': expiry,
-                        'strike_price': strike,
-                        'option_type': 'PE',
-                        'last_price': round(put_price, 2),
-                        'moneyness': moneyness
-                    }
-                    mock_puts.append(put)
+                # Same column-wise mock chain the options processor falls back to, 5 strikes either side
+                mock_calls, mock_puts = options_processor._create_mock_options(symbol, expiry, current_price, num_strikes=5)
                 
                 logger.info(f"Generated mock option chain for {symbol}/{expiry} with {len(mock_calls)} strikes")
                 options_data = {
@@ -1679,30 +1700,15 @@ def api_get_option_chain():
 @login_required
 def api_get_fno_symbols():
     """Get list of all F&O symbols"""
-    # Get the first active client for API calls
-    if not active_clients:
-        logger.error("No active clients available for F&O symbols API")
-        return jsonify({"status": "error", "message": "No active clients available"}), 500
-    
-    client = next(iter(active_clients.values()))
-    logger.info(f"Using client {client.client_id} for F&O symbols API")
-    
     try:
-        # Ensure client is logged in
-        if not client.session_active:
-            logger.warning(f"Client {client.client_id} session not active, attempting login")
-            login_success = client.login()
-            if not login_success:
-                logger.error(f"Failed to login client {client.client_id}")
-                return jsonify({"status": "error", "message": "Client authentication failed"}), 500
-        
-        # Get F&O symbols
-        fno_symbols = options_processor.get_fno_symbols(client)
+        # Pre-serialized once per instrument master refresh
+        universe = options_processor.get_fno_universe()
         
-        return jsonify({
-            "status": "success",
-            "data": fno_symbols
-        })
+        response = make_response(universe.payload)
+        response.mimetype = 'application/json'
+        response.set_etag(universe.etag)
+        response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, a 304 is cheap
+        return response.make_conditional(request)
     
     except Exception as e:
         logger.error(f"Error getting F&O symbols: {str(e)}")
@@ -1714,34 +1720,9 @@ def api_search_fno_symbols():
     """Search F&O symbols"""
     query = request.args.get('query', '').upper()
     
-    # Get the first active client for API calls
-    if not active_clients:
-        logger.error("No active clients available for symbol search API")
-        return jsonify({"status": "error", "message": "No active clients available"}), 500
-    
-    client = next(iter(active_clients.values()))
-    logger.info(f"Using client {client.client_id} for symbol search API")
-    
     try:
-        # Ensure client is logged in
-        if not client.session_active:
-            logger.warning(f"Client {client.client_id} session not active, attempting login")
-            login_success = client.login()
-            if not login_success:
-                logger.error(f"Failed to login client {client.client_id}")
-                return jsonify({"status": "error", "message": "Client authentication failed"}), 500
-        
-        # Get F&O symbols
-        fno_symbols = options_processor.get_fno_symbols(client)
-        
-        # Filter symbols based on query
-        if query:
-            filtered_symbols = [
-                symbol for symbol in fno_symbols
-                if query in symbol['symbol'].upper() or query in symbol.get('name', '').upper()
-            ]
-        else:
-            filtered_symbols = fno_symbols
+        # Served from the local search index, no broker session needed
+        filtered_symbols = options_processor.search_fno_symbols(query)
         
         return jsonify({
             "status": "success",
@@ -1846,6 +1827,76 @@ def api_websocket_status():
     }
     return jsonify(status)  
 
+@app.route('/api/instrument-master/status', methods=['GET'])
+@login_required
+def api_instrument_master_status():
+    """Get refresh time and row counts of the instrument master"""
+    return jsonify({"status": "success", "data": options_processor.get_master_status()})
+
+@app.route('/api/market-data/status', methods=['GET'])
+@login_required
+def api_market_data_status():
+    """Get price store counters, REST-free read ratios, coalesced calls and per-account throttle waits"""
+    return jsonify({"status": "success", "data": {
+        "price_store": price_store.stats(),
+        "price_resolver": price_resolver.stats(),
+        "single_flight": market_data_flights.stats(),
+        "client_pool": market_data_pool.stats(),
+        "chain_snapshots": options_processor.chain_snapshots.status(),
+        "greeks": greeks_engine.stats(),
+        "executor": market_data_executor.stats(),
+        "rate_limits": {client_id: client.rate_limiter.stats() for client_id, client in list(active_clients.items())}
+    }})
+
+@app.route('/api/orders/dispatch/status', methods=['GET'])
+@login_required
+def api_order_dispatch_status():
+    """Get signal fan-out latency and per-account order queue depth and latency"""
+    return jsonify({"status": "success", "data": order_dispatcher.stats()})
+
+@app.route('/api/signals/status', methods=['GET'])
+@login_required
+def api_signal_queue_status():
+    """Get the webhook signal queue depth and processing counters"""
+    return jsonify({"status": "success", "data": signal_queue.stats()})
+
+@app.route('/api/signals/<signal_id>', methods=['GET'])
+@login_required
+def api_signal_status(signal_id):
+    """Get the processing state and per-account order results of a queued webhook signal"""
+    signal = signal_queue.get(signal_id)
+    if signal is None:
+        return jsonify({"status": "error", "message": f"Signal {signal_id} not found"}), 404
+    return jsonify({"status": "success", "data": signal})
+
+@app.route('/api/orders/updates/status', methods=['GET'])
+@login_required
+def api_order_updates_status():
+    """Get fill confirmations received from the order update stream and how often placement fell back to the order book"""
+    return jsonify({"status": "success", "data": {
+        "order_socket_connected": websocket_manager.order_connected,
+        "registry": order_status_registry.stats()
+    }})
+
+@app.route('/api/get-expiry-calendar', methods=['GET'])
+@login_required
+def api_get_expiry_calendar():
+    """Get the expiries of a symbol tagged weekly/monthly/quarterly"""
+    symbol = request.args.get('symbol', 'NIFTY')
+    calendar = options_processor.get_expiry_calendar(symbol)
+    if not calendar:
+        return jsonify({"status": "error", "message": f"No expiries found for {symbol}"}), 404
+
+    return jsonify({
+        "status": "success",
+        "data": {
+            "expiries": calendar,
+            "nearest": options_processor.resolve_expiry(symbol, "nearest"),
+            "weekly": options_processor.resolve_expiry(symbol, "weekly"),
+            "monthly": options_processor.resolve_expiry(symbol, "monthly")
+        }
+    })
+
 @app.route('/debug/websocket-auth', methods=['GET'])
 @login_required
 def debug_websocket_auth():
@@ -1893,20 +1944,29 @@ if __name__ == '__main__':
     
     # Initialize all client connections
     initialize_clients()
-    options_processor.initialize(active_clients)
+    options_processor.initialize(active_clients, websocket_manager)
 
     # Start session refresh thread
     refresh_thread = threading.Thread(target=session_refresh_task, daemon=True)
     refresh_thread.start()
     
+    # Start placing the orders of queued webhook signals
+    signal_queue.start()
+    
     try:
         # Start the Flask server
         port = CONFIG.get('port', 5000)
         print(f"Starting server on http://localhost:{port}")
-        app.run(host='0.0.0.0', port=port, debug=True)
+        # No reloader: it would run this block in a second process, replaying the signal journal twice
+        app.run(host='0.0.0.0', port=port, debug=True, use_reloader=False)
     except KeyboardInterrupt:
         print("Shutting down...")
     finally:
         # Shutdown the trade monitor service
         TradeMonitorService.shutdown()
+        options_processor.master_refresher.stop()
+        options_processor.chain_snapshots.stop()
+        market_data_executor.shutdown()
+        signal_queue.stop()
+        order_dispatcher.shutdown()
         websocket_manager.close()
\ No newline at end of file
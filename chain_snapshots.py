@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+from instrument_master import IST
+
+logger = logging.getLogger(__name__)
+
+# Underlyings whose chains are kept warm, same as the quick-access symbols on the /options page
+DEFAULT_WATCH_LIST = ["NIFTY", "BANKNIFTY", "FINNIFTY", "SENSEX"]
+
+# NSE and BSE F&O trading session (IST, Monday to Friday)
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+
+
+def market_is_open(now=None):
+    """Whether now falls within the F&O trading session; exchange holidays are not known here"""
+    now = now or datetime.now(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= (now.hour, now.minute) < MARKET_CLOSE
+
+
+class ChainSnapshot:
+    """One option chain as built by the background refresher"""
+    def __init__(self, data, build_seconds):
+        self.data = data  # symbol, expiry, underlying_price, calls, puts
+        self.built_at = time.time()
+        self.build_seconds = build_seconds
+
+    def age(self):
+        return time.time() - self.built_at
+
+
+class OptionChainSnapshots:
+    """
+    Background thread that rebuilds the option chains of a watch list of
+    underlyings for their nearest expiries, so chain requests for them can be
+    answered from the latest snapshot instead of fetching prices on the request.
+    Passes are skipped outside the trading session and while no chain has been
+    requested for idle_intervals refresh intervals. Chains with mock prices are
+    never stored, the previous snapshot is kept until it ages out.
+    """
+    def __init__(self, build_chain, get_expiries, get_client, watch_list=None,
+                 expiry_count=2, refresh_interval=5, max_age=30, idle_intervals=12):
+        self.build_chain = build_chain    # (client, symbol, expiry) -> chain dict or None
+        self.get_expiries = get_expiries  # symbol -> sorted expiry strings
+        self.get_client = get_client      # () -> client for market data calls, or None
+        self.watch_list = list(watch_list or DEFAULT_WATCH_LIST)
+        self.expiry_count = expiry_count  # Nearest expiries kept per underlying
+        self.refresh_interval = refresh_interval  # Seconds between refresh passes
+        self.max_age = max_age  # Older snapshots are not served
+        self.idle_intervals = idle_intervals  # Refresh intervals without a chain request before passes pause
+        self.last_requested = None  # When get() was last called
+        self.snapshots = {}  # (symbol, expiry) -> ChainSnapshot
+        self.lock = threading.Lock()
+        self.refresh_thread = None
+        self.is_running = False
+        self.stop_event = threading.Event()
+
+        # Refresh statistics
+        self.pass_count = 0
+        self.last_pass_time = None
+        self.last_pass_duration = None
+        self.last_error = None
+        self.served = 0
+        self.skipped_passes = 0
+        self.skip_reason = None
+        self.mocked_chains = 0
+
+    def configure(self, watch_list=None, expiry_count=None, refresh_interval=None, max_age=None, idle_intervals=None):
+        """Replace the watched underlyings and the refresh timings"""
+        if watch_list:
+            self.watch_list = [symbol.upper() for symbol in watch_list]
+        if expiry_count is not None:
+            self.expiry_count = int(expiry_count)
+        if refresh_interval is not None:
+            self.refresh_interval = float(refresh_interval)
+        if max_age is not None:
+            self.max_age = float(max_age)
+        if idle_intervals is not None:
+            self.idle_intervals = int(idle_intervals)
+        logger.info(f"Option chain snapshots configured for {', '.join(self.watch_list)} "
+                    f"({self.expiry_count} expiries every {self.refresh_interval}s)")
+
+    @staticmethod
+    def _key(symbol, expiry):
+        return (symbol.upper(), expiry.upper())
+
+    def get(self, symbol, expiry):
+        """Latest snapshot of a chain if it is younger than max_age, else None"""
+        self.last_requested = time.time()
+        with self.lock:
+            snapshot = self.snapshots.get(self._key(symbol, expiry))
+        if snapshot is None or snapshot.age() > self.max_age:
+            return None
+        self.served += 1
+        return snapshot
+
+    def refresh_all(self):
+        """Rebuild every watched chain once, returns the number of snapshots built"""
+        start_time = time.time()
+        built = 0
+        watched_keys = set()
+
+        for symbol in list(self.watch_list):
+            for expiry in list(self.get_expiries(symbol) or [])[:self.expiry_count]:
+                watched_keys.add(self._key(symbol, expiry))
+                client = self.get_client()
+                if client is None:
+                    self.last_error = "No active clients available"
+                    return built
+
+                try:
+                    chain_start = time.time()
+                    data = self.build_chain(client, symbol, expiry)
+                    if data and data.get("mocked"):
+                        self.mocked_chains += 1
+                        logger.warning(f"Not storing the {symbol} {expiry} chain snapshot: it contains mock prices")
+                    elif data:
+                        snapshot = ChainSnapshot(data, time.time() - chain_start)
+                        with self.lock:
+                            self.snapshots[self._key(symbol, expiry)] = snapshot
+                        built += 1
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.error(f"Error building option chain snapshot for {symbol} {expiry}: {str(e)}")
+
+        # Drop chains that left the watch list or rolled off the nearest expiries
+        with self.lock:
+            for key in set(self.snapshots) - watched_keys:
+                del self.snapshots[key]
+
+        self.pass_count += 1
+        self.last_pass_time = time.time()
+        self.last_pass_duration = self.last_pass_time - start_time
+        logger.debug(f"Refreshed {built} option chain snapshots in {self.last_pass_duration:.2f}s")
+        return built
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return False
+
+        self.is_running = True
+        self.stop_event.clear()
+        self.refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.refresh_thread.start()
+        logger.info(f"Option chain snapshot refresher started with interval of {self.refresh_interval} seconds")
+        return True
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self.is_running = False
+        self.stop_event.set()
+
+    def _skip_reason(self):
+        """Why the next pass should not run, or None"""
+        if not market_is_open():
+            return "market closed"
+        if self.last_requested is None or time.time() - self.last_requested > self.idle_intervals * self.refresh_interval:
+            return "no recent chain requests"
+        return None
+
+    def _refresh_loop(self):
+        while self.is_running:
+            try:
+                self.skip_reason = self._skip_reason()
+                if self.skip_reason:
+                    self.skipped_passes += 1
+                else:
+                    self.refresh_all()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Error in option chain snapshot loop: {str(e)}")
+
+            self.stop_event.wait(self.refresh_interval)
+
+    def status(self):
+        """Watch list, snapshot ages and refresher statistics"""
+        with self.lock:
+            snapshots = dict(self.snapshots)
+        return {
+            "running": bool(self.refresh_thread and self.refresh_thread.is_alive()),
+            "watch_list": self.watch_list,
+            "expiry_count": self.expiry_count,
+            "refresh_interval": self.refresh_interval,
+            "max_age": self.max_age,
+            "idle_intervals": self.idle_intervals,
+            "paused": self.skip_reason,
+            "snapshots": {
+                f"{symbol} {expiry}": {
+                    "age_seconds": round(snapshot.age(), 2),
+                    "build_seconds": round(snapshot.build_seconds, 2)
+                }
+                for (symbol, expiry), snapshot in snapshots.items()
+            },
+            "served": self.served,
+            "pass_count": self.pass_count,
+            "skipped_passes": self.skipped_passes,
+            "mocked_chains": self.mocked_chains,
+            "last_pass": datetime.fromtimestamp(self.last_pass_time).strftime('%Y-%m-%d %H:%M:%S') if self.last_pass_time else None,
+            "last_pass_seconds": round(self.last_pass_duration, 2) if self.last_pass_duration is not None else None,
+            "last_error": self.last_error
+        }
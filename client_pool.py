@@ -0,0 +1,125 @@
+import logging
+import threading
+import time
+
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDataClientPool:
+    """
+    Spreads read-only market data calls across every logged-in account.
+
+    Each pick goes to the healthy client whose rate limiter would make the call
+    wait the least, taking clients in round-robin order on ties so idle accounts
+    share the load evenly. Clients whose session is inactive are skipped until
+    they log in again; once none is left, the next pick logs inactive clients
+    back in until one succeeds. Concurrent callers share that attempt, and it is
+    made at most once every relogin_interval seconds.
+    """
+    def __init__(self, relogin_interval=30):
+        self.clients = {}  # client_id -> AngleOneClient, the app's active_clients dict
+        self.lock = threading.Lock()
+        self.next_index = 0
+        self.relogin_interval = relogin_interval
+        self.relogin_flights = SingleFlight()
+        self.last_relogin = 0.0
+
+        # Statistics
+        self.leases = {}  # client_id -> number of picks
+        self.ejected = set()  # client_ids currently skipped for an inactive session
+        self.empty_picks = 0
+        self.relogins = 0
+        self.failed_relogins = 0
+
+    def bind(self, clients):
+        """Use the given client dict; it is read on every pick, so later logins are picked up"""
+        self.clients = clients
+
+    @staticmethod
+    def _backlog(client, endpoint):
+        rate_limiter = getattr(client, 'rate_limiter', None)
+        return rate_limiter.backlog(endpoint) if rate_limiter else 0.0
+
+    def get_client(self, endpoint="ltpData"):
+        """Least-loaded healthy client for an endpoint, or None if no session is active"""
+        client = self._pick(endpoint)
+        if client is None and self.clients:
+            self.relogin_flights.do("relogin", self._relogin)
+            client = self._pick(endpoint)
+
+        if client is None:
+            with self.lock:
+                self.empty_picks += 1
+        return client
+
+    def _pick(self, endpoint):
+        with self.lock:
+            clients = list(self.clients.values())
+            healthy = [client for client in clients if getattr(client, 'session_active', False)]
+
+            ejected = {client.client_id for client in clients} - {client.client_id for client in healthy}
+            for client_id in ejected - self.ejected:
+                logger.warning(f"Removing client {client_id} from the market data pool: session inactive")
+            self.ejected = ejected
+
+            if not healthy:
+                return None
+
+            # Rotate the starting point so ties go round-robin
+            start = self.next_index % len(healthy)
+            self.next_index += 1
+            rotation = healthy[start:] + healthy[:start]
+
+            client = min(rotation, key=lambda candidate: self._backlog(candidate, endpoint))
+            self.leases[client.client_id] = self.leases.get(client.client_id, 0) + 1
+            return client
+
+    def _relogin(self):
+        """Log the inactive clients back in, unless that was tried within relogin_interval"""
+        with self.lock:
+            if time.time() - self.last_relogin < self.relogin_interval:
+                return
+            self.last_relogin = time.time()
+            inactive = [client for client in self.clients.values() if not getattr(client, 'session_active', False)]
+
+        for client in inactive:
+            logger.info(f"No active session left in the market data pool, logging in client {client.client_id}")
+            try:
+                success = client.login()
+            except Exception as e:
+                logger.error(f"Error logging in client {client.client_id}: {str(e)}")
+                success = False
+
+            with self.lock:
+                if success:
+                    self.relogins += 1
+                else:
+                    self.failed_relogins += 1
+            if success:
+                logger.info(f"Client {client.client_id} is back in the market data pool")
+                break
+
+    def stats(self):
+        """Picks, ejected clients and current quota backlog per client"""
+        with self.lock:
+            return {
+                "clients": {
+                    client_id: {
+                        "healthy": client_id not in self.ejected and getattr(client, 'session_active', False),
+                        "leases": self.leases.get(client_id, 0),
+                        "ltp_backlog_ms": round(self._backlog(client, "ltpData") * 1000, 1),
+                        "quote_backlog_ms": round(self._backlog(client, "getMarketData") * 1000, 1)
+                    }
+                    for client_id, client in list(self.clients.items())
+                },
+                "ejected": sorted(self.ejected),
+                "empty_picks": self.empty_picks,
+                "relogins": self.relogins,
+                "failed_relogins": self.failed_relogins
+            }
+
+
+# Shared by every module that makes read-only market data calls
+market_data_pool = MarketDataClientPool()
@@ -0,0 +1,76 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import ratio
+
+logger = logging.getLogger(__name__)
+
+
+class ContractCache:
+    """
+    Bounded LRU cache of resolved option contracts keyed by
+    (underlying, expiry, strike, option_type). Cleared whenever a new
+    instrument master is published.
+    """
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Bumped on every invalidation so lookups that started against the previous
+        # master cannot store their result in the new cache
+        self.generation = 0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Return a copy of the cached contract, or None on a miss"""
+        with self.lock:
+            contract = self.entries.get(key)
+            if contract is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+        # Callers are free to modify the dict they get back
+        return dict(contract)
+
+    def put(self, key, contract, generation):
+        """Store a resolved contract if the master has not changed since the lookup started"""
+        with self.lock:
+            if generation != self.generation:
+                return False
+
+            self.entries[key] = dict(contract)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self):
+        """Drop every cached contract"""
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+        logger.info("Option contract cache invalidated")
+
+    def stats(self):
+        """Hit rate and size for monitoring"""
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": ratio(self.hits, self.hits + self.misses),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
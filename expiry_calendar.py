@@ -0,0 +1,151 @@
+import logging
+from datetime import datetime, timedelta
+
+from instrument_index import format_expiry, normalize_expiry
+
+logger = logging.getLogger(__name__)
+
+WEEKLY = "weekly"
+MONTHLY = "monthly"
+QUARTERLY = "quarterly"
+
+QUARTER_END_MONTHS = (3, 6, 9, 12)
+
+# Contracts stop trading at market close on expiry day
+MARKET_CLOSE_HOUR = 15
+MARKET_CLOSE_MINUTE = 30
+
+
+def classify_expiries(expiry_dates):
+    """
+    Tag each expiry of one underlying as weekly, monthly or quarterly.
+    The last expiry of a calendar month is the monthly contract; monthlies
+    in quarter-end months are quarterly. Everything else is a weekly.
+    """
+    last_in_month = {}
+    for expiry_date in expiry_dates:
+        key = (expiry_date.year, expiry_date.month)
+        if key not in last_in_month or expiry_date > last_in_month[key]:
+            last_in_month[key] = expiry_date
+
+    tags = []
+    for expiry_date in expiry_dates:
+        if last_in_month[(expiry_date.year, expiry_date.month)] != expiry_date:
+            tags.append(WEEKLY)
+        elif expiry_date.month in QUARTER_END_MONTHS:
+            tags.append(QUARTERLY)
+        else:
+            tags.append(MONTHLY)
+    return tags
+
+
+class UnderlyingExpiries:
+    """
+    Ordered, tagged expiries of one underlying. The answers for "nearest",
+    "next weekly", "current monthly" and "current quarterly" are computed once
+    per trading day, so every lookup afterwards is a dictionary read.
+    """
+    __slots__ = ('expiries', 'dates', 'tags', 'has_weekly', '_as_of', '_picks')
+
+    def __init__(self, expiries, dates, tags):
+        self.expiries = expiries  # Expiry strings (DDMMMYYYY), ascending
+        self.dates = dates        # datetime.date per expiry
+        self.tags = tags          # WEEKLY, MONTHLY or QUARTERLY per expiry
+        self.has_weekly = WEEKLY in tags
+        self._as_of = None
+        self._picks = {}
+
+    def _compute_picks(self, now):
+        """Resolve each preference to an expiry for the given moment"""
+        after_close = (now.hour, now.minute) >= (MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE)
+        today = now.date()
+
+        start = 0
+        while start < len(self.dates) and (self.dates[start] < today or
+                                           (self.dates[start] == today and after_close)):
+            start += 1
+
+        picks = {}
+        for i in range(start, len(self.expiries)):
+            tag = self.tags[i]
+            picks.setdefault("nearest", self.expiries[i])
+            if tag in (MONTHLY, QUARTERLY):
+                picks.setdefault(MONTHLY, self.expiries[i])
+            if tag == QUARTERLY:
+                picks.setdefault(QUARTERLY, self.expiries[i])
+
+        # Monthly contracts are part of the weekly series, so the next weekly is simply
+        # the nearest expiry - as long as the underlying has weeklies at all
+        if self.has_weekly and "nearest" in picks:
+            picks[WEEKLY] = picks["nearest"]
+        return picks
+
+    def pick(self, preference, now=None):
+        """Expiry for "nearest", "weekly", "monthly" or "quarterly", or None if there is none"""
+        now = now or datetime.now()
+        as_of = (now.date(), (now.hour, now.minute) >= (MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE))
+        if as_of != self._as_of:
+            self._picks = self._compute_picks(now)
+            self._as_of = as_of
+        return self._picks.get(preference)
+
+    def tagged(self):
+        """Expiries with their classification, in order"""
+        return [{"expiry": expiry, "type": tag} for expiry, tag in zip(self.expiries, self.tags)]
+
+
+class ExpiryCalendar:
+    """Expiry calendar of every option underlying, built once per instrument master load"""
+    def __init__(self):
+        self.underlyings = {}  # (underlying, exchange) -> UnderlyingExpiries
+
+    @classmethod
+    def build(cls, index):
+        """Build the calendar from the sorted expiry lists of an InstrumentIndex"""
+        calendar = cls()
+        for key, expiries in index.expiries.items():
+            dates = [datetime.strptime(expiry, '%d%b%Y').date() for expiry in expiries]
+            calendar.underlyings[key] = UnderlyingExpiries(list(expiries), dates, classify_expiries(dates))
+
+        logger.info(f"Built expiry calendar for {len(calendar.underlyings)} underlyings")
+        return calendar
+
+    def get(self, underlying, exchange):
+        return self.underlyings.get((underlying, exchange))
+
+    def resolve(self, underlying, exchange, preference, now=None):
+        """
+        Resolve an expiry preference to an expiry string. Accepts "nearest", "weekly",
+        "monthly", "quarterly" or an explicit DDMMMYYYY date; an empty preference means
+        the nearest expiry. Returns None if nothing matches.
+        """
+        preference = (preference or "nearest").strip()
+
+        explicit = normalize_expiry(preference)
+        if explicit:
+            return explicit
+
+        expiries = self.get(underlying, exchange)
+        if expiries is None:
+            return None
+
+        preference = preference.lower()
+        expiry = expiries.pick(preference, now)
+        if expiry is None and preference == WEEKLY:
+            # Stock options only have monthlies
+            expiry = expiries.pick("nearest", now)
+        return expiry
+
+
+def projected_weekly_expiries(count=4, now=None):
+    """
+    Project the next weekly Thursday expiries when no instrument master is available.
+    Only used as a last resort; the real calendar comes from the master.
+    """
+    now = now or datetime.now()
+    days_until_thursday = (3 - now.weekday()) % 7
+    if days_until_thursday == 0 and (now.hour, now.minute) >= (MARKET_CLOSE_HOUR, MARKET_CLOSE_MINUTE):
+        days_until_thursday = 7
+
+    next_thursday = now + timedelta(days=days_until_thursday)
+    return [format_expiry(next_thursday + timedelta(days=i * 7)) for i in range(count)]
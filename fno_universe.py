@@ -0,0 +1,85 @@
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Indices listed first, in this order, with their display names
+INDEX_SYMBOLS = [
+    {"symbol": "NIFTY", "name": "Nifty 50", "exchange": "NSE", "type": "Index"},
+    {"symbol": "BANKNIFTY", "name": "Bank Nifty", "exchange": "NSE", "type": "Index"},
+    {"symbol": "FINNIFTY", "name": "Financial Services Nifty", "exchange": "NSE", "type": "Index"},
+    {"symbol": "MIDCPNIFTY", "name": "Midcap Nifty", "exchange": "NSE", "type": "Index"},
+    {"symbol": "SENSEX", "name": "BSE Sensex", "exchange": "BSE", "type": "Index"}
+]
+
+# Cash-market exchange of the underlying for each derivatives segment
+UNDERLYING_EXCHANGES = {"NFO": "NSE", "BFO": "BSE"}
+
+# The chain, expiry and contract lookups trade a name on this segment when it has options on both
+PREFERRED_OPTIONS_EXCHANGE = "NFO"
+
+
+class FnoUniverse:
+    """
+    F&O underlyings with lot sizes, expiry counts and index/stock tags, computed
+    once per instrument master and kept as a ready-to-send JSON payload with an ETag
+    """
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.payload = json.dumps({"status": "success", "data": symbols}, separators=(',', ':'))
+        self.etag = hashlib.sha1(self.payload.encode('utf-8')).hexdigest()
+        self.built_at = time.time()
+
+    @classmethod
+    def build(cls, index):
+        """Build the universe from the option underlyings of an InstrumentIndex"""
+        if index.is_empty():
+            return cls([dict(symbol) for symbol in INDEX_SYMBOLS])
+
+        start_time = time.time()
+        underlyings = {}
+        for (name, exch_seg), expiries in index.expiries.items():
+            if exch_seg not in UNDERLYING_EXCHANGES or not expiries:
+                continue
+
+            # Names with options on both segments are listed once, for the segment the lookups use
+            if exch_seg != PREFERRED_OPTIONS_EXCHANGE and index.expiries.get((name, PREFERRED_OPTIONS_EXCHANGE)):
+                continue
+
+            # Lot size of the nearest expiry
+            lotsize = None
+            for option_type in ('CE', 'PE'):
+                chain_slice = index.get_chain(name, exch_seg, expiries[0], option_type)
+                if chain_slice is not None and len(chain_slice):
+                    lotsize = int(chain_slice.lotsizes[0])
+                    break
+
+            underlyings[(exch_seg, name)] = {
+                "symbol": name,
+                "name": name,
+                "exchange": UNDERLYING_EXCHANGES[exch_seg],
+                "options_exchange": exch_seg,
+                "type": "Index" if index.underlying_types.get((name, exch_seg)) == 'OPTIDX' else "Stock",
+                "lotsize": lotsize,
+                "expiry_count": len(expiries),
+                "nearest_expiry": expiries[0]
+            }
+
+        # Well-known indices first, then other indices, then stocks alphabetically
+        options_exchanges = {exchange: exch_seg for exch_seg, exchange in UNDERLYING_EXCHANGES.items()}
+        symbols = []
+        for index_symbol in INDEX_SYMBOLS:
+            entry = dict(index_symbol)
+            underlying_key = (options_exchanges[entry["exchange"]], entry["symbol"])
+            entry.update({key: value for key, value in underlyings.pop(underlying_key, {}).items()
+                          if key not in ("name", "type")})
+            symbols.append(entry)
+
+        symbols += sorted(underlyings.values(), key=lambda s: (s["type"] != "Index", s["symbol"], s["exchange"]))
+
+        universe = cls(symbols)
+        elapsed_ms = (time.time() - start_time) * 1000
+        logger.info(f"Built F&O universe of {len(symbols)} symbols in {elapsed_ms:.1f}ms")
+        return universe
@@ -0,0 +1,194 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from metrics import ratio, to_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RISK_FREE_RATE = 0.065  # Annualized, continuously compounded
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+MARKET_CLOSE = (15, 30)  # Options expire at the close of the expiry day
+
+# Implied volatility search
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+PRICE_TOLERANCE = 1e-4  # Rupees between model and market price
+MIN_TIME_VALUE = 0.05  # One tick; below it the premium carries no volatility information
+MAX_ITERATIONS = 50
+
+SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    """Standard normal CDF (Abramowitz & Stegun 26.2.17, absolute error below 7.5e-8)"""
+    x = np.asarray(x, dtype=np.float64)
+    t = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = t * (0.319381530 + t * (-0.356563782 + t * (1.781477937 + t * (-1.821255978 + t * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+
+def years_to_expiry(expiry_date, now=None):
+    """Years from now until the close of the expiry day, 0 once it has passed"""
+    now = now or datetime.now()
+    expiry_close = expiry_date.replace(hour=MARKET_CLOSE[0], minute=MARKET_CLOSE[1], second=0, microsecond=0)
+    return max((expiry_close - now).total_seconds(), 0.0) / SECONDS_PER_YEAR
+
+
+def _d1_d2(spot, strikes, years, rate, sigma):
+    sqrt_t = np.sqrt(years)
+    d1 = (np.log(spot / strikes) + (rate + 0.5 * sigma * sigma) * years) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def bs_price(spot, strikes, years, rate, sigma, is_call):
+    """Black-Scholes premium for arrays of strikes and volatilities"""
+    d1, d2 = _d1_d2(spot, strikes, years, rate, sigma)
+    discount = np.exp(-rate * years)
+    call = spot * norm_cdf(d1) - strikes * discount * norm_cdf(d2)
+    put = strikes * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def implied_volatility(prices, spot, strikes, years, rate, is_call):
+    """
+    Implied volatility for every contract at once. Newton steps on vega, kept
+    inside a shrinking bisection bracket so deep ITM/OTM strikes with tiny vega
+    still converge. Prices outside the no-arbitrage bounds, or with less than a
+    tick of time value, give NaN.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    strikes = np.asarray(strikes, dtype=np.float64)
+    discount = np.exp(-rate * years)
+    intrinsic = np.where(is_call, np.maximum(spot - strikes * discount, 0.0), np.maximum(strikes * discount - spot, 0.0))
+    upper_bound = np.where(is_call, spot, strikes * discount)
+    valid = (prices - intrinsic >= MIN_TIME_VALUE) & (prices < upper_bound) & (years > 0)
+
+    low = np.full(prices.shape, MIN_VOLATILITY)
+    high = np.full(prices.shape, MAX_VOLATILITY)
+    # Brenner-Subrahmanyam starting point
+    sigma = np.clip(prices / spot * SQRT_2PI / math.sqrt(max(years, 1e-12)), 0.05, 2.0)
+    active = valid.copy()
+
+    for _ in range(MAX_ITERATIONS):
+        if not active.any():
+            break
+        d1, _ = _d1_d2(spot, strikes[active], years, rate, sigma[active])
+        diff = bs_price(spot, strikes[active], years, rate, sigma[active], is_call[active]) - prices[active]
+        vega = spot * norm_pdf(d1) * math.sqrt(years)
+
+        converged = np.abs(diff) < PRICE_TOLERANCE
+        # Premium rises with volatility: too expensive means sigma is an upper bound
+        high[active] = np.where(diff > 0, sigma[active], high[active])
+        low[active] = np.where(diff <= 0, sigma[active], low[active])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = sigma[active] - diff / vega
+        bisect = (low[active] + high[active]) / 2
+        in_bracket = (step > low[active]) & (step < high[active]) & np.isfinite(step)
+        sigma[active] = np.where(converged, sigma[active], np.where(in_bracket, step, bisect))
+
+        indices = np.flatnonzero(active)
+        active[indices[converged | (high[active] - low[active] < 1e-8)]] = False
+
+    return np.where(valid, sigma, np.nan)
+
+
+def chain_greeks(spot, strikes, years, rate, prices, option_type):
+    """IV plus delta, gamma, theta (per day) and vega (per 1% volatility) for one side of a chain"""
+    strikes = np.asarray(strikes, dtype=np.float64)
+    is_call = np.full(strikes.shape, option_type == 'CE')
+    iv = implied_volatility(prices, spot, strikes, years, rate, is_call)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1, d2 = _d1_d2(spot, strikes, years, rate, iv)
+        sqrt_t = math.sqrt(years) if years > 0 else np.nan
+        pdf = norm_pdf(d1)
+        discount = np.exp(-rate * years)
+
+        delta = np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+        gamma = pdf / (spot * iv * sqrt_t)
+        vega = spot * pdf * sqrt_t / 100
+        decay = -spot * pdf * iv / (2 * sqrt_t)
+        theta = np.where(is_call,
+                         decay - rate * strikes * discount * norm_cdf(d2),
+                         decay + rate * strikes * discount * norm_cdf(-d2)) / 365
+
+    return {"iv": iv * 100, "delta": delta, "gamma": gamma, "theta": theta, "vega": vega}
+
+
+class GreeksEngine:
+    """
+    Computes chain Greeks and caches them per tick batch: the same underlying
+    price, strikes and premiums within the same minute reuse the last result.
+    """
+    def __init__(self, risk_free_rate=DEFAULT_RISK_FREE_RATE, max_size=256):
+        self.risk_free_rate = risk_free_rate
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.last_compute = None  # Seconds
+
+    def configure(self, risk_free_rate=None):
+        """Set the risk-free rate; cached Greeks computed with the old rate are dropped"""
+        if risk_free_rate is not None:
+            self.risk_free_rate = float(risk_free_rate)
+            with self.lock:
+                self.cache.clear()
+
+    def compute(self, spot, strikes, expiry_date, prices, option_type, now=None):
+        """Greeks for one side of a chain, arrays aligned with strikes"""
+        now = now or datetime.now()
+        strikes = np.asarray(strikes, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)
+        key = (float(spot), option_type, expiry_date.date(), now.strftime('%Y%m%d%H%M'),
+               strikes.tobytes(), prices.tobytes())
+
+        with self.lock:
+            greeks = self.cache.get(key)
+            if greeks is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return greeks
+            self.misses += 1
+
+        start_time = time.perf_counter()
+        greeks = chain_greeks(float(spot), strikes, years_to_expiry(expiry_date, now),
+                              self.risk_free_rate, prices, option_type)
+        self.last_compute = time.perf_counter() - start_time
+
+        with self.lock:
+            self.cache[key] = greeks
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return greeks
+
+    def stats(self):
+        """Cache counters and the duration of the last computation"""
+        with self.lock:
+            return {
+                "risk_free_rate": self.risk_free_rate,
+                "size": len(self.cache),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": ratio(self.hits, self.hits + self.misses),
+                "last_compute_ms": to_ms(self.last_compute, 3)
+            }
+
+
+# Shared by the option chain builders
+greeks_engine = GreeksEngine()
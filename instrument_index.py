@@ -0,0 +1,284 @@
+import logging
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OPTION_INSTRUMENT_TYPES = ['OPTSTK', 'OPTIDX']
+
+# The master publishes strikes in paise
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(rupees):
+    """Convert a rupee price to integer paise"""
+    return int(round(float(rupees) * PAISE_PER_RUPEE))
+
+
+def format_expiry(expiry_date):
+    """Format an expiry date the way the UI and webhooks use it (e.g. 29MAY2025)"""
+    return expiry_date.strftime('%d%b%Y').upper()
+
+
+def normalize_expiry(expiry):
+    """Normalize an expiry string to DDMMMYYYY, returns None if it cannot be parsed"""
+    if not expiry:
+        return None
+    try:
+        return format_expiry(datetime.strptime(str(expiry).strip(), '%d%b%Y'))
+    except ValueError:
+        return None
+
+
+def nearest_position(strikes_paise, price):
+    """Position of the strike closest to a rupee price in an ascending paise array, -1 if empty"""
+    if not len(strikes_paise):
+        return -1
+    target = float(price) * PAISE_PER_RUPEE
+    i = int(np.searchsorted(strikes_paise, target))
+    if i == 0:
+        return 0
+    if i == len(strikes_paise):
+        return i - 1
+    # Ties go to the lower strike, matching min() over the sorted strike list
+    return i - 1 if target - strikes_paise[i - 1] <= strikes_paise[i] - target else i
+
+
+class OptionChainSlice:
+    """
+    All contracts of one (underlying, exchange, expiry, option type) combination,
+    sorted by strike so that strike lookups are binary searches on integer paise
+    """
+    __slots__ = ('strikes_paise', 'tokens', 'symbols', 'lotsizes')
+
+    def __init__(self, strikes_paise, tokens, symbols, lotsizes):
+        self.strikes_paise = strikes_paise  # np.ndarray of int32 strikes in paise, ascending
+        self.tokens = tokens      # np.ndarray of int32, aligned with strikes
+        self.symbols = symbols    # list of str, aligned with strikes
+        self.lotsizes = lotsizes  # np.ndarray of int32, aligned with strikes
+
+    def __len__(self):
+        return len(self.strikes_paise)
+
+    @property
+    def strikes(self):
+        """Strikes in rupees"""
+        return self.strikes_paise / PAISE_PER_RUPEE
+
+    def strike(self, i):
+        """Strike at position i in rupees"""
+        return int(self.strikes_paise[i]) / PAISE_PER_RUPEE
+
+    def find(self, strike):
+        """Position of an exact strike (in rupees), or -1 if the strike is not listed"""
+        target = to_paise(strike)
+        i = int(np.searchsorted(self.strikes_paise, target))
+        if i < len(self.strikes_paise) and self.strikes_paise[i] == target:
+            return i
+        return -1
+
+    def nearest(self, strike):
+        """Position of the listed strike closest to the given price (in rupees)"""
+        return nearest_position(self.strikes_paise, strike)
+
+    def positions(self, strikes):
+        """Ascending positions of those given strikes (in rupees) that are listed"""
+        targets = np.unique(np.round(np.asarray(strikes, dtype=np.float64) * PAISE_PER_RUPEE).astype(np.int64))
+        positions = np.searchsorted(self.strikes_paise, targets)
+        found = positions < len(self.strikes_paise)
+        found[found] = self.strikes_paise[positions[found]] == targets[found]
+        return positions[found]
+
+    def row(self, i):
+        """Contract at position i in the shape of a token_df record"""
+        return {
+            'symbol': self.symbols[i],
+            'token': str(self.tokens[i]),
+            'strike': self.strike(i),
+            'lotsize': int(self.lotsizes[i])
+        }
+
+
+class StrikeLadder:
+    """
+    Sorted listed strikes of one (underlying, exchange, expiry), calls and puts combined,
+    with the modal strike spacing cached so strike selection is a binary search
+    """
+    __slots__ = ('strikes_paise', 'step_paise')
+
+    def __init__(self, strikes_paise):
+        self.strikes_paise = strikes_paise  # np.ndarray of unique int32 strikes in paise, ascending
+        self.step_paise = 0
+        if len(strikes_paise) >= 2:
+            # Most common gap between adjacent strikes; ties go to the smaller gap
+            gaps, counts = np.unique(np.diff(strikes_paise), return_counts=True)
+            self.step_paise = int(gaps[np.argmax(counts)])
+
+    def __len__(self):
+        return len(self.strikes_paise)
+
+    @property
+    def step(self):
+        """Modal strike spacing in rupees, 0 if fewer than two strikes are listed"""
+        return self.step_paise / PAISE_PER_RUPEE
+
+    @property
+    def strikes(self):
+        """Strikes in rupees"""
+        return self.strikes_paise / PAISE_PER_RUPEE
+
+    def strike(self, i):
+        """Strike at position i in rupees"""
+        return int(self.strikes_paise[i]) / PAISE_PER_RUPEE
+
+    def atm_index(self, price):
+        """Position of the listed strike closest to the price"""
+        return nearest_position(self.strikes_paise, price)
+
+    def atm(self, price):
+        """ATM strike in rupees"""
+        i = self.atm_index(price)
+        return self.strike(i) if i >= 0 else None
+
+    def _offset(self, price, offset):
+        i = self.atm_index(price)
+        if i < 0:
+            return None
+        return self.strike(min(max(i + offset, 0), len(self.strikes_paise) - 1))
+
+    def itm(self, price, depth, option_type):
+        """Strike depth listed strikes in the money (lower for calls, higher for puts)"""
+        return self._offset(price, -depth if option_type == 'CE' else depth)
+
+    def otm(self, price, depth, option_type):
+        """Strike depth listed strikes out of the money (higher for calls, lower for puts)"""
+        return self._offset(price, depth if option_type == 'CE' else -depth)
+
+    def select(self, price, moneyness, depth, option_type):
+        """Strike for an ATM/ITM/OTM selection at the given depth"""
+        moneyness = (moneyness or 'ATM').upper()
+        if moneyness == 'ITM':
+            return self.itm(price, depth, option_type)
+        if moneyness == 'OTM':
+            return self.otm(price, depth, option_type)
+        return self.atm(price)
+
+    def window(self, price, count):
+        """Listed strikes from count below to count above the ATM strike, in rupees"""
+        i = self.atm_index(price)
+        if i < 0:
+            return []
+        window = self.strikes_paise[max(i - count, 0):i + count + 1]
+        return (window / PAISE_PER_RUPEE).tolist()
+
+
+class InstrumentIndex:
+    """
+    Lookup tables derived from the instrument master, built once per master refresh:
+      (name, exch_seg) -> token
+      (underlying, exchange) -> sorted expiries
+      (underlying, exchange, expiry, option type) -> OptionChainSlice
+      (underlying, exchange, expiry) -> StrikeLadder
+      (underlying, exchange) -> option instrument type (OPTIDX or OPTSTK)
+    """
+    def __init__(self):
+        self.symbol_tokens = {}
+        self.expiries = {}
+        self.chains = {}
+        self.ladders = {}
+        self.underlying_types = {}
+        self.row_count = 0
+        self.built_at = None
+
+    @classmethod
+    def build(cls, df):
+        """Build all lookup tables from a processed token DataFrame"""
+        index = cls()
+        if df is None or df.empty:
+            return index
+
+        start_time = time.time()
+        index.row_count = len(df)
+
+        # First token per (name, exch_seg), same as filtered_df.iloc[0] on the unindexed frame
+        first_rows = df.drop_duplicates(subset=['name', 'exch_seg'], keep='first')
+        index.symbol_tokens = dict(zip(
+            zip(first_rows['name'].tolist(), first_rows['exch_seg'].tolist()),
+            first_rows['token'].astype(str).tolist()
+        ))
+
+        options_df = df[df['instrumenttype'].isin(OPTION_INSTRUMENT_TYPES) & df['expiry'].notna()]
+        if not options_df.empty:
+            first_options = options_df.drop_duplicates(subset=['name', 'exch_seg'], keep='first')
+            index.underlying_types = dict(zip(
+                zip(first_options['name'].tolist(), first_options['exch_seg'].tolist()),
+                first_options['instrumenttype'].tolist()
+            ))
+
+            options_df = pd.DataFrame({
+                'name': options_df['name'],
+                'exch_seg': options_df['exch_seg'],
+                'expiry': options_df['expiry'],
+                'option_type': options_df['symbol'].str[-2:],
+                'strike': options_df['strike'].astype('int32'),  # Paise
+                'token': options_df['token'],
+                'symbol': options_df['symbol'],
+                'lotsize': options_df['lotsize']
+            })
+            options_df = options_df[options_df['option_type'].isin(['CE', 'PE'])]
+            options_df = options_df.sort_values(['name', 'exch_seg', 'expiry', 'strike'], kind='stable')
+
+            # Format each distinct expiry once rather than once per contract
+            expiry_strings = {exp: format_expiry(exp) for exp in options_df['expiry'].unique()}
+
+            groups = options_df.groupby(['name', 'exch_seg', 'expiry'], sort=True, observed=True)
+            for (name, exch_seg, expiry), expiry_group in groups:
+                expiry_str = expiry_strings[expiry]
+                index.expiries.setdefault((name, exch_seg), []).append(expiry_str)
+                index.ladders[(name, exch_seg, expiry_str)] = StrikeLadder(
+                    np.unique(expiry_group['strike'].to_numpy(dtype='int32'))
+                )
+
+                for option_type, group in expiry_group.groupby('option_type', sort=False):
+                    group = group.drop_duplicates(subset=['strike'], keep='first')
+                    index.chains[(name, exch_seg, expiry_str, option_type)] = OptionChainSlice(
+                        group['strike'].to_numpy(dtype='int32'),
+                        group['token'].to_numpy(dtype='int32'),
+                        group['symbol'].tolist(),
+                        group['lotsize'].to_numpy(dtype='int32')
+                    )
+
+        index.built_at = time.time()
+        elapsed_ms = (index.built_at - start_time) * 1000
+        logger.info(f"Built instrument index: {len(index.symbol_tokens)} symbols, "
+                    f"{len(index.expiries)} option underlyings, {len(index.chains)} chain slices, "
+                    f"{len(index.ladders)} strike ladders in {elapsed_ms:.1f}ms")
+        return index
+
+    def is_empty(self):
+        return self.row_count == 0
+
+    def get_token(self, name, exch_seg):
+        """Token for a symbol name on an exchange segment"""
+        return self.symbol_tokens.get((name, exch_seg))
+
+    def get_expiries(self, underlying, exchange):
+        """Sorted expiry strings for the options of an underlying"""
+        return self.expiries.get((underlying, exchange), [])
+
+    def get_chain(self, underlying, exchange, expiry, option_type):
+        """Contracts of one option type for an underlying and expiry"""
+        expiry_str = normalize_expiry(expiry)
+        if expiry_str is None:
+            return None
+        return self.chains.get((underlying, exchange, expiry_str, option_type))
+
+    def get_ladder(self, underlying, exchange, expiry):
+        """Strike ladder for an underlying and expiry"""
+        expiry_str = normalize_expiry(expiry)
+        if expiry_str is None:
+            return None
+        return self.ladders.get((underlying, exchange, expiry_str))
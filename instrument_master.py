@@ -0,0 +1,632 @@
+import codecs
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import requests
+
+from expiry_calendar import ExpiryCalendar
+from fno_universe import FnoUniverse
+from instrument_index import InstrumentIndex
+
+logger = logging.getLogger(__name__)
+
+SCRIP_MASTER_URL = 'https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json'
+
+# Columns of the OpenAPIScripMaster file that the rest of the application uses
+MASTER_COLUMNS = ['token', 'symbol', 'name', 'expiry', 'strike', 'lotsize', 'instrumenttype', 'exch_seg', 'tick_size']
+
+# Size of the chunks read from the download while streaming
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+# datetime64 value used for instruments without an expiry
+NAT_VALUE = np.iinfo(np.int64).min
+
+# Range of the int32 token, strike and lot size columns
+INT32_MIN, INT32_MAX = int(np.iinfo(np.int32).min), int(np.iinfo(np.int32).max)
+
+# Segments kept from the master when config.json does not set instrument_segments
+DEFAULT_TRADED_SEGMENTS = ['NFO', 'BFO', 'NSE', 'BSE']
+
+# Cash-market segments only contribute indices and the equities used as option underlyings
+CASH_SEGMENTS = ('NSE', 'BSE')
+
+# Angel One publishes each day's master in the morning (IST); files fetched before this cutoff are the previous day's
+MASTER_PUBLISH_CUTOFF = (8, 30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Repeated strings are stored as categorical codes
+CATEGORICAL_COLUMNS = ['name', 'instrumenttype', 'exch_seg']
+
+
+class InstrumentMasterCache:
+    """
+    Disk-backed columnar cache for the OpenAPIScripMaster instrument master.
+
+    Every column is written once per trading day as a .npy file inside a directory
+    named after the content hash of the downloaded master, so it can be memory-mapped
+    on startup instead of downloading and re-parsing the full JSON file.
+    """
+    def __init__(self, cache_dir="cache/instrument_master"):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+
+    @staticmethod
+    def compute_hash(raw_bytes):
+        """Compute the content hash used to key the cache"""
+        return hashlib.sha256(raw_bytes).hexdigest()
+
+    @staticmethod
+    def current_trade_date(now=None):
+        """Trading day of the latest published master, the previous day until the morning publish cutoff"""
+        now = now or datetime.now(IST)
+        if (now.hour, now.minute) < MASTER_PUBLISH_CUTOFF:
+            now -= timedelta(days=1)
+        return now.strftime('%Y-%m-%d')
+
+    def _content_dir(self, content_hash):
+        return os.path.join(self.cache_dir, content_hash[:16])
+
+    def read_manifest(self):
+        """Read the cache manifest, returns None if there is no usable cache"""
+        try:
+            if not os.path.exists(self.manifest_path):
+                return None
+
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+
+            # All column files must still be on disk
+            content_dir = self._content_dir(manifest["content_hash"])
+            files = [f"{column}.npy" for column in manifest["columns"]]
+            files += [f"{column}.categories.npy" for column in manifest.get("categorical", [])]
+            for file_name in files:
+                if not os.path.exists(os.path.join(content_dir, file_name)):
+                    logger.warning(f"Instrument cache is missing {file_name}, ignoring cache")
+                    return None
+
+            return manifest
+        except Exception as e:
+            logger.warning(f"Could not read instrument cache manifest: {str(e)}")
+            return None
+
+    def _write_manifest(self, manifest):
+        """Atomically replace the manifest file"""
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def is_fresh(self, variant=None):
+        """Check if the cache was written (or revalidated) for the current trading day"""
+        manifest = self.read_manifest()
+        return (manifest is not None and manifest.get("trade_date") == self.current_trade_date()
+                and manifest.get("variant") == variant)
+
+    def has_content(self, content_hash, variant=None):
+        """Check if the cache already holds the master with the given content hash"""
+        manifest = self.read_manifest()
+        return (manifest is not None and manifest.get("content_hash") == content_hash
+                and manifest.get("variant") == variant)
+
+    @property
+    def download_path(self):
+        """Scratch file the raw master is streamed to before it is parsed"""
+        return os.path.join(self.cache_dir, "download.tmp")
+
+    def touch(self):
+        """
+        Record that a download matched the cached master. trade_date is kept: an
+        unchanged file after the publish cutoff means today's master is not out yet.
+        """
+        try:
+            manifest = self.read_manifest()
+            if manifest is None:
+                return False
+
+            manifest["validated_at"] = time.time()
+            self._write_manifest(manifest)
+            logger.info(f"Instrument cache {manifest['content_hash'][:16]} from {manifest['trade_date']} is still "
+                        f"the latest published master")
+            return True
+        except Exception as e:
+            logger.error(f"Error revalidating instrument cache: {str(e)}")
+            return False
+
+    def load(self):
+        """Map the cached columns and return them as a DataFrame, or None if the cache is unusable"""
+        try:
+            start_time = time.time()
+            manifest = self.read_manifest()
+            if manifest is None:
+                return None
+
+            content_dir = self._content_dir(manifest["content_hash"])
+            columns = {}
+            for column in manifest["columns"]:
+                values = np.load(os.path.join(content_dir, f"{column}.npy"), mmap_mode='r')
+                if column in manifest.get("categorical", []):
+                    categories = np.load(os.path.join(content_dir, f"{column}.categories.npy"))
+                    values = pd.Categorical.from_codes(values, categories=categories)
+                columns[column] = values
+
+            df = pd.DataFrame(columns, copy=False)
+
+            elapsed_ms = (time.time() - start_time) * 1000
+            logger.info(f"Loaded {len(df)} instruments from cache {manifest['content_hash'][:16]} in {elapsed_ms:.1f}ms")
+            return df
+        except Exception as e:
+            logger.error(f"Error loading instrument cache: {str(e)}")
+            return None
+
+    def save(self, df, content_hash, variant=None):
+        """Write the processed master to disk, one .npy file per column"""
+        try:
+            start_time = time.time()
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            content_dir = self._content_dir(content_hash)
+            tmp_dir = f"{content_dir}.tmp"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+
+            columns = []
+            categorical = []
+            for column in df.columns:
+                if isinstance(df[column].dtype, pd.CategoricalDtype):
+                    # Codes are mapped like any numeric column, the categories are small
+                    categories = np.array(df[column].cat.categories.astype(str).to_numpy(), dtype=str)
+                    np.save(os.path.join(tmp_dir, f"{column}.categories.npy"), categories, allow_pickle=False)
+                    values = df[column].cat.codes.to_numpy()
+                    categorical.append(column)
+                elif column == 'expiry':
+                    values = df[column].to_numpy(dtype='datetime64[ns]')
+                elif pd.api.types.is_numeric_dtype(df[column].dtype):
+                    values = df[column].to_numpy()
+                else:
+                    # Fixed-width unicode arrays can be memory-mapped, object arrays cannot
+                    values = np.array(df[column].fillna('').astype(str).to_numpy(), dtype=str)
+
+                np.save(os.path.join(tmp_dir, f"{column}.npy"), values, allow_pickle=False)
+                columns.append(column)
+
+            # Swap the new column files into place before pointing the manifest at them
+            shutil.rmtree(content_dir, ignore_errors=True)
+            os.replace(tmp_dir, content_dir)
+
+            self._write_manifest({
+                "content_hash": content_hash,
+                "variant": variant,
+                "trade_date": self.current_trade_date(),
+                "rows": len(df),
+                "columns": columns,
+                "categorical": categorical,
+                "created_at": time.time(),
+                "validated_at": time.time()
+            })
+
+            self._remove_stale_content(content_hash)
+
+            elapsed_ms = (time.time() - start_time) * 1000
+            logger.info(f"Saved {len(df)} instruments to cache {content_hash[:16]} in {elapsed_ms:.1f}ms")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving instrument cache: {str(e)}")
+            return False
+
+    def _remove_stale_content(self, current_hash):
+        """Delete column directories left behind by previous masters"""
+        current_dir = os.path.basename(self._content_dir(current_hash))
+        for entry in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, entry)
+            if os.path.isdir(path) and entry != current_dir and not entry.endswith(".tmp"):
+                shutil.rmtree(path, ignore_errors=True)
+                logger.debug(f"Removed stale instrument cache {entry}")
+
+
+class SegmentFilter:
+    """
+    Record filter keeping only the configured exchange segments. Derivative segments
+    are kept whole; cash segments only keep indices and equities, which are needed
+    as option underlyings.
+    """
+    def __init__(self, segments=None):
+        self.segments = frozenset(segments or DEFAULT_TRADED_SEGMENTS)
+        # Recorded in the cache manifest so a cache built for other segments is not reused
+        self.variant = "segments:" + ",".join(sorted(self.segments))
+
+    def __call__(self, record):
+        exch_seg = record.get('exch_seg')
+        if exch_seg not in self.segments:
+            return False
+        if exch_seg in CASH_SEGMENTS:
+            return record.get('instrumenttype') == 'AMXIDX' or record.get('symbol', '').endswith('-EQ')
+        return True
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a top-level JSON array from an iterable of byte chunks,
+    yielding one element at a time so the whole document is never held in memory
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    started = False
+
+    for chunk in chunks:
+        buffer += utf8_decoder.decode(chunk)
+        pos = 0
+
+        if not started:
+            pos = len(buffer) - len(buffer.lstrip())
+            if pos >= len(buffer):
+                buffer = ''
+                continue
+            if buffer[pos] != '[':
+                raise ValueError("Instrument master is not a JSON array")
+            pos += 1
+            started = True
+
+        while True:
+            # Skip separators between elements
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                return
+
+            try:
+                element, pos_end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk
+                break
+
+            yield element
+            pos = pos_end
+
+        buffer = buffer[pos:]
+
+    if buffer.strip():
+        raise ValueError("Instrument master ended in the middle of an element")
+
+
+class MasterColumnBuffers:
+    """
+    Typed, append-only column buffers the streaming parser writes into.
+    Tokens, lot sizes and strikes (in paise, as published) are stored as int32,
+    repeated strings as categorical codes, so memory grows with the number of
+    kept instruments rather than the size of the download.
+    """
+    def __init__(self, record_filter=None):
+        self.record_filter = record_filter
+        self.tokens = array('i')
+        self.symbols = []
+        self.expiries = array('q')  # datetime64[ns] values
+        self.strikes = array('i')   # Paise, -1 for instruments without a strike
+        self.lotsizes = array('i')
+        self.tick_sizes = array('d')  # Paise
+        self.rows_seen = 0
+        self.rows_skipped = 0
+
+        # Categorical columns: codes per row plus the distinct values in code order
+        self.codes = {column: array('i') for column in CATEGORICAL_COLUMNS}
+        self.categories = {column: {} for column in CATEGORICAL_COLUMNS}
+        self._expiry_values = {'': NAT_VALUE}
+
+    def _expiry_value(self, expiry):
+        value = self._expiry_values.get(expiry)
+        if value is None:
+            try:
+                value = np.datetime64(datetime.strptime(expiry, '%d%b%Y'), 'ns').astype(np.int64)
+            except (ValueError, TypeError):
+                value = NAT_VALUE
+            self._expiry_values[expiry] = value
+        return value
+
+    @staticmethod
+    def _number(value, default):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    def append(self, record):
+        """Append one instrument record if it passes the filter"""
+        self.rows_seen += 1
+        if self.record_filter is not None and not self.record_filter(record):
+            return False
+
+        try:
+            token = int(record.get('token'))
+            strike = int(round(self._number(record.get('strike'), -1)))
+            lotsize = int(self._number(record.get('lotsize'), 0))
+        except (TypeError, ValueError, OverflowError):
+            # Every token the API accepts is numeric, so are valid strikes and lot sizes
+            self.rows_skipped += 1
+            return False
+
+        # Check before appending anything so the columns stay aligned
+        if not all(INT32_MIN <= value <= INT32_MAX for value in (token, strike, lotsize)):
+            logger.warning(f"Skipping instrument {record.get('symbol')} ({record.get('token')}): "
+                           f"token, strike or lot size does not fit in 32 bits")
+            self.rows_skipped += 1
+            return False
+
+        self.tokens.append(token)
+        self.symbols.append(record.get('symbol', ''))
+        self.expiries.append(self._expiry_value(record.get('expiry', '')))
+        self.strikes.append(strike)
+        self.lotsizes.append(lotsize)
+        self.tick_sizes.append(self._number(record.get('tick_size'), 0.0))
+
+        for column in CATEGORICAL_COLUMNS:
+            categories = self.categories[column]
+            value = record.get(column) or ''
+            code = categories.get(value)
+            if code is None:
+                code = categories[value] = len(categories)
+            self.codes[column].append(code)
+        return True
+
+    def to_frame(self):
+        """Build the token DataFrame from the buffered columns"""
+        columns = {
+            'token': np.frombuffer(self.tokens, dtype=np.int32),
+            'symbol': self.symbols,
+            'expiry': np.frombuffer(self.expiries, dtype=np.int64).view('datetime64[ns]'),
+            'strike': np.frombuffer(self.strikes, dtype=np.int32),
+            'lotsize': np.frombuffer(self.lotsizes, dtype=np.int32),
+            'tick_size': np.frombuffer(self.tick_sizes, dtype=np.float64)
+        }
+        for column in CATEGORICAL_COLUMNS:
+            # from_codes narrows the codes to the smallest integer type that fits
+            columns[column] = pd.Categorical.from_codes(
+                np.frombuffer(self.codes[column], dtype=np.int32), categories=list(self.categories[column])
+            )
+        return pd.DataFrame(columns)[MASTER_COLUMNS]
+
+
+def download_master(cache):
+    """Stream the raw master to the cache scratch file, returns its content hash"""
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+
+    with requests.get(SCRIP_MASTER_URL, stream=True, timeout=120) as response:
+        if response.status_code != 200:
+            logger.error(f"Failed to fetch symbol data: HTTP {response.status_code}")
+            return None
+
+        with open(cache.download_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+
+    logger.info(f"Downloaded instrument master ({size / 1024 / 1024:.1f} MB)")
+    return hasher.hexdigest()
+
+
+def parse_master_file(path, record_filter=None):
+    """Stream-parse a downloaded master file into a token DataFrame"""
+    buffers = MasterColumnBuffers(record_filter)
+
+    with open(path, 'rb') as f:
+        chunks = iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b'')
+        for record in iter_json_array(chunks):
+            buffers.append(record)
+
+    token_df = buffers.to_frame()
+    memory_mb = token_df.memory_usage(deep=True).sum() / 1024 / 1024
+    logger.info(f"Parsed {buffers.rows_seen} instruments from OpenAPI, kept {len(token_df)} "
+                f"({buffers.rows_skipped} skipped, {memory_mb:.1f} MB)")
+    return token_df
+
+
+class InstrumentMaster:
+    """
+    Snapshot of the instrument master together with the indexes derived from it.
+    A snapshot is never mutated after it is published; refreshes build a new one.
+    """
+    def __init__(self, token_df, content_hash=None, source="empty", trade_date=None):
+        self.token_df = token_df
+        self.index = InstrumentIndex.build(token_df)
+        self.calendar = ExpiryCalendar.build(self.index)
+        self.fno_universe = FnoUniverse.build(self.index)
+        self.content_hash = content_hash
+        self.source = source  # "cache", "download", "stale_cache" or "empty"
+        self.trade_date = trade_date
+        self.loaded_at = time.time()
+
+    @classmethod
+    def empty(cls):
+        """Snapshot with an empty DataFrame carrying the required columns"""
+        return cls(pd.DataFrame(columns=MASTER_COLUMNS))
+
+    @property
+    def row_count(self):
+        return len(self.token_df)
+
+    def status(self):
+        """Refresh time and row counts for monitoring"""
+        return {
+            "source": self.source,
+            "content_hash": self.content_hash[:16] if self.content_hash else None,
+            "trade_date": self.trade_date,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at).strftime('%Y-%m-%d %H:%M:%S'),
+            "rows": self.row_count,
+            "symbols": len(self.index.symbol_tokens),
+            "option_underlyings": len(self.index.expiries),
+            "chain_slices": len(self.index.chains)
+        }
+
+
+def load_instrument_master(cache, allow_stale=False, record_filter=None):
+    """
+    Build a new InstrumentMaster snapshot from today's cache or from a fresh download.
+    Falls back to an older cache when allow_stale is set and the download fails.
+    Returns None if no master could be loaded.
+    """
+    # Cached columns are only reusable if they were written with the same filter
+    variant = getattr(record_filter, 'variant', None)
+
+    # Map the cached columns if the cache was written for today's trading day
+    if cache.is_fresh(variant):
+        cached_df = cache.load()
+        if cached_df is not None:
+            manifest = cache.read_manifest()
+            return InstrumentMaster(cached_df, manifest["content_hash"], "cache", manifest["trade_date"])
+
+    try:
+        logger.info("Downloading instrument master from Angel One OpenAPI")
+        content_hash = download_master(cache)
+
+        if content_hash:
+            # Angel One did not publish a new master yet - reuse the cached columns, keeping their trade date
+            if cache.has_content(content_hash, variant):
+                cached_df = cache.load()
+                if cached_df is not None:
+                    cache.touch()
+                    return InstrumentMaster(cached_df, content_hash, "cache", cache.read_manifest()["trade_date"])
+
+            token_df = parse_master_file(cache.download_path, record_filter)
+
+            # Persist the processed columns for the next restart
+            cache.save(token_df, content_hash, variant)
+            return InstrumentMaster(token_df, content_hash, "download", cache.current_trade_date())
+    except Exception as e:
+        logger.error(f"Error downloading instrument master: {str(e)}")
+    finally:
+        if os.path.exists(cache.download_path):
+            os.remove(cache.download_path)
+
+    if allow_stale:
+        # Fall back to a stale cache before giving up on the master entirely
+        cached_df = cache.load()
+        if cached_df is not None:
+            manifest = cache.read_manifest()
+            logger.warning(f"Using stale instrument cache from {manifest['trade_date']}")
+            return InstrumentMaster(cached_df, manifest["content_hash"], "stale_cache", manifest["trade_date"])
+
+    return None
+
+
+class InstrumentMasterRefresher:
+    """
+    Background thread that rebuilds the instrument master and its indexes off the
+    request path and hands each new snapshot to a publish callback.
+    """
+    def __init__(self, cache, get_current, publish, check_interval=600, record_filter=None):
+        self.cache = cache
+        self.record_filter = record_filter or SegmentFilter()  # Applied to each record while streaming
+        self.get_current = get_current  # Returns the currently published InstrumentMaster
+        self.publish = publish          # Called with each new InstrumentMaster
+        self.check_interval = check_interval  # Seconds between staleness checks
+        self.refresh_thread = None
+        self.is_running = False
+        self.refresh_lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        # Refresh statistics
+        self.refresh_count = 0
+        self.last_check_time = None
+        self.last_refresh_time = None
+        self.last_refresh_duration = None
+        self.last_error = None
+
+    def needs_refresh(self):
+        """Check if the published master was fetched before the latest publish cutoff"""
+        current = self.get_current()
+        return current.row_count == 0 or current.trade_date != self.cache.current_trade_date()
+
+    def refresh(self):
+        """Load a new master and publish it, returns True if a new snapshot was published"""
+        # Never run two refreshes at once; the second caller keeps the current snapshot
+        if not self.refresh_lock.acquire(blocking=False):
+            logger.info("Instrument master refresh already in progress")
+            return False
+
+        try:
+            start_time = time.time()
+            self.last_check_time = start_time
+
+            master = load_instrument_master(self.cache, allow_stale=self.get_current().row_count == 0,
+                                            record_filter=self.record_filter)
+            if master is None:
+                self.last_error = "Instrument master could not be loaded"
+                return False
+
+            # Still the published content: nothing to rebuild, the next check downloads again
+            current = self.get_current()
+            if current.row_count and master.content_hash == current.content_hash:
+                self.last_error = None
+                logger.info(f"Instrument master for {self.cache.current_trade_date()} not published yet, "
+                            f"checking again in {self.check_interval}s")
+                return False
+
+            self.publish(master)
+
+            self.refresh_count += 1
+            self.last_refresh_time = time.time()
+            self.last_refresh_duration = self.last_refresh_time - start_time
+            self.last_error = None
+            logger.info(f"Instrument master refreshed from {master.source} with {master.row_count} rows "
+                        f"in {self.last_refresh_duration:.1f}s")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error refreshing instrument master: {str(e)}")
+            return False
+        finally:
+            self.refresh_lock.release()
+
+    def start(self):
+        """Start the background refresh thread"""
+        if self.refresh_thread is not None and self.refresh_thread.is_alive():
+            return False
+
+        self.is_running = True
+        self.stop_event.clear()
+        self.refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True)
+        self.refresh_thread.start()
+        logger.info(f"Instrument master refresher started with check interval of {self.check_interval} seconds")
+        return True
+
+    def stop(self):
+        """Stop the background refresh thread"""
+        self.is_running = False
+        self.stop_event.set()
+
+    def _refresh_loop(self):
+        while self.is_running:
+            try:
+                self.last_check_time = time.time()
+                if self.needs_refresh():
+                    self.refresh()
+            except Exception as e:
+                logger.error(f"Error in instrument master refresh loop: {str(e)}")
+
+            self.stop_event.wait(self.check_interval)
+
+    def status(self):
+        """Refresh time and row counts of the published master plus refresher statistics"""
+        status = self.get_current().status()
+        status.update({
+            "refresher_running": bool(self.refresh_thread and self.refresh_thread.is_alive()),
+            "refresh_count": self.refresh_count,
+            "last_check": datetime.fromtimestamp(self.last_check_time).strftime('%Y-%m-%d %H:%M:%S') if self.last_check_time else None,
+            "last_refresh": datetime.fromtimestamp(self.last_refresh_time).strftime('%Y-%m-%d %H:%M:%S') if self.last_refresh_time else None,
+            "last_refresh_seconds": round(self.last_refresh_duration, 2) if self.last_refresh_duration is not None else None,
+            "last_error": self.last_error
+        })
+        return status
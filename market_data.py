@@ -0,0 +1,78 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# SmartAPI accepts at most 50 tokens per getMarketData request
+MAX_TOKENS_PER_REQUEST = 50
+
+# getMarketData modes: LTP, OHLC (ltp + ohlc) or FULL (ohlc + volume, OI, depth)
+MODE_LTP = "LTP"
+MODE_OHLC = "OHLC"
+MODE_FULL = "FULL"
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most size items"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def parse_quote(item):
+    """Normalize one entry of getMarketData's fetched list"""
+    quote = {
+        "ltp": float(item.get("ltp", 0) or 0),
+        "exchange": item.get("exchange"),
+        "symbol": item.get("tradingSymbol"),
+        "timestamp": time.time()
+    }
+    for field, key in (("open", "open"), ("high", "high"), ("low", "low"), ("close", "close"),
+                       ("volume", "tradeVolume"), ("oi", "opnInterest")):
+        if item.get(key) is not None:
+            quote[field] = float(item[key])
+    return quote
+
+
+def fetch_quote_chunk(smart_api, exchange, chunk, mode=MODE_FULL):
+    """One getMarketData call for at most MAX_TOKENS_PER_REQUEST tokens, returns {token: quote}"""
+    quotes = {}
+    try:
+        response = smart_api.getMarketData(mode, {exchange: chunk})
+        if not isinstance(response, dict) or not response.get("status"):
+            logger.warning(f"Bulk quote request for {len(chunk)} {exchange} tokens failed: "
+                           f"{response.get('message') if isinstance(response, dict) else response}")
+            return quotes
+
+        data = response.get("data") or {}
+        for item in data.get("fetched", []):
+            token = str(item.get("symbolToken"))
+            quotes[token] = parse_quote(item)
+
+        unfetched = data.get("unfetched") or []
+        if unfetched:
+            logger.warning(f"Bulk quote request left {len(unfetched)} {exchange} tokens unfetched")
+    except Exception as e:
+        logger.warning(f"Error fetching bulk quotes for {len(chunk)} {exchange} tokens: {str(e)}")
+
+    return quotes
+
+
+def fetch_quotes(smart_api, exchange, tokens, mode=MODE_FULL, executor=None):
+    """
+    Fetch quotes for many tokens of one exchange with getMarketData, chunked to the
+    per-request limit. Chunks run concurrently on the executor when one is given.
+    Returns {token: quote}; tokens missing from the result were not fetched (error,
+    unfetched by the broker) and should be retried another way.
+    """
+    tokens = [str(token) for token in dict.fromkeys(tokens)]
+    chunks = chunked(tokens, MAX_TOKENS_PER_REQUEST)
+
+    if executor is None or len(chunks) < 2:
+        results = [fetch_quote_chunk(smart_api, exchange, chunk, mode) for chunk in chunks]
+    else:
+        futures = [executor.submit(fetch_quote_chunk, smart_api, exchange, chunk, mode) for chunk in chunks]
+        results = [future.result() for future in futures]
+
+    quotes = {}
+    for chunk_quotes in results:
+        quotes.update(chunk_quotes)
+    return quotes
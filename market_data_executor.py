@@ -0,0 +1,37 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import TaskTimer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 16
+
+
+class InstrumentedExecutor:
+    """
+    Long-lived bounded thread pool for market data fan-out (bulk quote chunks,
+    per-contract LTP fallbacks). Tracks queue depth, time spent queued and run
+    time so saturation shows up in the status endpoint. Tasks must not wait on
+    other tasks of the same executor.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, name="market-data"):
+        self.max_workers = max_workers
+        self.name = name
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.timer = TaskTimer()
+
+    def submit(self, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs), returns a Future"""
+        return self.executor.submit(self.timer.run, self.timer.submit(), fn, *args, **kwargs)
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
+
+    def stats(self):
+        """Queue depth, throughput and latency counters"""
+        return {"max_workers": self.max_workers, **self.timer.as_dict()}
+
+
+# Shared by every market data fan-out
+market_data_executor = InstrumentedExecutor()
@@ -0,0 +1,101 @@
+import threading
+import time
+
+
+def ratio(part, whole):
+    """part / whole as reported by the stats() methods, 0.0 before anything was counted"""
+    return round(part / whole, 4) if whole else 0.0
+
+
+def to_ms(seconds, digits=2):
+    """Seconds as rounded milliseconds, None stays None"""
+    return round(seconds * 1000, digits) if seconds is not None else None
+
+
+class LatencyStat:
+    """Count, total, maximum and last value of a duration; callers hold their own lock"""
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def as_dict(self, name):
+        """avg_/max_/last_<name>_ms keys for a stats() payload"""
+        return {
+            f"avg_{name}_ms": to_ms(self.total / self.count) if self.count else 0.0,
+            f"max_{name}_ms": to_ms(self.max),
+            f"last_{name}_ms": to_ms(self.last)
+        }
+
+
+class TaskTimer:
+    """
+    Queue depth, outcomes and queued/run time of tasks handed to background
+    workers: submit() when a task is queued, run() on the worker that executes it.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait = LatencyStat()
+        self.run_time = LatencyStat()
+
+    def submit(self):
+        """Count a queued task, returns its submission time for run()"""
+        with self.lock:
+            self.submitted += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        return time.perf_counter()
+
+    def discard(self):
+        """Count a queued task that was cancelled before it ran"""
+        with self.lock:
+            self.queued -= 1
+
+    def run(self, submitted_at, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) on the worker, timing the wait since submit() and the call itself"""
+        started_at = time.perf_counter()
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+            self.wait.record(started_at - submitted_at)
+
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+                self.failed += failed
+                self.run_time.record(time.perf_counter() - started_at)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "running": self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                **self.wait.as_dict("wait"),
+                **self.run_time.as_dict("run")
+            }
@@ -0,0 +1,73 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Strikes within this percentage of the underlying price count as ATM
+ATM_BAND_PERCENT = 0.5
+
+# Greek columns and the decimals they are reported with
+GREEK_DECIMALS = {'iv': 2, 'delta': 4, 'gamma': 6, 'theta': 2, 'vega': 2}
+
+
+def classify_moneyness(strikes, underlying_price, option_type):
+    """ATM/ITM/OTM label for every strike of one option type"""
+    strikes = np.asarray(strikes, dtype=np.float64)
+    atm = np.abs(underlying_price - strikes) / underlying_price * 100 <= ATM_BAND_PERCENT
+    itm = strikes < underlying_price if option_type == 'CE' else strikes > underlying_price
+    return np.where(atm, 'ATM', np.where(itm, 'ITM', 'OTM'))
+
+
+def mock_prices(strikes, underlying_price, option_type):
+    """Placeholder premiums for contracts without a quote: intrinsic value plus 50, or a decaying 50"""
+    strikes = np.asarray(strikes, dtype=np.float64)
+    intrinsic = underlying_price - strikes if option_type == 'CE' else strikes - underlying_price
+    return np.where(intrinsic > 0, np.maximum(0.1, intrinsic + 50), np.maximum(0.1, 50 + intrinsic * 0.1))
+
+
+def _optional(values, count, decimals=None):
+    """Float column with NaN for missing values as a list with None in their place"""
+    if values is None:
+        return [None] * count
+    values = np.asarray(values, dtype=np.float64)
+    if decimals is not None:
+        values = np.round(values, decimals)
+    return [None if value != value else value for value in values.tolist()]
+
+
+def chain_records(option_type, expiry, underlying_price, symbols, tokens, strikes, lotsizes, last_prices,
+                  oi=None, volume=None, greeks=None):
+    """
+    Serialize one side of a chain from aligned columns to the row dicts the API
+    returns. Moneyness is classified for the whole column at once and every
+    column is converted to Python values once, not per row. greeks optionally
+    maps iv/delta/gamma/theta/vega to columns; missing ones are reported as None.
+    """
+    count = len(symbols)
+    strikes = np.asarray(strikes, dtype=np.float64)
+    moneyness = classify_moneyness(strikes, underlying_price, option_type).tolist()
+    last_prices = np.round(np.asarray(last_prices, dtype=np.float64), 2).tolist()
+    lotsizes = np.asarray(lotsizes).astype(int).tolist()
+    greeks = greeks or {}
+    greek_rows = zip(*[_optional(greeks.get(name), count, decimals) for name, decimals in GREEK_DECIMALS.items()])
+
+    return [
+        {
+            'symbol': symbol,
+            'token': token,
+            'expiry': expiry,
+            'strike_price': strike,
+            'option_type': option_type,
+            'last_price': last_price,
+            'moneyness': label,
+            'lotsize': lotsize,
+            'oi': oi_value,
+            'volume': volume_value,
+            **dict(zip(GREEK_DECIMALS, greek_values))
+        }
+        for symbol, token, strike, last_price, label, lotsize, oi_value, volume_value, greek_values in zip(
+            symbols, tokens, strikes.tolist(), last_prices, moneyness, lotsizes,
+            _optional(oi, count), _optional(volume, count), greek_rows
+        )
+    ]
@@ -1,27 +1,43 @@
-import json
 import logging
+import threading
 import time
-import requests
-import pandas as pd
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import datetime
 import pyotp
-from collections import Counter
 from options_trade_manager import trade_manager
-import concurrent.futures
+from instrument_master import InstrumentMaster, InstrumentMasterCache, InstrumentMasterRefresher, SegmentFilter
+from instrument_index import normalize_expiry, PAISE_PER_RUPEE
+from expiry_calendar import projected_weekly_expiries
+from contract_cache import ContractCache
+from symbol_search import SymbolSearchIndex, DEFAULT_RESULT_LIMIT
+from market_data import fetch_quotes, MODE_FULL
+from price_store import price_store, SOURCE_REST
+from price_resolver import price_resolver, fetch_ltp
+from single_flight import market_data_flights
+from client_pool import market_data_pool
+from chain_snapshots import OptionChainSnapshots
+from option_chain import chain_records, mock_prices
+from greeks import greeks_engine
+from market_data_executor import market_data_executor
 
 logger = logging.getLogger(__name__)
 
 class OptionsProcessor:
     def __init__(self):
-        self.token_df = None  # Will store token DataFrame
-        self.last_token_df_update = 0  # Last update timestamp
+        self.master = InstrumentMaster.empty()  # Published instrument master snapshot (token DataFrame + indexes)
         self.active_clients = {}
         self.last_cache_clean = time.time()
-        self.ltp_failures = 0
-        self.ltp_failure_threshold = 10
-        self.ltp_backoff_time = 1.0
-        self.option_price_cache = {}  # Cache for option prices
-        self.price_cache_ttl = 5  # Time in seconds for which cached prices are valid
+        self.instrument_cache = InstrumentMasterCache()  # Columnar on-disk copy of the scrip master
+        self.master_refresher = InstrumentMasterRefresher(
+            self.instrument_cache, lambda: self.master, self._publish_master
+        )
+        self.contract_cache = ContractCache()  # Resolved option contracts, cleared on every master publish
+        self.search_indexes = {}  # Search index key -> (master snapshot, SymbolSearchIndex), built on first use
+        self.search_index_lock = threading.Lock()
+        self.chain_snapshots = OptionChainSnapshots(  # Watched chains rebuilt in the background
+            self.build_option_chain, self._get_snapshot_expiries,
+            lambda: market_data_pool.get_client("getMarketData")
+        )
         
         # Constants for option symbols
         self.INDEX_SYMBOLS = ["NIFTY", "BANKNIFTY", "FINNIFTY", "SENSEX", "MIDCPNIFTY"]
@@ -37,7 +53,7 @@ class OptionsProcessor:
             }
         }
     
-    def initialize(self, active_clients):
+    def initialize(self, active_clients, websocket_manager=None):
         """Initialize the options processor with active client connections"""
         # Verify all clients and filter out any that fail verification
         verified_clients = {}
@@ -55,109 +71,124 @@ class OptionsProcessor:
         self.initialize_symbol_token_map()
         
         # Initialize the trade manager with verified clients and price fetching functions
-        trade_manager.initialize(self.active_clients, self)
+        trade_manager.initialize(self.active_clients, self, websocket_manager)
+    
+    @property
+    def token_df(self):
+        """Token DataFrame of the currently published instrument master"""
+        return self.master.token_df
+    
+    @property
+    def instrument_index(self):
+        """Lookup indexes of the currently published instrument master"""
+        return self.master.index
+    
+    @property
+    def expiry_calendar(self):
+        """Expiry calendar of the currently published instrument master"""
+        return self.master.calendar
     
     def initialize_symbol_token_map(self):
-        """Initialize symbol token map from Angel One OpenAPI JSON file"""
+        """Start the background refresher, which also does the first load; returns whether a master is loaded yet"""
         try:
-            current_time = time.time()
-            
-            # Only update once per day (86400 seconds)
-            if self.token_df is None or (current_time - self.last_token_df_update > 86400):
-                logger.info("Initializing symbol token map from Angel One OpenAPI")
-                
-                url = 'https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json'
-                response = requests.get(url)
-                
-                if response.status_code == 200:
-                    # Parse JSON and create DataFrame
-                    self.token_df = pd.DataFrame.from_dict(response.json())
-                    
-                    # Process DataFrame
-                    self.token_df['expiry'] = pd.to_datetime(self.token_df['expiry'], errors='coerce')
-                    self.token_df['strike'] = pd.to_numeric(self.token_df['strike'], errors='coerce')
-                    self.token_df = self.token_df.astype({'token': 'str'})
-                    
-                    self.last_token_df_update = current_time
-                    logger.info(f"Successfully loaded {len(self.token_df)} symbols from OpenAPI")
-                else:
-                    logger.error(f"Failed to fetch symbol data: HTTP {response.status_code}")
-                    if self.token_df is None:
-                        # Create an empty DataFrame with required columns if we can't fetch
-                        self.token_df = pd.DataFrame(columns=['token', 'symbol', 'name', 'expiry', 'strike', 
-                                                            'lotsize', 'instrumenttype', 'exch_seg'])
-            
-            return True
+            # Never load on the caller's thread: this runs on the order path via initialize_clients,
+            # and contract lookups fail fast until the refresher publishes the first master
+            if self.master_refresher.start() and self.master.row_count == 0:
+                logger.info("Instrument master is loading in the background")
+            return self.master.row_count > 0
         except Exception as e:
             logger.error(f"Error initializing symbol token map: {str(e)}")
-            
-            # Create an empty DataFrame with required columns if we had an error
-            if self.token_df is None:
-                self.token_df = pd.DataFrame(columns=['token', 'symbol', 'name', 'expiry', 'strike', 
-                                                    'lotsize', 'instrumenttype', 'exch_seg'])
-            
             return False
     
+    def set_traded_segments(self, segments):
+        """Restrict the instrument master to the given exchange segments from the next load on"""
+        self.master_refresher.record_filter = SegmentFilter(segments)
+        logger.info(f"Instrument master segments: {sorted(self.master_refresher.record_filter.segments)}")
+    
+    def _publish_master(self, master):
+        """Publish a new instrument master with a single reference swap"""
+        # Readers hold on to the snapshot they started with, so nothing is mutated in place
+        self.master = master
+        self.contract_cache.invalidate()
+        self.search_indexes = {}
+        logger.info(f"Published instrument master with {master.row_count} rows ({master.source})")
+    
+    def _get_search_index(self, master, key, build):
+        """Search index for a master snapshot, built once on first use"""
+        entry = self.search_indexes.get(key)
+        if entry is None or entry[0] is not master:
+            with self.search_index_lock:
+                entry = self.search_indexes.get(key)
+                if entry is None or entry[0] is not master:
+                    entry = (master, build())
+                    self.search_indexes[key] = entry
+        return entry[1]
+    
+    def search_symbols(self, query, exchange="NSE", limit=DEFAULT_RESULT_LIMIT):
+        """
+        Search the instrument master locally. Returns None when the broker has to be
+        asked instead: no master is loaded, the exchange is not a kept segment, or
+        nothing matched (the segment filter drops e.g. BSE equities and non-EQ series).
+        """
+        master = self.master
+        if master.row_count == 0 or exchange not in self.master_refresher.record_filter.segments:
+            return None
+        
+        token_df = master.token_df
+        index = self._get_search_index(
+            master, ("exchange", exchange),
+            lambda: SymbolSearchIndex.from_frame(token_df[token_df['exch_seg'] == exchange])
+        )
+        return index.search(query, limit) or None
+    
+    def search_fno_symbols(self, query, limit=DEFAULT_RESULT_LIMIT):
+        """Search the F&O underlyings, an empty query returns all of them"""
+        master = self.master
+        if not query:
+            return self.get_fno_symbols(None)
+        
+        # The F&O universe is precomputed per master, it never calls the broker
+        index = self._get_search_index(master, ("fno",), lambda: SymbolSearchIndex(self.get_fno_symbols(None)))
+        return index.search(query, limit)
+    
+    def get_master_status(self):
+        """Refresh time and row counts of the instrument master"""
+        status = self.master_refresher.status()
+        status["contract_cache"] = self.contract_cache.stats()
+        return status
+    
     def get_underlying_price(self, client, symbol, exchange="NSE"):
         """Get current price of an underlying asset (stock or index)"""
         try:
             logger.info(f"Getting price for {symbol} on {exchange}")
             
-            # Check cache first for recent price
-            cache_key = f"{exchange}:{symbol}"
-            if cache_key in self.option_price_cache:
-                cached_data = self.option_price_cache[cache_key]
-                if time.time() - cached_data['timestamp'] < self.price_cache_ttl:
-                    logger.info(f"Using cached price for {symbol}: {cached_data['price']}")
-                    return cached_data['price']
-            
-            # For indices, use the index mapping
+            # Resolve the token first, prices are cached per (exchange, token)
             if symbol.upper() in self.INDEX_SYMBOLS:
-                actual_exchange = "NSE" if symbol.upper() != "SENSEX" else "BSE"
-                token = self.get_index_token(symbol.upper(), actual_exchange)
+                # For indices, use the index mapping
+                price_exchange = "NSE" if symbol.upper() != "SENSEX" else "BSE"
+                trading_symbol = symbol.upper()
+                token = self.get_index_token(trading_symbol, price_exchange)
                 
                 if not token:
                     logger.error(f"No token found for index {symbol}")
                     return None
+            else:
+                # For stocks, find the token from the index
+                price_exchange = exchange
+                trading_symbol = symbol
+                token = self.get_symbol_token(symbol, exchange)
                 
-                # Get LTP for index - try different client methods
-                try:
-                    response = client.smart_api.ltpData(actual_exchange, symbol.upper(), token)
-                except AttributeError:
-                    # Try direct access if smart_api access fails
-                    response = client.ltpData(actual_exchange, symbol.upper(), token)
-                    
-                if response.get('status'):
-                    price = float(response['data']['ltp'])
-                    # Cache the successful result
-                    self.option_price_cache[cache_key] = {'price': price, 'timestamp': time.time()}
-                    logger.info(f"Got price for index {symbol}: {price}")
-                    return price
-                
-                logger.error(f"Error getting price for index {symbol}: {response.get('message', 'Unknown error')}")
-                return None
-            
-            # For stocks, find the token from DataFrame
-            token = self.get_symbol_token(symbol, exchange)
-            if not token:
-                logger.error(f"No token found for {symbol}")
-                return None
+                if not token:
+                    logger.error(f"No token found for {symbol}")
+                    return None
             
-            # Get LTP for stock - try different client methods
-            try:
-                response = client.smart_api.ltpData(exchange, symbol, token)
-            except AttributeError:
-                # Try direct access if smart_api access fails
-                response = client.ltpData(exchange, symbol, token)
-                
-            if response.get('status'):
-                price = float(response['data']['ltp'])
-                # Cache the successful result
-                self.option_price_cache[cache_key] = {'price': price, 'timestamp': time.time()}
-                logger.info(f"Got price for stock {symbol}: {price}")
+            # Live WebSocket tick first, then a recent REST price, then ltpData
+            price = price_resolver.resolve_ltp(client, price_exchange, trading_symbol, token)
+            if price is not None:
+                logger.info(f"Got price for {symbol}: {price}")
                 return price
             
-            logger.error(f"Error getting price for {symbol}: {response.get('message', 'Unknown error')}")
+            logger.error(f"Error getting price for {symbol}")
             return None
             
         except Exception as e:
@@ -185,15 +216,10 @@ class OptionsProcessor:
                 actual_exchange = "NSE" if symbol.upper() != "SENSEX" else "BSE"
                 return self.get_index_token(symbol.upper(), actual_exchange)
             
-            # For stocks, find in DataFrame
-            if self.token_df is not None:
-                # Filter DataFrame for the symbol and exchange
-                filtered_df = self.token_df[(self.token_df['name'] == symbol) & 
-                                           (self.token_df['exch_seg'] == exchange)]
-                
-                if not filtered_df.empty:
-                    # Return the first matching token
-                    return filtered_df.iloc[0]['token']
+            # For stocks, look up the (name, exch_seg) index
+            token = self.instrument_index.get_token(symbol, exchange)
+            if token:
+                return token
             
             logger.warning(f"Symbol {symbol} not found in token dataframe")
             return None
@@ -210,8 +236,9 @@ class OptionsProcessor:
             # Generate fallback expiry dates (we'll use this if DataFrame lookup fails)
             fallback_dates = self._generate_fallback_expiry_dates()
             
-            # Check if token_df is available
-            if self.token_df is None or self.token_df.empty:
+            # Work against one published snapshot for the whole call
+            index = self.instrument_index
+            if index.is_empty():
                 logger.warning("Token DataFrame not available, using fallback dates")
                 return fallback_dates
             
@@ -220,27 +247,8 @@ class OptionsProcessor:
             if symbol.upper() == "SENSEX":
                 options_exchange = "BFO"
             
-            # Filter DataFrame for the given symbol and instrument type (options)
-            filtered_df = self.token_df[
-                (self.token_df['name'] == symbol) & 
-                (self.token_df['exch_seg'] == options_exchange) &
-                (self.token_df['instrumenttype'].isin(['OPTSTK', 'OPTIDX']))
-            ]
-            
-            if filtered_df.empty:
-                logger.warning(f"No option contracts found for {symbol}, using fallback dates")
-                return fallback_dates
-            
-            # Extract unique expiry dates and sort them
-            expiry_dates = sorted(filtered_df['expiry'].dropna().unique())
-            
-            # Convert to string format
-            expiry_strings = []
-            for exp_date in expiry_dates:
-                if pd.notna(exp_date):
-                    # Format as 'DDMMMYYYY'
-                    exp_str = exp_date.strftime('%d%b%Y').upper()
-                    expiry_strings.append(exp_str)
+            # Expiries are pre-sorted and formatted as 'DDMMMYYYY' when the index is built
+            expiry_strings = list(index.get_expiries(symbol, options_exchange))
             
             if not expiry_strings:
                 logger.warning(f"No valid expiry dates found for {symbol}, using fallback dates")
@@ -254,28 +262,27 @@ class OptionsProcessor:
             # Return fallback dates
             return self._generate_fallback_expiry_dates()
     
+    def resolve_expiry(self, symbol, preference):
+        """Resolve "weekly", "monthly", "quarterly" or an explicit date to an expiry of the symbol"""
+        options_exchange = "BFO" if symbol.upper() == "SENSEX" else "NFO"
+        return self.expiry_calendar.resolve(symbol, options_exchange, preference)
+    
+    def get_strike_ladder(self, symbol, expiry):
+        """Strike ladder (sorted strikes and modal step) of a symbol and expiry, or None"""
+        options_exchange = "BFO" if symbol.upper() == "SENSEX" else "NFO"
+        return self.instrument_index.get_ladder(symbol, options_exchange, expiry)
+    
+    def get_expiry_calendar(self, symbol):
+        """Expiries of a symbol tagged weekly/monthly/quarterly"""
+        options_exchange = "BFO" if symbol.upper() == "SENSEX" else "NFO"
+        expiries = self.expiry_calendar.get(symbol, options_exchange)
+        return expiries.tagged() if expiries else []
+    
     def _generate_fallback_expiry_dates(self):
         """Generate fallback expiry dates for testing or when API fails"""
         try:
-            # Create weekly Thursday expiry for next 4 weeks
-            expiry_dates = []
-            
-            # Get current date
-            current_date = datetime.now()
-            
-            # Find next Thursday
-            days_until_thursday = (3 - current_date.weekday()) % 7
-            if days_until_thursday == 0 and current_date.hour >= 15:  # After market close
-                days_until_thursday = 7
-            
-            next_thursday = current_date + timedelta(days=days_until_thursday)
-            
-            # Get next 4 Thursdays
-            for i in range(4):
-                expiry_date = next_thursday + timedelta(days=i*7)
-                # Format as DDMMMYYYY (e.g., 25APR2024)
-                expiry_str = expiry_date.strftime("%d%b%Y").upper()
-                expiry_dates.append(expiry_str)
+            # Only used before any instrument master has been loaded
+            expiry_dates = projected_weekly_expiries(4)
             
             logger.info(f"Generated fallback expiry dates: {expiry_dates}")
             return expiry_dates
@@ -284,29 +291,6 @@ class OptionsProcessor:
             # Hardcoded fallback as last resort
             return ["25APR2025", "02MAY2025", "09MAY2025", "16MAY2025"]
     
-    def calculate_moneyness(self, underlying_price, strike_price, option_type):
-        """Calculate if option is ITM, ATM, or OTM"""
-        try:
-            price_diff_percent = abs(underlying_price - strike_price) / underlying_price * 100
-            
-            # Define ATM as within 0.5% of current price
-            if price_diff_percent <= 0.5:
-                return "ATM"
-            
-            if option_type == "CE":  # Call option
-                if underlying_price > strike_price:
-                    return "ITM"
-                else:
-                    return "OTM"
-            else:  # Put option
-                if underlying_price < strike_price:
-                    return "ITM"
-                else:
-                    return "OTM"
-        except Exception as e:
-            logger.warning(f"Error calculating moneyness: {str(e)}")
-            return "UNKNOWN"
-    
     def _get_default_step_size(self, symbol, underlying_price):
         """Get default step size based on symbol"""
         symbol_upper = symbol.upper()
@@ -325,102 +309,146 @@ class OptionsProcessor:
         symbol = row['symbol']
         token = row['token']
         
-        # Check cache first
-        cache_key = f"{options_exchange}:{symbol}"
-        if cache_key in self.option_price_cache:
-            cached_data = self.option_price_cache[cache_key]
-            if time.time() - cached_data['timestamp'] < self.price_cache_ttl:
-                return cached_data['price']
-        
-        # Try to get live price
-        for attempt in range(max_retries):
-            try:
-                # Get LTP data - try different access methods
+        def fetch_with_retries():
+            for attempt in range(max_retries):
                 try:
-                    ltp_data = client.smart_api.ltpData(options_exchange, symbol, token)
-                except AttributeError:
-                    # If client.smart_api.ltpData fails, try direct access
-                    ltp_data = client.ltpData(options_exchange, symbol, token)
-                
-                if ltp_data.get('status'):
-                    option_price = float(ltp_data['data']['ltp'])
-                    # Cache the successful result
-                    self.option_price_cache[cache_key] = {'price': option_price, 'timestamp': time.time()}
-                    # Successful LTP call - decrease failure counter and backoff time
-                    self.ltp_failures = max(0, self.ltp_failures - 1)
-                    self.ltp_backoff_time = max(1.0, self.ltp_backoff_time / 2)
-                    return option_price
+                    # The client's rate limiter spaces these calls to the broker's limits
+                    option_price = fetch_ltp(client, options_exchange, symbol, token)
+                    if option_price is not None:
+                        return option_price
+                    
+                    time.sleep(0.1)  # Short delay before retry
                 
-                # If we got a response but status is False, count as failure
-                self.ltp_failures += 1
-                time.sleep(0.1)  # Short delay before retry
+                except Exception as e:
+                    logger.warning(f"Error getting price for {symbol} (attempt {attempt+1}): {str(e)}")
+                    time.sleep(0.1)  # Short delay before retry
             
-            except Exception as e:
-                logger.warning(f"Error getting price for {symbol} (attempt {attempt+1}): {str(e)}")
-                self.ltp_failures += 1
-                time.sleep(0.1)  # Short delay before retry
+            return None
         
-        # Generate mock price if all retries fail
-        return None
+        # Live WebSocket tick first, then a recent REST price, then ltpData with retries
+        return price_resolver.resolve(options_exchange, token, fetch_with_retries)
     
-    def _batch_fetch_options(self, client, options_items, options_exchange, underlying_price, option_type):
-        """Process a batch of options concurrently"""
-        results = []
-        max_workers = min(10, len(options_items))  # Cap maximum workers
+    def _fetch_bulk_quotes(self, client, options_exchange, tokens):
+        """Quote many contracts with chunked getMarketData calls, returns {token: quote}"""
+        smart_api = getattr(client, 'smart_api', client)
+        if not hasattr(smart_api, 'getMarketData'):
+            return {}
         
-        # Check if circuit breaker is active
-        if self.ltp_failures >= self.ltp_failure_threshold:
-            logger.warning(f"Circuit breaker active - backing off for {self.ltp_backoff_time}s")
-            time.sleep(self.ltp_backoff_time)
-            # Increase backoff time for next failure (up to 30s)
-            self.ltp_backoff_time = min(30, self.ltp_backoff_time * 2)
-            # Reset failure counter
-            self.ltp_failures = 0
+        start_time = time.time()
+        # Concurrent chain requests for the same contracts share one set of calls
+        quotes = market_data_flights.do(("getMarketData", options_exchange, tuple(tokens)),
+                                        lambda: fetch_quotes(smart_api, options_exchange, tokens, MODE_FULL,
+                                                             executor=market_data_executor))
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for row in options_items:
-                future = executor.submit(self._get_option_price, client, options_exchange, row)
-                futures.append((future, row))
-            
+        for token, quote in quotes.items():
+            price_store.put(options_exchange, token, quote['ltp'], SOURCE_REST, quote=quote,
+                            timestamp=quote['timestamp'])
+        
+        elapsed_ms = (time.time() - start_time) * 1000
+        logger.info(f"Bulk quotes: {len(quotes)}/{len(tokens)} {options_exchange} contracts in {elapsed_ms:.1f}ms")
+        return quotes
+    
+    def _select_columns(self, chain_slice, positions):
+        """Token, symbol, strike and lot size columns of the contracts at the given slice positions"""
+        if chain_slice is None or not len(positions):
+            return [], [], np.empty(0), np.empty(0, dtype=np.int32)
+        
+        # Already ascending by strike
+        tokens = chain_slice.tokens[positions].astype(str).tolist()
+        symbols = [chain_slice.symbols[i] for i in positions.tolist()]
+        strikes = chain_slice.strikes_paise[positions] / PAISE_PER_RUPEE
+        lotsizes = chain_slice.lotsizes[positions]
+        return tokens, symbols, strikes, lotsizes
+    
+    def _fetch_chain_quotes(self, client, options_exchange, symbols, tokens):
+        """Quotes for every contract of a chain (calls and puts together), returns {token: quote}"""
+        # Serve fresh prices from the shared store first (REST quotes or WebSocket ticks)
+        quotes = {}
+        uncached_tokens = []
+        for token in tokens:
+            cached_entry = price_store.get_entry(options_exchange, token)
+            if cached_entry:
+                quotes[token] = cached_entry['quote'] or {'ltp': cached_entry['price']}
+            else:
+                uncached_tokens.append(token)
+        
+        # Quote everything else in as few getMarketData calls as possible
+        if uncached_tokens:
+            quotes.update(self._fetch_bulk_quotes(client, options_exchange, uncached_tokens))
+        
+        # Fall back to per-contract LTP calls only for contracts the bulk call did not return
+        fallback_items = [{'symbol': symbol, 'token': token} for symbol, token in zip(symbols, tokens)
+                          if token not in quotes]
+        if fallback_items:
+            logger.warning(f"Falling back to per-contract LTP calls for {len(fallback_items)} options")
+            futures = [(market_data_executor.submit(self._get_option_price, client, options_exchange, row), row)
+                       for row in fallback_items]
             for future, row in futures:
                 try:
                     option_price = future.result()
-                    
-                    # If we couldn't get a real price, generate a mock one
-                    if option_price is None:
-                        strike = float(row['strike'])
-                        if option_type == 'CE':
-                            if strike < underlying_price:
-                                option_price = max(0.1, underlying_price - strike + 50)
-                            else:
-                                option_price = max(0.1, 50 - (strike - underlying_price) * 0.1)
-                        else:  # PE
-                            if strike > underlying_price:
-                                option_price = max(0.1, strike - underlying_price + 50)
-                            else:
-                                option_price = max(0.1, 50 - (underlying_price - strike) * 0.1)
-                        logger.warning(f"Using mock price for {row['symbol']} after failed API calls")
-                    
-                    # Calculate moneyness
-                    moneyness = self.calculate_moneyness(underlying_price, float(row['strike']), option_type)
-                    
-                    # Add to results list
-                    results.append({
-                        'symbol': row['symbol'],
-                        'token': row['token'],
-                        'expiry': row.get('expiry_str', ''),  # Added this field in filtered DFs
-                        'strike_price': float(row['strike']),
-                        'option_type': option_type,
-                        'last_price': round(option_price, 2),
-                        'moneyness': moneyness,
-                        'lotsize': int(row['lotsize'])
-                    })
-                    
+                    if option_price is not None:
+                        quotes[row['token']] = {'ltp': option_price}
                 except Exception as e:
-                    logger.error(f"Error processing {option_type} option {row['symbol']}: {str(e)}")
+                    logger.error(f"Error fetching price for option {row['symbol']}: {str(e)}")
+        
+        return quotes
+    
+    def _assemble_options(self, columns, quotes, underlying_price, option_type, expiry):
+        """Chain rows for one option type from its columns and the fetched quotes, plus how many have mock prices"""
+        tokens, symbols, strikes, lotsizes = columns
+        if not tokens:
+            return [], 0
+        
+        no_quote = {}
+        last_prices = np.array([quotes.get(token, no_quote).get('ltp', np.nan) for token in tokens], dtype=np.float64)
+        oi = np.array([quotes.get(token, no_quote).get('oi', np.nan) for token in tokens], dtype=np.float64)
+        volume = np.array([quotes.get(token, no_quote).get('volume', np.nan) for token in tokens], dtype=np.float64)
+        
+        # IV and Greeks from real quotes only, cached per batch of identical ticks
+        greeks = None
+        normalized_expiry = normalize_expiry(expiry)
+        if normalized_expiry:
+            try:
+                greeks = greeks_engine.compute(underlying_price, strikes, datetime.strptime(normalized_expiry, '%d%b%Y'),
+                                               last_prices, option_type)
+            except Exception as e:
+                logger.warning(f"Error computing Greeks for {option_type} options: {str(e)}")
+        
+        # If we couldn't get a real price, use a mock one
+        missing = np.isnan(last_prices)
+        if missing.any():
+            last_prices[missing] = mock_prices(strikes[missing], underlying_price, option_type)
+            logger.warning(f"Using mock prices for {int(missing.sum())} {option_type} options after failed API calls")
         
-        return results
+        return chain_records(option_type, expiry, underlying_price, symbols, tokens, strikes, lotsizes,
+                             last_prices, oi, volume, greeks), int(missing.sum())
+    
+    def _get_snapshot_expiries(self, symbol):
+        """Listed expiries of a symbol from the instrument master, nearest first"""
+        options_exchange = "BFO" if symbol.upper() == "SENSEX" else "NFO"
+        return list(self.instrument_index.get_expiries(symbol.upper(), options_exchange))
+    
+    def build_option_chain(self, client, symbol, expiry):
+        """Underlying price plus calls and puts around ATM for one expiry, or None; mocked is set if any price is a placeholder"""
+        underlying_exchange = "BSE" if symbol.upper() == "SENSEX" else "NSE"
+        options_exchange = "BFO" if symbol.upper() == "SENSEX" else "NFO"
+        
+        underlying_price = self.get_underlying_price(client, symbol, underlying_exchange)
+        if underlying_price is None:
+            return None
+        
+        options_data = self.fetch_options_for_expiry(client, symbol, expiry, underlying_price, options_exchange)
+        if not options_data or not options_data.get('calls') or not options_data.get('puts'):
+            return None
+        
+        return {
+            "symbol": symbol,
+            "expiry": expiry,
+            "underlying_price": underlying_price,
+            "calls": options_data['calls'],
+            "puts": options_data['puts'],
+            "mocked": options_data.get('mocked', False)
+        }
     
     def fetch_options_for_expiry(self, client, symbol, expiry, underlying_price, exchange):
         """Fetch option chain for a specific expiry date using the token DataFrame - optimized to fetch only strikes near ATM"""
@@ -433,235 +461,160 @@ class OptionsProcessor:
                 self._clean_price_cache()
                 self.last_cache_clean = current_time
             
-            # Check if token_df is available
-            if self.token_df is None or self.token_df.empty:
+            # Work against one published snapshot for the whole call
+            index = self.instrument_index
+            if index.is_empty():
                 logger.warning("Token DataFrame not available, using mock data")
                 calls, puts = self._create_mock_options(symbol, expiry, underlying_price, num_strikes=6)
-                return {'calls': calls, 'puts': puts}
+                return {'calls': calls, 'puts': puts, 'mocked': True}
             
             # Determine which exchange to use for options
             options_exchange = "NFO"
             if symbol.upper() == "SENSEX":
                 options_exchange = "BFO"
             
-            # Convert expiry string to datetime for filtering
-            try:
-                expiry_date = pd.to_datetime(expiry, format='%d%b%Y')
-            except:
+            # Validate the expiry string before looking up the chain
+            if normalize_expiry(expiry) is None:
                 logger.error(f"Invalid expiry format: {expiry}")
                 calls, puts = self._create_mock_options(symbol, expiry, underlying_price, num_strikes=6)
-                return {'calls': calls, 'puts': puts}
-            
-            # Filter DataFrame for options of the symbol with the given expiry
-            option_chain_df = self.token_df[
-                (self.token_df['exch_seg'] == options_exchange) &
-                (self.token_df['instrumenttype'].isin(['OPTSTK', 'OPTIDX'])) &
-                (self.token_df['name'] == symbol) &
-                (self.token_df['expiry'] == expiry_date)
-            ]
+                return {'calls': calls, 'puts': puts, 'mocked': True}
             
-            # Divide the strike prices by 100
-            option_chain_df = option_chain_df.copy()
-            option_chain_df.loc[:, 'strike'] = option_chain_df['strike'] / 100
+            # Look up the pre-sorted call and put slices for this underlying and expiry
+            calls_slice = index.get_chain(symbol, options_exchange, expiry, 'CE')
+            puts_slice = index.get_chain(symbol, options_exchange, expiry, 'PE')
             
-            if option_chain_df.empty:
+            if calls_slice is None and puts_slice is None:
                 logger.warning(f"No options found for {symbol} expiry {expiry}, using mock data")
                 calls, puts = self._create_mock_options(symbol, expiry, underlying_price, num_strikes=6)
-                return {'calls': calls, 'puts': puts}
-            
-            # Split into calls and puts
-            calls_df = option_chain_df[option_chain_df['symbol'].str.contains('CE')]
-            puts_df = option_chain_df[option_chain_df['symbol'].str.contains('PE')]
-            
-            logger.info(f"Found {len(calls_df)} calls and {len(puts_df)} puts in DataFrame")
-            
-            # Determine step size based on symbol and actual data
-            all_strikes = sorted(option_chain_df['strike'].unique())
-            
-            # Calculate step size from the dataset if possible
-            if len(all_strikes) >= 2:
-                diffs = [all_strikes[i+1] - all_strikes[i] for i in range(len(all_strikes)-1)]
-                # Find most common difference
-                step_counter = Counter(diffs)
-                if step_counter:
-                    common_step = step_counter.most_common(1)[0][0]
-                    step = common_step
-                    logger.info(f"Dynamically determined step size: {step} from strike price data")
-                else:
-                    # Use symbol-based logic as fallback
-                    step = self._get_default_step_size(symbol, underlying_price)
-                    logger.info(f"Using default step size: {step} for {symbol}")
+                return {'calls': calls, 'puts': puts, 'mocked': True}
+            
+            logger.info(f"Found {len(calls_slice or [])} calls and {len(puts_slice or [])} puts in index")
+            
+            # Strike ladder (sorted strikes + modal step) is built with the index
+            ladder = index.get_ladder(symbol, options_exchange, expiry)
+            num_strikes = 6  # Number of strikes above and below ATM
+            
+            if ladder is not None and ladder.step_paise > 0:
+                atm_strike = ladder.atm(underlying_price)
+                target_strikes = ladder.window(underlying_price, num_strikes)
+                logger.info(f"Using strike ladder step size: {ladder.step} for {symbol}")
             else:
                 # Use symbol-based logic as fallback
                 step = self._get_default_step_size(symbol, underlying_price)
                 logger.info(f"Using default step size: {step} for {symbol}")
-
-            # Calculate ATM strike (round to nearest step)
-            atm_strike = round(underlying_price / step) * step
-            
-            # Determine strikes to fetch (6 above and 6 below ATM)
-            num_strikes = 6  # Number of strikes above and below ATM
-            target_strikes = []
-            for i in range(-num_strikes, num_strikes + 1):
-                strike = atm_strike + (i * step)
-                if strike > 0:  # Skip negative strikes
-                    target_strikes.append(strike)
-            
-            # Filter calls and puts for target strikes only
-            filtered_calls_df = calls_df[calls_df['strike'].isin(target_strikes)]
-            filtered_puts_df = puts_df[puts_df['strike'].isin(target_strikes)]
-            
-            # Add expiry string for each row (needed for parallel processing)
-            filtered_calls_df['expiry_str'] = expiry
-            filtered_puts_df['expiry_str'] = expiry
-            
-            logger.info(f"Filtered to {len(filtered_calls_df)} calls and {len(filtered_puts_df)} puts around ATM strike {atm_strike}")
-            
-            # Process calls and puts in parallel batches
-            calls = self._batch_fetch_options(client, filtered_calls_df.to_dict('records'), 
-                                             options_exchange, underlying_price, 'CE')
-            puts = self._batch_fetch_options(client, filtered_puts_df.to_dict('records'), 
-                                            options_exchange, underlying_price, 'PE')
-            
-            # Sort by strike price
-            calls = sorted(calls, key=lambda x: x['strike_price'])
-            puts = sorted(puts, key=lambda x: x['strike_price'])
+                
+                # Calculate ATM strike (round to nearest step)
+                atm_strike = round(underlying_price / step) * step
+                
+                # Determine strikes to fetch (6 above and 6 below ATM)
+                target_strikes = []
+                for i in range(-num_strikes, num_strikes + 1):
+                    strike = atm_strike + (i * step)
+                    if strike > 0:  # Skip negative strikes
+                        target_strikes.append(strike)
+            
+            # Binary-search all target strikes in the call and put slices at once
+            call_positions = calls_slice.positions(target_strikes) if calls_slice is not None else np.empty(0, dtype=np.int64)
+            put_positions = puts_slice.positions(target_strikes) if puts_slice is not None else np.empty(0, dtype=np.int64)
+            
+            logger.info(f"Filtered to {len(call_positions)} calls and {len(put_positions)} puts around ATM strike {atm_strike}")
+            
+            # Quote calls and puts in one batch, then assemble each side sorted by strike
+            call_columns = self._select_columns(calls_slice, call_positions)
+            put_columns = self._select_columns(puts_slice, put_positions)
+            quotes = self._fetch_chain_quotes(client, options_exchange,
+                                              call_columns[1] + put_columns[1], call_columns[0] + put_columns[0])
+            calls, mocked_calls = self._assemble_options(call_columns, quotes, underlying_price, 'CE', expiry)
+            puts, mocked_puts = self._assemble_options(put_columns, quotes, underlying_price, 'PE', expiry)
+            mocked = bool(mocked_calls or mocked_puts)
             
             # If no options found with prices, create mock data
             if not calls and not puts:
                 logger.warning(f"No options found with prices for {symbol}/{expiry}, creating mock data")
                 calls, puts = self._create_mock_options(symbol, expiry, underlying_price, num_strikes=6)
+                mocked = True
             
             logger.info(f"Prepared {len(calls)} calls and {len(puts)} puts for {symbol}/{expiry}")
-            return {'calls': calls, 'puts': puts}
+            return {'calls': calls, 'puts': puts, 'mocked': mocked}
             
         except Exception as e:
             logger.error(f"Error fetching options for {symbol}/{expiry}: {str(e)}")
             # Return mock data for testing/fallback
             calls, puts = self._create_mock_options(symbol, expiry, underlying_price, num_strikes=6)
-            return {'calls': calls, 'puts': puts}
+            return {'calls': calls, 'puts': puts, 'mocked': True}
     
     def _clean_price_cache(self):
         """Clean up expired cache entries"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, entry in self.option_price_cache.items():
-            if current_time - entry['timestamp'] > self.price_cache_ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            self.option_price_cache.pop(key, None)
+        removed = price_store.purge_expired()
         
-        if expired_keys:
-            logger.info(f"Cleaned {len(expired_keys)} expired entries from price cache")
-
- 
-
-
-
+        if removed:
+            logger.info(f"Cleaned {removed} expired entries from price cache")
+    
     def get_option_contract(self, client, symbol, expiry, strike, option_type):
-        """Get a specific option contract by symbol, expiry, strike and type with dynamic step calculation"""
+        """Get a specific option contract by symbol, expiry, strike and type, snapping to the nearest listed strike"""
         try:
             logger.info(f"Looking for option contract: {symbol} {expiry} {strike} {option_type}")
             
-            # Check if token_df is available
-            if self.token_df is None or self.token_df.empty:
-                logger.warning("Token DataFrame not available, using constructed data")
-                return self._construct_mock_option_contract(symbol, expiry, strike, option_type)
+            # Work against one published snapshot for the whole call
+            generation = self.contract_cache.generation
+            index = self.instrument_index
+            if index.is_empty():
+                logger.warning("Instrument master not loaded yet, cannot look up the option contract")
+                return None
             
             # Determine which exchange to use for options
             options_exchange = "NFO"
             if symbol.upper() == "SENSEX":
                 options_exchange = "BFO"
             
-            # Convert expiry string to datetime for filtering
-            try:
-                expiry_date = pd.to_datetime(expiry, format='%d%b%Y')
-            except:
+            # Validate the expiry string before looking up the chain
+            if normalize_expiry(expiry) is None:
                 logger.error(f"Invalid expiry format: {expiry}")
                 return self._construct_mock_option_contract(symbol, expiry, strike, option_type)
             
-            # First, let's get all options for this symbol and expiry to determine the correct step size
-            option_chain_df = self.token_df[
-                (self.token_df['exch_seg'] == options_exchange) &
-                (self.token_df['instrumenttype'].isin(['OPTSTK', 'OPTIDX'])) &
-                (self.token_df['name'] == symbol) &
-                (self.token_df['expiry'] == expiry_date)
-            ]
-            
-            # Divide the strike prices by 100 (since they're stored multiplied by 100)
-            option_chain_df['strike'] = option_chain_df['strike'] / 100
-            
-            if not option_chain_df.empty:
-                # Get all strikes and sort them
-                all_strikes = sorted(option_chain_df['strike'].unique())
-                
-                # Dynamically determine step size if possible
-                step = None
-                if len(all_strikes) >= 2:
-                    # Calculate differences between adjacent strikes
-                    diffs = [all_strikes[i+1] - all_strikes[i] for i in range(len(all_strikes)-1)]
-                    # Find most common difference using Counter
-                    from collections import Counter
-                    step_counter = Counter(diffs)
-                    if step_counter:
-                        # Get the most common step size
-                        common_step = step_counter.most_common(1)[0][0]
-                        step = common_step
-                        logger.info(f"Dynamically determined step size: {step} for {symbol}")
-                        
-                        # Find the nearest valid strike based on the actual available strikes
-                        nearest_strike = min(all_strikes, key=lambda x: abs(x - float(strike)))
-                        logger.info(f"Adjusted to nearest available strike: {nearest_strike} (original: {strike})")
-                        
-                        # Update strike to nearest valid value
-                        strike = nearest_strike
-            
             # Ensure strike is a number
             try:
                 strike_value = float(strike)
             except (ValueError, TypeError):
                 logger.error(f"Invalid strike value: {strike}")
                 return self._construct_mock_option_contract(symbol, expiry, strike, option_type)
-                
-            # Now filter for the specific option contract
-            contract_df = self.token_df[
-                (self.token_df['exch_seg'] == options_exchange) &
-                (self.token_df['instrumenttype'].isin(['OPTSTK', 'OPTIDX'])) &
-                (self.token_df['name'] == symbol) &
-                (self.token_df['expiry'] == expiry_date) &
-                (self.token_df['strike'] == strike_value * 100) &  # Multiply by 100 for internal representation
-                (self.token_df['symbol'].str.contains(option_type))
-            ]
-            
-            if contract_df.empty:
+            
+            # Repeated alerts on the same strike resolve from the LRU cache
+            cache_key = (symbol, normalize_expiry(expiry), strike_value, option_type)
+            cached_contract = self.contract_cache.get(cache_key)
+            if cached_contract is not None:
+                cached_contract["expiry"] = expiry
+                return cached_contract
+            
+            chain_slice = index.get_chain(symbol, options_exchange, expiry, option_type)
+            if chain_slice is None or not len(chain_slice):
                 logger.warning(f"No option contract found for {symbol} {expiry} {strike} {option_type}")
                 return self._construct_mock_option_contract(symbol, expiry, strike, option_type)
             
-            # Get the first contract (should be only one)
-            contract = contract_df.iloc[0]
+            # Find the nearest valid strike based on the actual available strikes
+            i = chain_slice.nearest(strike_value)
+            nearest_strike = chain_slice.strike(i)
+            if nearest_strike != strike_value:
+                logger.info(f"Adjusted to nearest available strike: {nearest_strike} (original: {strike})")
+            strike_value = nearest_strike
             
             # Get lotsize safely
-            lotsize = 1
-            if 'lotsize' in contract:
-                try:
-                    lotsize = int(contract['lotsize'])
-                except (ValueError, TypeError):
-                    lotsize = self._get_default_lot_size(symbol)
-            else:
+            try:
+                lotsize = int(chain_slice.lotsizes[i])
+            except (ValueError, TypeError):
                 lotsize = self._get_default_lot_size(symbol)
                 
             # Create the contract object
             option_contract = {
-                "symbol": contract['symbol'],
-                "token": str(contract['token']),  # Ensure token is a string
+                "symbol": chain_slice.symbols[i],
+                "token": str(chain_slice.tokens[i]),  # Ensure token is a string
                 "strike_price": strike_value,
                 "option_type": option_type,
                 "expiry": expiry,
                 "lotsize": lotsize
             }
             
+            self.contract_cache.put(cache_key, option_contract, generation)
             return option_contract
         except Exception as e:
             logger.error(f"Error getting option contract: {str(e)}")
@@ -711,183 +664,49 @@ class OptionsProcessor:
             return 10
         else:
             return 1  # Default for stocks
-
-
-
-
-
+    
     def _create_mock_options(self, symbol, expiry, underlying_price, num_strikes=6):
         """Create mock option data for testing or when API fails"""
         try:
-            calls = []
-            puts = []
-            
             # Get step size based on symbol
             step = self._get_default_step_size(symbol, underlying_price)
             
             # Determine lot size based on symbol
-            lot_size = 50  # Default
-            if symbol.upper() == "NIFTY":
-                lot_size = 50
-            elif symbol.upper() == "BANKNIFTY":
-                lot_size = 15
-            elif symbol.upper() == "MIDCPNIFTY":
-                lot_size = 75
-            elif symbol.upper() == "SENSEX":
-                lot_size = 10
-            else:
-                lot_size = 1000  # Default lot size for stocks
+            lot_size = {"NIFTY": 50, "BANKNIFTY": 15, "MIDCPNIFTY": 75, "SENSEX": 10}.get(symbol.upper(), 1000)
             
-            # Calculate ATM strike (round to nearest step)
+            # Strikes around ATM (rounded to nearest step), skipping non-positive strikes
             atm_strike = round(underlying_price / step) * step
+            strikes = atm_strike + np.arange(-num_strikes, num_strikes + 1) * step
+            strikes = strikes[strikes > 0].astype(np.float64)
+            strike_labels = strikes.astype(np.int64).tolist()
+            lotsizes = np.full(len(strikes), lot_size)
             
-            # Generate strikes above and below ATM
-            for i in range(-num_strikes, num_strikes + 1):
-                strike = atm_strike + (i * step)
-                
-                # Skip negative strikes
-                if strike <= 0:
-                    continue
-                
-                # Create call option
-                call_price = 0.0
-                if strike < underlying_price:
-                    call_price = max(0.1, underlying_price - strike + 50)
-                else:
-                    call_price = max(0.1, 50 - (strike - underlying_price) * 0.1)
-                
-                # Calculate moneyness
-                call_moneyness = self.calculate_moneyness(underlying_price, strike, "CE")
-                
-                # Create call token with special format
-                call_token = f"1{str(int(strike)).zfill(5)}1"
-                
-                # Format expiry part for symbol (3-letter month + 2-digit day)
-                expiry_date = datetime.strptime(expiry, '%d%b%Y')
-                expiry_short = expiry_date.strftime("%b%d").upper()
-                
-                # Create call symbol
-                call_symbol = f"{symbol}{expiry_short}CE{int(strike)}"
-                
-                calls.append({
-                    'symbol': call_symbol,
-                    'token': call_token,
-                    'expiry': expiry,
-                    'strike_price': strike,
-                    'option_type': 'CE',
-                    'last_price': round(call_price, 2),
-                    'moneyness': call_moneyness,
-                    'lotsize': lot_size
-                })
-                
-                # Create put option
-                put_price = 0.0
-                if strike > underlying_price:
-                    put_price = max(0.1, strike - underlying_price + 50)
-                else:
-                    put_price = max(0.1, 50 - (underlying_price - strike) * 0.1)
-                
-                # Calculate moneyness
-                put_moneyness = self.calculate_moneyness(underlying_price, strike, "PE")
-                
-                # Create put token with special format
-                put_token = f"1{str(int(strike)).zfill(5)}2"
-                
-                # Create put symbol
-                put_symbol = f"{symbol}{expiry_short}PE{int(strike)}"
-                
-                puts.append({
-                    'symbol': put_symbol,
-                    'token': put_token,
-                    'expiry': expiry,
-                    'strike_price': strike,
-                    'option_type': 'PE',
-                    'last_price': round(put_price, 2),
-                    'moneyness': put_moneyness,
-                    'lotsize': lot_size
-                })
-            
-            return calls, puts
+            # Format expiry part for symbol (3-letter month + 2-digit day)
+            expiry_short = datetime.strptime(expiry, '%d%b%Y').strftime("%b%d").upper()
+            
+            chain = {}
+            for option_type, token_suffix in (('CE', 1), ('PE', 2)):
+                chain[option_type] = chain_records(
+                    option_type, expiry, underlying_price,
+                    [f"{symbol}{expiry_short}{option_type}{strike}" for strike in strike_labels],
+                    [f"1{str(strike).zfill(5)}{token_suffix}" for strike in strike_labels],
+                    strikes, lotsizes, mock_prices(strikes, underlying_price, option_type)
+                )
+            
+            return chain['CE'], chain['PE']
             
         except Exception as e:
             logger.error(f"Error creating mock options: {str(e)}")
             return [], []
     
     def get_fno_symbols(self, client):
-        """Get list of all F&O symbols using the token DataFrame"""
-        try:
-            # Start with indices
-            fno_symbols = [
-                {"symbol": "NIFTY", "name": "Nifty 50", "exchange": "NSE", "type": "Index"},
-                {"symbol": "BANKNIFTY", "name": "Bank Nifty", "exchange": "NSE", "type": "Index"},
-                {"symbol": "FINNIFTY", "name": "Financial Services Nifty", "exchange": "NSE", "type": "Index"},
-                {"symbol": "MIDCPNIFTY", "name": "Midcap Nifty", "exchange": "NSE", "type": "Index"},
-                {"symbol": "SENSEX", "name": "BSE Sensex", "exchange": "BSE", "type": "Index"}
-            ]
-
-            # Check if token_df is available
-            if self.token_df is None or self.token_df.empty:
-                logger.warning("Token DataFrame not available, using default list of symbols")
-                return fno_symbols
-            
-            # Get unique stock option symbols from NFO
-            try:
-                # Filter for OPTSTK (stock options) only
-                stock_options = self.token_df[(self.token_df['exch_seg'] == 'NFO') & 
-                                             (self.token_df['instrumenttype'] == 'OPTSTK')]
-                
-                # Get unique stock names
-                unique_stocks = stock_options['name'].unique()
-                
-                # Add to symbols list
-                for stock in unique_stocks:
-                    # Skip if already in the list
-                    if any(s['symbol'] == stock for s in fno_symbols):
-                        continue
-                        
-                    fno_symbols.append({
-                        "symbol": stock,
-                        "name": stock,
-                        "exchange": "NSE",
-                        "type": "Stock"
-                    })
-            except Exception as e:
-                logger.warning(f"Error getting stock options from DataFrame: {str(e)}")
-                # Add some default stocks as fallback
-                default_stocks = [
-                    "RELIANCE", "TCS", "HDFCBANK", "INFY", "HINDUNILVR", "ICICIBANK", "ITC", "KOTAKBANK",
-                    "AXISBANK", "SBIN", "BAJFINANCE", "BHARTIARTL", "ASIANPAINT", "MARUTI", "HCLTECH",
-                    "ADANIPORTS", "M&M", "TITAN", "ULTRACEMCO", "SUNPHARMA", "TATASTEEL", "JSWSTEEL", 
-                    "HINDALCO", "NTPC", "POWERGRID", "ONGC", "COALINDIA", "BPCL", "WIPRO", "TATAMOTORS"
-                ]
-                
-                for stock in default_stocks:
-                    # Skip if already in the list
-                    if any(s['symbol'] == stock for s in fno_symbols):
-                        continue
-                        
-                    fno_symbols.append({
-                        "symbol": stock,
-                        "name": stock,
-                        "exchange": "NSE",
-                        "type": "Stock"
-                    })
-            
-            logger.info(f"Prepared list of {len(fno_symbols)} F&O symbols")
-            return fno_symbols
-            
-        except Exception as e:
-            logger.error(f"Error getting F&O symbols: {str(e)}")
-            # Return just indices as fallback
-            return [
-                {"symbol": "NIFTY", "name": "Nifty 50", "exchange": "NSE", "type": "Index"},
-                {"symbol": "BANKNIFTY", "name": "Bank Nifty", "exchange": "NSE", "type": "Index"},
-                {"symbol": "FINNIFTY", "name": "Financial Services Nifty", "exchange": "NSE", "type": "Index"},
-                {"symbol": "MIDCPNIFTY", "name": "Midcap Nifty", "exchange": "NSE", "type": "Index"}
-            ]
-
-
-
+        """Get list of all F&O symbols, precomputed with each instrument master"""
+        return self.master.fno_universe.symbols
+    
+    def get_fno_universe(self):
+        """F&O universe of the current master with its pre-serialized JSON payload and ETag"""
+        return self.master.fno_universe
+    
     def process_option_signal(self, webhook_data, active_clients=None):
         """Process a trading signal for options - delegate to trade manager"""
         # Use current active clients if none provided
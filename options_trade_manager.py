@@ -1,15 +1,23 @@
 import logging
 import json
 import os
+import threading
 import uuid
 from datetime import datetime, timedelta
 import time
 
 # Import WebSocket manager
 from angel_websocket_manager import websocket_manager as websocket_manager
+from price_resolver import price_resolver
+from client_pool import market_data_pool
+from order_dispatcher import order_dispatcher
+from order_status import order_status_registry
 
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the order update stream before polling the order book
+ORDER_UPDATE_TIMEOUT = 5
+
 class OptionsTradeManager:
     def __init__(self, json_file_path="option_trades.json"):
         self.active_option_trades = {}
@@ -18,7 +26,7 @@ class OptionsTradeManager:
         self.completed_trades_file = "completed_option_trades.json"
         self.last_save_time = datetime.now()
         self.auto_save_interval = timedelta(minutes=1)  # Auto-save every minute
-        self.file_lock = None  # Will be initialized if needed for thread-safety
+        self.file_lock = threading.RLock()  # Guards active_option_trades and the trades file across signal workers
         
         # WebSocket related members
         self.websocket_manager = None
@@ -35,8 +43,9 @@ class OptionsTradeManager:
         # Reconcile with actual positions to ensure accuracy
         self.reconcile_with_broker_positions()
         
-        # Connect to WebSocket if provided
-        if self.websocket_manager and self.websocket_manager.is_connected():
+        # Connect to WebSocket if provided, unless the trade monitor already handles its order updates
+        if (self.websocket_manager and self.websocket_manager.is_connected() and
+                not self.websocket_manager.on_order_update):
             # Set up order status callback
             self.websocket_manager.on_order_update = self._handle_order_update
         
@@ -45,24 +54,25 @@ class OptionsTradeManager:
     def save_trades_to_json(self):
         """Save active trades to JSON file"""
         try:
-            # Convert datetime objects to strings for JSON serialization
-            serializable_trades = {}
-            for key, trade in self.active_option_trades.items():
-                # Create a copy of the trade to avoid modifying the original
-                trade_copy = trade.copy()
+            with self.file_lock:
+                # Convert datetime objects to strings for JSON serialization
+                serializable_trades = {}
+                for key, trade in self.active_option_trades.items():
+                    # Create a copy of the trade to avoid modifying the original
+                    trade_copy = trade.copy()
                 
-                # Convert datetime objects to strings
-                if isinstance(trade_copy.get("entry_time"), datetime):
-                    trade_copy["entry_time"] = trade_copy["entry_time"].strftime('%Y-%m-%d %H:%M:%S')
+                    # Convert datetime objects to strings
+                    if isinstance(trade_copy.get("entry_time"), datetime):
+                        trade_copy["entry_time"] = trade_copy["entry_time"].strftime('%Y-%m-%d %H:%M:%S')
                 
-                serializable_trades[key] = trade_copy
+                    serializable_trades[key] = trade_copy
             
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(os.path.abspath(self.json_file_path)), exist_ok=True)
+                # Create directory if it doesn't exist
+                os.makedirs(os.path.dirname(os.path.abspath(self.json_file_path)), exist_ok=True)
             
-            # Write to JSON file
-            with open(self.json_file_path, 'w') as f:
-                json.dump(serializable_trades, f, indent=2)
+                # Write to JSON file
+                with open(self.json_file_path, 'w') as f:
+                    json.dump(serializable_trades, f, indent=2)
                 
             logger.debug(f"Successfully saved {len(serializable_trades)} trades to {self.json_file_path}")
             return True
@@ -97,11 +107,28 @@ class OptionsTradeManager:
             logger.error(f"Error loading trades from JSON: {str(e)}")
             return False
     
+    def _receives_order_updates(self, client):
+        """
+        Whether the order update WebSocket is connected for this client's account.
+        The socket is opened with a single account's session and only carries that
+        account's orders; every other account confirms fills from the order book.
+        """
+        ws = self.websocket_manager
+        return bool(ws and ws.order_connected and getattr(client, 'client_id', None) == ws.client_code)
+
     def verify_order_execution(self, client, order_id, max_retries=3, delay=5):
         """
         Verify if an order was successfully executed
         Returns: (success, order_status, avg_price, filled_qty)
         """
+        # Wait for the final status from the order update stream, poll the order book if it does not arrive
+        if self._receives_order_updates(client):
+            update = order_status_registry.wait(order_id, ORDER_UPDATE_TIMEOUT)
+            if update:
+                status, avg_price, filled_qty = update
+                return True, status, avg_price, filled_qty
+            logger.info(f"No order update for {order_id} within {ORDER_UPDATE_TIMEOUT}s, checking the order book")
+        
         retries = 0
         while retries < max_retries:
             try:
@@ -365,8 +392,8 @@ class OptionsTradeManager:
                 logger.error("No active clients available")
                 return False, [{"error": "No active clients available"}]
                 
-            # Get a reference client for price and option data lookup
-            check_client = next(iter(target_clients.values()))
+            # Get a reference client for price and option data lookup from the shared pool
+            check_client = market_data_pool.get_client() or next(iter(target_clients.values()))
             
             # Get current price if not provided
             if underlying_price <= 0:
@@ -419,107 +446,97 @@ class OptionsTradeManager:
                     "lotsize": specific_option.get("lotsize", 1)
                 }
             else:
-                # Get expiry dates if not specified
-                if not expiry_preference:
-                    logger.info("No expiry preference specified, getting available expiries")
+                # Resolve "weekly"/"monthly"/explicit dates against the expiry calendar
+                resolved_expiry = None
+                if hasattr(price_fetcher, 'resolve_expiry'):
+                    resolved_expiry = price_fetcher.resolve_expiry(symbol, expiry_preference)
+                
+                if resolved_expiry:
+                    logger.info(f"Resolved expiry preference {expiry_preference or 'nearest'} to {resolved_expiry}")
+                else:
+                    logger.info(f"Expiry preference {expiry_preference} not in calendar, getting available expiries")
                     expiries = price_fetcher.get_expiry_dates(check_client, symbol)
                     if not expiries:
                         logger.error(f"No expiry dates available for {symbol}")
                         return False, [{"error": "No expiry dates available"}]
-                    expiry_preference = expiries[0]  # Use nearest expiry
-                
-                # OPTIMIZED APPROACH: Direct strike calculation using dynamic step size - ONCE for all clients
+                    resolved_expiry = expiries[0]  # Use nearest expiry
+                expiry_preference = resolved_expiry
                 
-                # 1. Determine the strike spacing (step size)
-                step = None
+                # OPTIMIZED APPROACH: Direct strike selection from the strike ladder - ONCE for all clients
                 
-                # Try to dynamically determine step size from option chain - fetch only the option type we need
+                # 1. Look up the strike ladder built with the instrument index (no LTP calls needed)
+                ladder = None
                 try:
-                    # Fetch option chain to analyze strike patterns
-                    temp_option_chain = price_fetcher.fetch_options_for_expiry(
-                        check_client, 
-                        symbol, 
-                        expiry_preference, 
-                        underlying_price, 
-                        "NFO" if symbol.upper() != "SENSEX" else "BFO"
-                    )
-                    
-                    # If we got an option chain, extract step size from it
-                    if temp_option_chain:
-                        # We only need the relevant options based on our action/option_type
-                        relevant_options = temp_option_chain.get('calls' if option_type == "CE" else 'puts', [])
-                        if relevant_options:
-                            # Get all unique strikes
-                            all_strikes = sorted(set(opt['strike_price'] for opt in relevant_options))
-                            # Calculate differences between adjacent strikes
-                            if len(all_strikes) >= 2:
-                                diffs = [all_strikes[i+1] - all_strikes[i] for i in range(len(all_strikes)-1)]
-                                # Find most common difference
-                                from collections import Counter
-                                step_counter = Counter(diffs)
-                                if step_counter:
-                                    step = step_counter.most_common(1)[0][0]
-                                    logger.info(f"Dynamically determined step size: {step} for {symbol}")
+                    if hasattr(price_fetcher, 'get_strike_ladder'):
+                        ladder = price_fetcher.get_strike_ladder(symbol, expiry_preference)
                 except Exception as e:
-                    logger.warning(f"Error dynamically determining step size: {str(e)}")
+                    logger.warning(f"Error looking up strike ladder: {str(e)}")
                 
-                # If dynamic determination failed, try price_fetcher
-                if step is None:
+                if ladder is not None and ladder.step_paise > 0:
+                    # 2./3. ATM and target strike are binary searches over the listed strikes
+                    step = ladder.step
+                    atm_strike = ladder.atm(underlying_price)
+                    target_strike = ladder.select(underlying_price, option_moneyness, moneyness_depth, option_type)
+                    logger.info(f"Using strike ladder step size: {step} for {symbol}, ATM strike: {atm_strike}")
+                else:
+                    step = None
+                    
+                    # No ladder for this expiry, try price_fetcher
                     try:
                         if hasattr(price_fetcher, '_get_default_step_size'):
                             step = price_fetcher._get_default_step_size(symbol, underlying_price)
                             logger.info(f"Using default step size: {step} for {symbol}")
                     except Exception as e:
                         logger.warning(f"Could not determine step size using price_fetcher: {str(e)}")
-                
-                # If still no step size, use symbol-based logic as fallback
-                if step is None:
-                    if symbol.upper() == "NIFTY":
-                        step = 50
-                    elif symbol.upper() == "BANKNIFTY" or symbol.upper() == "BANKEX":
-                        step = 100  # Changed from 500 to 100
-                    elif symbol.upper() == "FINNIFTY":
-                        step = 50
-                    elif symbol.upper() == "MIDCPNIFTY":
-                        step = 25
-                    elif symbol.upper() == "SENSEX":
-                        step = 100
-                    elif underlying_price > 5000:
-                        step = 100
-                    elif underlying_price > 1000:
-                        step = 50
-                    elif underlying_price > 500:
-                        step = 20
-                    elif underlying_price > 100:
-                        step = 10
-                    elif underlying_price > 50:
-                        step = 5
-                    else:
-                        step = 2.5
                     
-                    logger.info(f"Using estimated step size: {step} for {symbol}")
-                
-                # 2. Calculate ATM strike (round to nearest step)
-                atm_strike = round(underlying_price / step) * step
-                logger.info(f"Calculated ATM strike: {atm_strike} for underlying price: {underlying_price}")
-                
-                # 3. Calculate the target strike based on moneyness and depth
-                target_strike = atm_strike  # Default to ATM
-                
-                if option_moneyness == "ITM":
-                    # For Calls (CE), ITM means lower strikes
-                    # For Puts (PE), ITM means higher strikes
-                    if option_type == "CE":
-                        target_strike = atm_strike - (moneyness_depth * step)
-                    else:
-                        target_strike = atm_strike + (moneyness_depth * step)
-                elif option_moneyness == "OTM":
-                    # For Calls (CE), OTM means higher strikes
-                    # For Puts (PE), OTM means lower strikes
-                    if option_type == "CE":
-                        target_strike = atm_strike + (moneyness_depth * step)
-                    else:
-                        target_strike = atm_strike - (moneyness_depth * step)
+                    # If still no step size, use symbol-based logic as fallback
+                    if step is None:
+                        if symbol.upper() == "NIFTY":
+                            step = 50
+                        elif symbol.upper() == "BANKNIFTY" or symbol.upper() == "BANKEX":
+                            step = 100  # Changed from 500 to 100
+                        elif symbol.upper() == "FINNIFTY":
+                            step = 50
+                        elif symbol.upper() == "MIDCPNIFTY":
+                            step = 25
+                        elif symbol.upper() == "SENSEX":
+                            step = 100
+                        elif underlying_price > 5000:
+                            step = 100
+                        elif underlying_price > 1000:
+                            step = 50
+                        elif underlying_price > 500:
+                            step = 20
+                        elif underlying_price > 100:
+                            step = 10
+                        elif underlying_price > 50:
+                            step = 5
+                        else:
+                            step = 2.5
+                        
+                        logger.info(f"Using estimated step size: {step} for {symbol}")
+                    
+                    # 2. Calculate ATM strike (round to nearest step)
+                    atm_strike = round(underlying_price / step) * step
+                    logger.info(f"Calculated ATM strike: {atm_strike} for underlying price: {underlying_price}")
+                    
+                    # 3. Calculate the target strike based on moneyness and depth
+                    target_strike = atm_strike  # Default to ATM
+                    
+                    if option_moneyness == "ITM":
+                        # For Calls (CE), ITM means lower strikes
+                        # For Puts (PE), ITM means higher strikes
+                        if option_type == "CE":
+                            target_strike = atm_strike - (moneyness_depth * step)
+                        else:
+                            target_strike = atm_strike + (moneyness_depth * step)
+                    elif option_moneyness == "OTM":
+                        # For Calls (CE), OTM means higher strikes
+                        # For Puts (PE), OTM means lower strikes
+                        if option_type == "CE":
+                            target_strike = atm_strike + (moneyness_depth * step)
+                        else:
+                            target_strike = atm_strike - (moneyness_depth * step)
                 
                 logger.info(f"Selected {option_moneyness} strike: {target_strike} (depth {moneyness_depth})")
                 
@@ -559,23 +576,24 @@ class OptionsTradeManager:
                     logger.error(f"Error getting option contract: {str(e)}")
                     return False, [{"error": f"Error getting option contract: {str(e)}"}]
             
-            # Now process each client with the same option contract
-            for client_id, client in target_clients.items():
-                # Calculate proper quantity based on lot size
-                try:
-                    lot_size = int(option_contract.get('lotsize', 1))
-                except (ValueError, TypeError):
-                    lot_size = 1
-                    
-                adjusted_quantity = quantity
-                if lot_size > 1:
-                    # Adjust quantity to be a multiple of lot size
-                    if quantity < lot_size:
-                        adjusted_quantity = lot_size
-                    else:
-                        # Round to nearest lot
-                        adjusted_quantity = round(quantity / lot_size) * lot_size
+            # Calculate proper quantity based on lot size
+            try:
+                lot_size = int(option_contract.get('lotsize', 1))
+            except (ValueError, TypeError):
+                lot_size = 1
                 
+            adjusted_quantity = quantity
+            if lot_size > 1:
+                # Adjust quantity to be a multiple of lot size
+                if quantity < lot_size:
+                    adjusted_quantity = lot_size
+                else:
+                    # Round to nearest lot
+                    adjusted_quantity = round(quantity / lot_size) * lot_size
+            
+            # Place and verify one client's order with the same option contract.
+            # Returns the result and the trade to monitor (None if the order failed).
+            def place_for_client(client_id, client):
                 # Prepare order parameters
                 order_params = {
                     "variety": "NORMAL",
@@ -655,12 +673,11 @@ class OptionsTradeManager:
                     
                     if not verified or status in ['rejected', 'cancelled']:
                         logger.error(f"Order {order_id} was not executed successfully: {status}")
-                        results.append({
+                        return {
                             "client_id": client_id,
                             "success": False,
                             "message": f"Order was {status}. Please check funds and margins."
-                        })
-                        continue
+                        }, None
                     
                     # Generate a unique trade ID
                     trade_id = str(uuid.uuid4())
@@ -678,9 +695,8 @@ class OptionsTradeManager:
                         except Exception as e:
                             logger.warning(f"Could not get entry price for {option_contract['symbol']}: {str(e)}")
                     
-                    # Add to active option trades for monitoring
-                    trade_key = f"{client_id}_{option_contract['symbol']}"
-                    self.active_option_trades[trade_key] = {
+                    # Trade to add to active option trades for monitoring
+                    trade = {
                         "trade_id": trade_id,
                         "client_id": client_id,
                         "symbol": option_contract["symbol"],
@@ -704,12 +720,9 @@ class OptionsTradeManager:
                     
                     # Add entry price if available
                     if entry_price:
-                        self.active_option_trades[trade_key]["entry_price"] = entry_price
+                        trade["entry_price"] = entry_price
                     
-                    # Save the updated trades to JSON
-                    self.save_trades_to_json()
-                    
-                    results.append({
+                    return {
                         "client_id": client_id,
                         "success": True,
                         "trade_id": trade_id,
@@ -732,14 +745,35 @@ class OptionsTradeManager:
                             "ordertype": ordertype,
                             "exit_ordertype": exit_ordertype
                         }
-                    })
+                    }, trade
                 else:
                     logger.error(f"Option order placement failed for client {client_id}")
-                    results.append({
+                    return {
                         "client_id": client_id,
                         "success": False,
                         "message": "Order placement failed"
+                    }, None
+            
+            # Place and verify all clients' orders concurrently on their order workers
+            for client_id, outcome in order_dispatcher.fan_out(dict(target_clients), place_for_client).items():
+                if isinstance(outcome, Exception):
+                    logger.error(f"Error processing option order for client {client_id}: {str(outcome)}")
+                    results.append({
+                        "client_id": client_id,
+                        "success": False,
+                        "message": str(outcome)
                     })
+                    continue
+                
+                result, trade = outcome
+                results.append(result)
+                if trade:
+                    with self.file_lock:
+                        self.active_option_trades[f"{client_id}_{trade['symbol']}"] = trade
+            
+            # Save the new trades to JSON once all clients are done
+            if any(r.get("success", False) for r in results):
+                self.save_trades_to_json()
             
             # Return the results
             successful_orders = sum(1 for r in results if r.get("success", False))
@@ -913,18 +947,8 @@ class OptionsTradeManager:
     def get_option_price(self, client, symbol, token):
         """Get current price of an option"""
         try:
-            # Handle different client structures
-            try:
-                response = client.smart_api.ltpData("NFO", symbol, token)
-            except AttributeError:
-                # Try direct access if smart_api access fails
-                response = client.ltpData("NFO", symbol, token)
-                
-            if response and response.get('status'):
-                return float(response['data']['ltp'])
-            else:
-                logger.error(f"Failed to get LTP for {symbol}: {response.get('message')}")
-                return None
+            # Live WebSocket tick first, then a recent REST price, then ltpData
+            return price_resolver.resolve_ltp(client, "NFO", symbol, token)
         except Exception as e:
             logger.error(f"Error getting option price for {symbol}: {str(e)}")
             return None
@@ -941,8 +965,9 @@ class OptionsTradeManager:
             current_option_price = None
             current_underlying_price = None
             
-            if self.active_clients:
-                check_client = next(iter(self.active_clients.values()))
+            # Spread the price reads across all logged-in accounts
+            check_client = market_data_pool.get_client()
+            if check_client:
                 
                 # Get option price
                 try:
@@ -1014,7 +1039,6 @@ class OptionsTradeManager:
             logger.info("No active trades or clients to check")
             return []
         
-        check_client = next(iter(self.active_clients.values()))
         results = []
         
         # Filter trades if underlying symbol specified
@@ -1033,7 +1057,11 @@ class OptionsTradeManager:
             exchange = trade.get("underlying_exchange", "NSE")
             
             try:
-                # Get current price of underlying
+                # Get current price of underlying, spreading the reads across all logged-in accounts
+                check_client = market_data_pool.get_client()
+                if not check_client:
+                    logger.warning("No active clients available for price checks")
+                    break
                 current_price = self.price_fetcher.get_underlying_price(check_client, symbol, exchange)
                 
                 if current_price is None:
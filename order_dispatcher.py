@@ -0,0 +1,120 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import LatencyStat, TaskTimer
+
+logger = logging.getLogger(__name__)
+
+
+class AccountWorker:
+    """Long-lived thread that runs one account's order calls in submission order"""
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.queue = queue.Queue()
+        self.timer = TaskTimer()
+        self.thread = threading.Thread(target=self._run, name=f"orders-{client_id}", daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self.queue.put((future, fn, args, kwargs, self.timer.submit()))
+        return future
+
+    def stop(self):
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            future, fn, args, kwargs, submitted_at = item
+            if not future.set_running_or_notify_cancel():
+                self.timer.discard()
+                continue
+
+            try:
+                future.set_result(self.timer.run(submitted_at, fn, *args, **kwargs))
+            except Exception as e:
+                logger.error(f"Error in order dispatch for client {self.client_id}: {str(e)}")
+                future.set_exception(e)
+
+    def stats(self):
+        return self.timer.as_dict()
+
+
+class OrderDispatcher:
+    """
+    One warm worker per account for order placement. A signal fan-out is a
+    single enqueue per account and completes in about one broker round-trip
+    (the slowest account), with no thread startup on the webhook path. Calls
+    for the same account stay serialized in arrival order.
+    """
+    def __init__(self):
+        self.workers = {}  # client_id -> AccountWorker
+        self.lock = threading.Lock()
+
+        # Fan-out statistics
+        self.fanouts = LatencyStat()
+
+    def _worker(self, client_id):
+        with self.lock:
+            worker = self.workers.get(client_id)
+            if worker is None:
+                worker = AccountWorker(client_id)
+                self.workers[client_id] = worker
+            return worker
+
+    def warm(self, client_ids):
+        """Start the workers of the given accounts ahead of the first signal"""
+        for client_id in client_ids:
+            self._worker(client_id)
+        logger.info(f"Order dispatcher ready with {len(self.workers)} account workers")
+
+    def submit(self, client_id, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) on the account's worker, returns a Future"""
+        return self._worker(client_id).submit(fn, *args, **kwargs)
+
+    def fan_out(self, clients, fn, *args, **kwargs):
+        """
+        Run fn(client_id, client, *args, **kwargs) for every account concurrently.
+        Returns {client_id: result}; an account whose call raised maps to the exception.
+        """
+        start_time = time.perf_counter()
+        futures = {client_id: self.submit(client_id, fn, client_id, client, *args, **kwargs)
+                   for client_id, client in clients.items()}
+
+        results = {}
+        for client_id, future in futures.items():
+            try:
+                results[client_id] = future.result()
+            except Exception as e:
+                results[client_id] = e
+
+        with self.lock:
+            self.fanouts.record(time.perf_counter() - start_time)
+        return results
+
+    def shutdown(self):
+        """Stop all workers once their queued calls are done"""
+        with self.lock:
+            workers = list(self.workers.values())
+            self.workers = {}
+        for worker in workers:
+            worker.stop()
+
+    def stats(self):
+        """Fan-out latency and per-account queue and latency counters"""
+        with self.lock:
+            workers = dict(self.workers)
+            fanout = {"fanouts": self.fanouts.count, **self.fanouts.as_dict("fanout")}
+        fanout["accounts"] = {client_id: worker.stats() for client_id, worker in workers.items()}
+        return fanout
+
+
+# Shared by every order fan-out
+order_dispatcher = OrderDispatcher()
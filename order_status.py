@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import LatencyStat
+
+logger = logging.getLogger(__name__)
+
+# Order statuses after which an order does not change any more, as the order book reports them
+FINAL_STATUSES = ['complete', 'filled', 'cancelled', 'rejected']
+
+# order-status codes of the order update stream, for updates without a status text
+STATUS_CODES = {
+    "AB01": "open",
+    "AB02": "cancelled",
+    "AB03": "rejected",
+    "AB04": "modified",
+    "AB05": "complete",
+    "AB06": "after market order req received",
+    "AB07": "cancelled after market order",
+    "AB08": "modify after market order req received"
+}
+
+
+class OrderState:
+    """Latest update of one order from the order update stream"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.status = None
+        self.avg_price = 0.0
+        self.filled_qty = 0
+        self.registered_at = time.perf_counter()
+        self.updated_at = None
+
+    def update(self, status, avg_price, filled_qty):
+        self.status = status
+        self.avg_price = avg_price
+        self.filled_qty = filled_qty
+        self.updated_at = time.perf_counter()
+        if status in FINAL_STATUSES:
+            self.done.set()
+
+
+class OrderStatusRegistry:
+    """
+    Order statuses pushed by the order update WebSocket, keyed by order ID.
+    Placement waits here for the final update of its order instead of polling
+    the order book; updates that arrive before anyone waits are kept, bounded
+    to the most recent max_size orders.
+    """
+    def __init__(self, max_size=2000):
+        self.max_size = max_size
+        self.orders = OrderedDict()  # order_id -> OrderState
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.updates = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.confirm_time = LatencyStat()
+
+    def _state(self, order_id):
+        state = self.orders.get(order_id)
+        if state is None:
+            state = OrderState()
+            self.orders[order_id] = state
+            while len(self.orders) > self.max_size:
+                self.orders.popitem(last=False)
+        return state
+
+    def update(self, order_data):
+        """Record an order update message (orderData with orderid, status, averageprice, filledshares)"""
+        order_details = order_data.get("orderData") or {}
+        order_id = order_details.get("orderid")
+        if not order_id:
+            return
+
+        status = (order_details.get("status") or STATUS_CODES.get(order_data.get("order-status"), "")).lower()
+        try:
+            avg_price = float(order_details.get("averageprice") or 0)
+            filled_qty = int(float(order_details.get("filledshares") or 0))
+        except (ValueError, TypeError):
+            avg_price, filled_qty = 0.0, 0
+
+        with self.lock:
+            self.updates += 1
+            self._state(str(order_id)).update(status, avg_price, filled_qty)
+
+    def wait(self, order_id, timeout):
+        """
+        Wait up to timeout seconds for the final status of an order.
+        Returns (status, avg_price, filled_qty), or None if it did not arrive.
+        """
+        with self.lock:
+            self.waits += 1
+            state = self._state(str(order_id))
+
+        start_time = time.perf_counter()
+        if not state.done.wait(timeout):
+            with self.lock:
+                self.timeouts += 1
+            return None
+
+        with self.lock:
+            self.confirm_time.record(time.perf_counter() - start_time)
+        return state.status, state.avg_price, state.filled_qty
+
+    def stats(self):
+        """Update and wait counters, and how long confirmations took"""
+        with self.lock:
+            return {
+                "tracked_orders": len(self.orders),
+                "updates": self.updates,
+                "waits": self.waits,
+                "confirmed": self.confirm_time.count,
+                "timeouts": self.timeouts,
+                **self.confirm_time.as_dict("confirm")
+            }
+
+
+# Fed by the order update WebSocket
+order_status_registry = OrderStatusRegistry()
@@ -0,0 +1,103 @@
+import logging
+import threading
+
+from metrics import ratio
+from price_store import price_store, SOURCE_REST, SOURCE_WS
+from single_flight import market_data_flights
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_ltp(client, exchange, symbol, token):
+    """Fetch one last traded price with ltpData, returns None on a failed response"""
+    # Handle different client structures
+    try:
+        response = client.smart_api.ltpData(exchange, symbol, token)
+    except AttributeError:
+        # Try direct access if smart_api access fails
+        response = client.ltpData(exchange, symbol, token)
+
+    if response and response.get('status'):
+        return float(response['data']['ltp'])
+
+    logger.error(f"Failed to get LTP for {symbol}: {response.get('message') if response else 'No response'}")
+    return None
+
+
+class PriceResolver:
+    """
+    WebSocket-first price lookups.
+
+    A read is served from the live tick the market-data socket wrote into the
+    price store while it is younger than the store's tick TTL, then from a recent
+    REST price, and only then from a REST call. Concurrent misses for the same
+    token share one REST call. Counts where every read was served from so the
+    share of network-free reads can be monitored.
+    """
+    def __init__(self, store=price_store, flights=market_data_flights):
+        self.store = store
+        self.flights = flights
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.ws_hits = 0
+        self.rest_cache_hits = 0
+        self.rest_reads = 0  # Reads that needed REST, shared calls included
+        self.rest_calls = 0
+        self.rest_failures = 0
+
+    def _count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def resolve(self, exchange, token, fetch_rest):
+        """
+        Price for (exchange, token). fetch_rest is called without arguments on a
+        miss and returns the REST price or None; its result is stored for reuse.
+        Callers missing on the same token at the same time wait for one fetch.
+        """
+        entry = self.store.get_entry(exchange, token)
+        if entry is not None:
+            self._count('ws_hits' if entry['source'] == SOURCE_WS else 'rest_cache_hits')
+            return entry['price']
+
+        def fetch_and_store():
+            self._count('rest_calls')
+            try:
+                price = fetch_rest()
+            except Exception:
+                self._count('rest_failures')
+                raise
+
+            if price is None:
+                self._count('rest_failures')
+                return None
+
+            self.store.put(exchange, token, price, SOURCE_REST)
+            return price
+
+        self._count('rest_reads')
+        return self.flights.do(("ltpData", exchange, str(token)), fetch_and_store)
+
+    def resolve_ltp(self, client, exchange, symbol, token):
+        """Price for a token, falling back to ltpData on the given client"""
+        return self.resolve(exchange, token, lambda: fetch_ltp(client, exchange, symbol, token))
+
+    def stats(self):
+        """Read counters by source and the ratio of reads served without a REST call"""
+        with self.lock:
+            reads = self.ws_hits + self.rest_cache_hits + self.rest_reads
+            return {
+                "reads": reads,
+                "ws_hits": self.ws_hits,
+                "rest_cache_hits": self.rest_cache_hits,
+                "rest_calls": self.rest_calls,
+                "coalesced_reads": max(0, self.rest_reads - self.rest_calls),
+                "rest_failures": self.rest_failures,
+                "ws_hit_ratio": ratio(self.ws_hits, reads),
+                "hit_ratio": ratio(self.ws_hits + self.rest_cache_hits, reads)
+            }
+
+
+# Shared by every module that reads prices
+price_resolver = PriceResolver()
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import ratio
+
+logger = logging.getLogger(__name__)
+
+# Where a price came from
+SOURCE_REST = "REST"
+SOURCE_WS = "WS"
+
+
+class PriceStore:
+    """
+    Process-wide market price cache keyed by (exchange, token).
+
+    Entries carry the time they were written and their source (REST or WS). REST
+    prices expire after the TTL; WebSocket ticks use their own staleness threshold,
+    since a quiet instrument can go several seconds without a tick while the
+    socket is live. The store is bounded and evicts the least recently used entries. Every operation holds one lock, so WebSocket, monitor
+    and Flask threads can share it.
+    """
+    def __init__(self, ttl=5, max_size=5000, tick_ttl=10):
+        self.ttl = ttl  # Seconds a REST price stays valid
+        self.tick_ttl = tick_ttl  # Seconds a WebSocket tick stays valid
+        self.max_size = max_size
+        self.entries = OrderedDict()  # (exchange, token) -> entry dict
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.writes = {SOURCE_REST: 0, SOURCE_WS: 0}
+
+    def configure(self, ttl=None, max_size=None, tick_ttl=None):
+        """Apply the REST and tick TTLs and the entry limit"""
+        with self.lock:
+            if ttl is not None:
+                self.ttl = float(ttl)
+            if tick_ttl is not None:
+                self.tick_ttl = float(tick_ttl)
+            if max_size is not None:
+                self.max_size = int(max_size)
+                self._evict()
+        logger.info(f"Price store configured with TTL {self.ttl}s, tick TTL {self.tick_ttl}s "
+                    f"and {self.max_size} entries")
+
+    @staticmethod
+    def _key(exchange, token):
+        return (exchange, str(token))
+
+    def _max_age(self, entry):
+        return self.tick_ttl if entry['source'] == SOURCE_WS else self.ttl
+
+    def _evict(self):
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_entry(self, exchange, token, max_age=None):
+        """Fresh entry (price, quote, source, timestamp) for a token, or None"""
+        key = self._key(exchange, token)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry['timestamp'] >= (self._max_age(entry) if max_age is None else max_age):
+                self.misses += 1
+                self.expired += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry)
+
+    def get(self, exchange, token, max_age=None):
+        """Fresh price for a token, or None"""
+        entry = self.get_entry(exchange, token, max_age)
+        return entry['price'] if entry else None
+
+    def put(self, exchange, token, price, source=SOURCE_REST, quote=None, timestamp=None):
+        """Store a price; quote optionally carries OHLC/volume/OI from bulk quotes"""
+        if price is None:
+            return
+
+        key = self._key(exchange, token)
+        entry = {
+            'price': float(price),
+            'timestamp': timestamp or time.time(),
+            'source': source,
+            'quote': quote
+        }
+
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.writes[source] = self.writes.get(source, 0) + 1
+            self._evict()
+
+    def purge_expired(self):
+        """Drop entries older than their TTL, returns the number removed"""
+        now = time.time()
+        with self.lock:
+            expired_keys = [key for key, entry in self.entries.items()
+                            if now - entry['timestamp'] >= self._max_age(entry)]
+            for key in expired_keys:
+                del self.entries[key]
+        return len(expired_keys)
+
+    def stats(self):
+        """Hit/miss counters and size for monitoring"""
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "tick_ttl": self.tick_ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": ratio(self.hits, self.hits + self.misses),
+                "evictions": self.evictions,
+                "writes": dict(self.writes)
+            }
+
+
+# Shared by every module that reads or writes prices
+price_store = PriceStore()
@@ -0,0 +1,137 @@
+import functools
+import logging
+import threading
+import time
+
+from metrics import to_ms
+
+logger = logging.getLogger(__name__)
+
+# SmartAPI rate limits per endpoint, as published by the broker
+ENDPOINT_LIMITS = {
+    "generateSession": {"per_second": 1},
+    "getProfile": {"per_second": 3},
+    "rmsLimit": {"per_second": 2},
+    "placeOrder": {"per_second": 20, "per_minute": 500},
+    "modifyOrder": {"per_second": 20, "per_minute": 500},
+    "cancelOrder": {"per_second": 20, "per_minute": 500},
+    "orderBook": {"per_second": 1},
+    "tradeBook": {"per_second": 1},
+    "individual_order_details": {"per_second": 10},
+    "getPosition": {"per_second": 1},
+    "holding": {"per_second": 1},
+    "ltpData": {"per_second": 10, "per_minute": 500},
+    "getMarketData": {"per_second": 10, "per_minute": 500},
+    "searchScrip": {"per_second": 1},
+    "getCandleData": {"per_second": 3}
+}
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a steady rate. Callers reserve a token and are told
+    how long to wait for it, so concurrent callers queue up in order instead of
+    all retrying at once.
+    """
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)  # Tokens added per second
+        self.capacity = float(capacity)  # Burst size
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def delay(self, now):
+        """Seconds until a token would be available, without taking it"""
+        tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def reserve(self, now):
+        """Take one token, returns the seconds until it is actually available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class AccountRateLimiter:
+    """
+    One token bucket per SmartAPI endpoint for a single account.
+
+    Each bucket refills at the tightest of the endpoint's published limits, and
+    bursts are capped at one call so no one-second or one-minute window can go
+    over the limit while sustained throughput stays at it.
+    """
+    def __init__(self, name, limits=None):
+        self.name = name
+        self.buckets = {}
+        for endpoint, limit in (limits or ENDPOINT_LIMITS).items():
+            rate = min(limit.get("per_second", float('inf')), limit.get("per_minute", float('inf')) / 60)
+            self.buckets[endpoint] = TokenBucket(rate)
+        self.lock = threading.Lock()
+
+        # Statistics per endpoint
+        self.calls = {}
+        self.throttled = {}
+        self.wait_time = {}
+        self.max_wait = {}
+
+    def is_limited(self, endpoint):
+        return endpoint in self.buckets
+
+    def backlog(self, endpoint):
+        """Seconds the next call to an endpoint would wait for its token"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return 0.0
+        with self.lock:
+            return bucket.delay(time.monotonic())
+
+    def acquire(self, endpoint):
+        """Block until the endpoint may be called, returns the seconds waited"""
+        bucket = self.buckets.get(endpoint)
+        if bucket is None:
+            return 0.0
+
+        with self.lock:
+            wait = bucket.reserve(time.monotonic())
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+            if wait > 0:
+                self.throttled[endpoint] = self.throttled.get(endpoint, 0) + 1
+                self.wait_time[endpoint] = self.wait_time.get(endpoint, 0.0) + wait
+                self.max_wait[endpoint] = max(self.max_wait.get(endpoint, 0.0), wait)
+
+        if wait > 0:
+            logger.debug(f"Throttling {endpoint} for {self.name} by {wait * 1000:.0f}ms")
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Calls, throttled calls and wait times per endpoint"""
+        with self.lock:
+            return {
+                endpoint: {
+                    "rate": round(self.buckets[endpoint].rate, 3),
+                    "calls": calls,
+                    "throttled": self.throttled.get(endpoint, 0),
+                    "total_wait_ms": to_ms(self.wait_time.get(endpoint, 0.0), 1),
+                    "max_wait_ms": to_ms(self.max_wait.get(endpoint, 0.0), 1)
+                }
+                for endpoint, calls in self.calls.items()
+            }
+
+
+class RateLimitedSmartApi:
+    """Wraps a SmartConnect session so every rate-limited endpoint call waits for its token"""
+    def __init__(self, smart_api, limiter):
+        self.smart_api = smart_api
+        self.limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self.smart_api, name)
+        if not callable(attr) or not self.limiter.is_limited(name):
+            return attr
+
+        @functools.wraps(attr)
+        def throttled(*args, **kwargs):
+            self.limiter.acquire(name)
+            return attr(*args, **kwargs)
+        return throttled
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Seconds during which an identical delivery of a signal counts as a retry
+DEFAULT_WINDOW = 120
+
+# Payload fields that do not identify a signal
+IGNORED_FIELDS = ["webhook_key"]
+
+
+def dedup_key(kind, payload):
+    """Explicit alert_id of a signal if the alert sends one, else a hash of its payload"""
+    alert_id = payload.get("alert_id")
+    if alert_id not in (None, ""):
+        return f"{kind}:alert:{alert_id}"
+
+    fields = {name: value for name, value in payload.items() if name not in IGNORED_FIELDS}
+    digest = hashlib.sha256(json.dumps(fields, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8'))
+    return f"{kind}:sha256:{digest.hexdigest()}"
+
+
+class SignalDedupIndex:
+    """
+    Keys of the signals received within the last window seconds, mapped to the
+    signal that claimed them first. Entries are kept in arrival order, so expired
+    ones are dropped from the front; max_size bounds memory during bursts.
+    """
+    def __init__(self, window=DEFAULT_WINDOW, max_size=10000):
+        self.window = window
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (signal_id, received_at)
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.checked = 0
+        self.duplicates = 0
+
+    def configure(self, window=None):
+        """Set how many seconds a delivered signal blocks identical ones"""
+        if window is not None:
+            self.window = float(window)
+
+    def _purge(self, now):
+        while self.entries:
+            key, (_, received_at) = next(iter(self.entries.items()))
+            if now - received_at <= self.window:
+                break
+            self.entries.popitem(last=False)
+
+    def claim(self, key, signal_id, received_at=None):
+        """
+        Record key for signal_id unless it was seen within the window.
+        Returns None for a new signal, or the ID of the signal that already claimed the key.
+        """
+        received_at = received_at or time.time()
+        with self.lock:
+            self.checked += 1
+            self._purge(received_at)
+
+            existing = self.entries.get(key)
+            if existing is not None and received_at - existing[1] <= self.window:
+                self.duplicates += 1
+                return existing[0]
+
+            self.entries.pop(key, None)
+            self.entries[key] = (signal_id, received_at)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+            return None
+
+    def release(self, key, signal_id):
+        """Forget a claim whose signal could not be queued"""
+        with self.lock:
+            if self.entries.get(key, (None,))[0] == signal_id:
+                del self.entries[key]
+
+    def restore(self, key, signal_id, received_at):
+        """Re-add a claim loaded from the signal journal if it is still within the window"""
+        if time.time() - received_at > self.window:
+            return
+        with self.lock:
+            self.entries.setdefault(key, (signal_id, received_at))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "window": self.window,
+                "size": len(self.entries),
+                "checked": self.checked,
+                "duplicates": self.duplicates
+            }
@@ -0,0 +1,340 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+
+from metrics import LatencyStat
+from signal_dedup import SignalDedupIndex, dedup_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = "signal_queue.jsonl"
+
+# Signals still queued after a restart are only processed if they are younger than this
+DEFAULT_REPLAY_MAX_AGE = 60
+
+FINAL_STATES = ["completed", "failed", "expired", "interrupted"]
+
+# Payload fields that are never written to the journal
+SECRET_FIELDS = ["webhook_key"]
+
+
+def lane_key(kind, payload):
+    """Signals for the same symbol share a lane and are processed in arrival order"""
+    return f"{kind}:{str(payload.get('symbol', '')).upper()}"
+
+
+class SignalQueue:
+    """
+    Durable queue between webhook intake and order placement. A webhook only
+    validates its payload and appends it to a local journal (one JSON line per
+    state change, fsynced, without the webhook secret) before it is answered.
+    A small pool of workers processes the signals and records each one's
+    per-account results. Every symbol is pinned to one worker, so signals for
+    the same symbol run in arrival order while a slow signal does not hold up
+    other symbols. Finished signals are compacted out of the journal every
+    compact_every appends and on startup. On restart, queued signals younger
+    than replay_max_age are processed and older ones expire; a signal that was
+    being processed is marked interrupted instead of placing its orders a second
+    time. Repeated deliveries of a signal within the dedup window are answered
+    with the first delivery's ID and never reach the handlers.
+    """
+    def __init__(self, journal_path=DEFAULT_JOURNAL_PATH, replay_max_age=DEFAULT_REPLAY_MAX_AGE, max_finished=1000,
+                 dedup=None, workers=4, compact_every=3000):
+        self.journal_path = journal_path
+        self.replay_max_age = replay_max_age
+        self.max_finished = max_finished  # Finished signals kept for status lookups
+        self.compact_every = compact_every  # Journal appends between compactions
+        self.handlers = {}  # kind -> handler(payload) -> (success, results)
+        self.dedup = dedup or SignalDedupIndex()
+        self.signals = {}   # signal_id -> record dict, in arrival order
+        self.lanes = [queue.Queue() for _ in range(workers)]  # One queue per worker
+        self.lock = threading.Lock()
+        self.journal_lock = threading.Lock()
+        self.appends = 0  # Journal appends since the last compaction
+        self.worker_threads = []
+        self.is_running = False
+        self.loaded = False
+
+        # Statistics
+        self.accepted = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.failed = 0
+        self.compactions = 0
+        self.queue_wait = LatencyStat()
+        self.run_time = LatencyStat()
+
+    def configure(self, journal_path=None, replay_max_age=None, dedup_window=None, workers=None):
+        """Set where the journal lives, how long replayed and repeated signals stay relevant and the worker count"""
+        if journal_path:
+            self.journal_path = journal_path
+        if replay_max_age is not None:
+            self.replay_max_age = float(replay_max_age)
+        if workers and not self.worker_threads:
+            self.lanes = [queue.Queue() for _ in range(max(int(workers), 1))]
+        self.dedup.configure(window=dedup_window)
+
+    def register(self, kind, handler):
+        """Handle signals of a kind with handler(payload) -> (success, results)"""
+        self.handlers[kind] = handler
+
+    def _append(self, record):
+        """Write the current state of a signal to the journal, compacting it every compact_every appends"""
+        with self.journal_lock:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            self.appends += 1
+            if self.appends >= self.compact_every:
+                try:
+                    with self.lock:
+                        records = {signal_id: dict(r) for signal_id, r in self.signals.items()}
+                    records.setdefault(record["signal_id"], record)  # A new signal is journaled before it is listed
+                    self._rewrite(list(records.values()))
+                except Exception as e:
+                    logger.error(f"Error compacting signal journal {self.journal_path}: {str(e)}")
+
+    def _rewrite(self, records):
+        """Replace the journal with one line per record; the caller holds journal_lock"""
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+        self.appends = 0
+        with self.lock:
+            self.compactions += 1
+        logger.debug(f"Compacted signal journal {self.journal_path} to {len(records)} signals")
+
+    def _lane(self, record):
+        return self.lanes[zlib.crc32(record["lane"].encode('utf-8')) % len(self.lanes)]
+
+    def submit(self, kind, payload):
+        """
+        Persist a signal and queue it for processing. Returns (signal_id, duplicate);
+        for a repeated delivery nothing is queued and signal_id is the first delivery's.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for {kind} signals")
+
+        payload = {name: value for name, value in payload.items() if name not in SECRET_FIELDS}
+        signal_id = uuid.uuid4().hex
+        received_at = time.time()
+        key = dedup_key(kind, payload)
+        original_id = self.dedup.claim(key, signal_id, received_at)
+        if original_id is not None:
+            with self.lock:
+                self.duplicates += 1
+            logger.info(f"Duplicate {kind} signal, already received as {original_id}")
+            return original_id, True
+
+        record = {
+            "signal_id": signal_id,
+            "kind": kind,
+            "status": "queued",
+            "payload": payload,
+            "dedup_key": key,
+            "lane": lane_key(kind, payload),
+            "received_at": received_at,
+            "started_at": None,
+            "finished_at": None,
+            "success": None,
+            "results": None,
+            "error": None
+        }
+        try:
+            self._append(record)
+        except Exception:
+            self.dedup.release(key, signal_id)
+            raise
+
+        with self.lock:
+            self.signals[signal_id] = record
+            self.accepted += 1
+        self._lane(record).put(signal_id)
+        return signal_id, False
+
+    def get(self, signal_id):
+        """Status and results of a signal without its payload, or None if unknown"""
+        with self.lock:
+            record = self.signals.get(signal_id)
+            if record is None:
+                return None
+            record = dict(record)
+
+        record.pop("payload", None)
+        for field in ("received_at", "started_at", "finished_at"):
+            if record[field]:
+                record[field] = datetime.fromtimestamp(record[field]).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        record["queue_position"] = self._position(record) if record["status"] == "queued" else None
+        return record
+
+    def _position(self, record):
+        """Position of a queued signal on its worker's lane"""
+        lane = self._lane(record)
+        with lane.mutex:
+            queued = list(lane.queue)
+        return queued.index(record["signal_id"]) + 1 if record["signal_id"] in queued else None
+
+    def _load(self):
+        """Replay the journal: resume queued signals, then rewrite it without old finished ones"""
+        if not os.path.exists(self.journal_path):
+            return
+
+        signals = {}
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping unreadable line in {self.journal_path}")
+                        continue
+                    signals.pop(record["signal_id"], None)  # The latest state of each signal wins
+                    signals[record["signal_id"]] = record
+        except Exception as e:
+            logger.error(f"Error loading signal journal {self.journal_path}: {str(e)}")
+            return
+
+        now = time.time()
+        resumed = []
+        for record in signals.values():
+            if record["status"] == "processing":
+                record.update(status="interrupted", finished_at=now,
+                              error="Server stopped while the signal was being processed")
+            elif record["status"] == "queued":
+                if now - record["received_at"] > self.replay_max_age:
+                    record.update(status="expired", finished_at=now,
+                                  error=f"Not processed within {self.replay_max_age}s of arrival")
+                else:
+                    resumed.append(record["signal_id"])
+
+        finished = [r for r in signals.values() if r["status"] in FINAL_STATES][-self.max_finished:]
+        kept = {r["signal_id"]: r for r in signals.values() if r["status"] not in FINAL_STATES}
+        kept.update({r["signal_id"]: r for r in finished})
+        signals = {signal_id: record for signal_id, record in signals.items() if signal_id in kept}
+
+        for record in signals.values():
+            record.setdefault("lane", lane_key(record["kind"], record.get("payload") or {}))
+            for name in SECRET_FIELDS:
+                (record.get("payload") or {}).pop(name, None)  # Journals written before secrets were stripped
+
+        with self.journal_lock:
+            self._rewrite(list(signals.values()))
+
+        # Deliveries received before the restart still count as seen
+        for record in sorted(signals.values(), key=lambda r: r["received_at"]):
+            if record.get("dedup_key"):
+                self.dedup.restore(record["dedup_key"], record["signal_id"], record["received_at"])
+
+        with self.lock:
+            signals.update(self.signals)
+            self.signals = signals
+        for signal_id in resumed:
+            self._lane(signals[signal_id]).put(signal_id)
+
+        logger.info(f"Loaded signal journal: {len(signals)} signals, {len(resumed)} resumed")
+
+    def start(self):
+        """Replay the journal and start one worker per lane"""
+        if any(thread.is_alive() for thread in self.worker_threads):
+            return False
+
+        if not self.loaded:
+            self._load()
+            self.loaded = True
+
+        self.is_running = True
+        self.worker_threads = [
+            threading.Thread(target=self._worker_loop, args=(lane,), name=f"signal-queue-{index}", daemon=True)
+            for index, lane in enumerate(self.lanes)
+        ]
+        for thread in self.worker_threads:
+            thread.start()
+        logger.info(f"Signal queue started with {len(self.worker_threads)} workers")
+        return True
+
+    def stop(self):
+        """Stop the workers after the signals they are processing"""
+        self.is_running = False
+
+    def _worker_loop(self, lane):
+        while self.is_running:
+            try:
+                signal_id = lane.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            try:
+                self._process(signal_id)
+            except Exception as e:
+                logger.error(f"Error in signal queue worker: {str(e)}")
+
+    def _process(self, signal_id):
+        with self.lock:
+            record = self.signals.get(signal_id)
+            if record is None or record["status"] != "queued":
+                return
+            record["status"] = "processing"
+            record["started_at"] = time.time()
+        self._append(record)
+
+        logger.info(f"Processing {record['kind']} signal {signal_id}")
+        try:
+            success, results = self.handlers[record["kind"]](dict(record["payload"]))
+            update = {"status": "completed" if success else "failed", "success": bool(success), "results": results}
+        except Exception as e:
+            logger.error(f"Error processing {record['kind']} signal {signal_id}: {str(e)}")
+            update = {"status": "failed", "success": False, "error": str(e)}
+
+        with self.lock:
+            record.update(update)
+            record["finished_at"] = time.time()
+            self.completed += record["success"]
+            self.failed += not record["success"]
+            self.queue_wait.record(record["started_at"] - record["received_at"])
+            self.run_time.record(record["finished_at"] - record["started_at"])
+
+            # Forget the oldest finished signals
+            finished = [key for key, r in self.signals.items() if r["status"] in FINAL_STATES]
+            for key in finished[:max(len(finished) - self.max_finished, 0)]:
+                del self.signals[key]
+        self._append(record)
+
+        logger.info(f"Signal {signal_id} {record['status']} in {record['finished_at'] - record['started_at']:.2f}s")
+
+    def stats(self):
+        """Queue depth and processing counters"""
+        with self.lock:
+            return {
+                "running": any(thread.is_alive() for thread in self.worker_threads),
+                "workers": len(self.lanes),
+                "queue_depth": sum(lane.qsize() for lane in self.lanes),
+                "lane_depths": [lane.qsize() for lane in self.lanes],
+                "accepted": self.accepted,
+                "duplicates": self.duplicates,
+                "completed": self.completed,
+                "failed": self.failed,
+                "compactions": self.compactions,
+                **self.queue_wait.as_dict("queue_wait"),
+                **self.run_time.as_dict("run"),
+                "dedup": self.dedup.stats()
+            }
+
+
+# Fed by the webhook endpoints
+signal_queue = SignalQueue()
@@ -0,0 +1,78 @@
+import logging
+import threading
+
+from metrics import ratio
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight call and the outcome its waiters share"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    The first caller for a key runs the function; callers arriving with the same
+    key while it is in flight wait for it and get the same result (or exception).
+    Nothing is cached once the call completes, later callers start a new call.
+    """
+    def __init__(self):
+        self.calls = {}  # key -> _Call
+        self.lock = threading.Lock()
+
+        # Statistics
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """Run fn() for key, or wait for the in-flight call with the same key"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            if call.waiters:
+                logger.debug(f"Shared result of {key} with {call.waiters} waiting callers")
+            call.done.set()
+
+    def stats(self):
+        """Executed and shared call counts"""
+        with self.lock:
+            return {
+                "executed": self.executed,
+                "shared": self.shared,
+                "in_flight": len(self.calls),
+                "shared_ratio": ratio(self.shared, self.executed + self.shared)
+            }
+
+
+# Shared by every module that calls market data endpoints
+market_data_flights = SingleFlight()
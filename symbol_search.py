@@ -0,0 +1,122 @@
+import heapq
+import logging
+import time
+from array import array
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Match quality, lower ranks first
+EXACT_SYMBOL = 0
+EXACT_NAME = 1
+PREFIX_SYMBOL = 2
+PREFIX_NAME = 3
+SUBSTRING = 4
+
+# Instrument types listed ahead of everything else on equal match quality
+PREFERRED_TYPES = {'AMXIDX': 0, 'Index': 0, 'OPTIDX': 1, 'FUTIDX': 1}
+
+DEFAULT_RESULT_LIMIT = 20
+
+
+def trigrams(text):
+    """Distinct trigrams of a normalized string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SymbolSearchIndex:
+    """
+    In-memory search over trading symbols and names.
+
+    Prefix lookups run against one sorted key array (a flattened trie: every key
+    sharing a prefix sits in one contiguous bisect range). Substring lookups
+    intersect trigram posting lists and verify the candidates. Results are ranked
+    by match quality, instrument type and symbol length.
+    """
+    def __init__(self, docs):
+        self.docs = docs  # List of result dicts, each with 'symbol' and 'name' keys
+        self.symbols = [str(doc.get('symbol', '')).upper() for doc in docs]
+        self.names = [str(doc.get('name', '')).upper() for doc in docs]
+        self.type_ranks = [PREFERRED_TYPES.get(doc.get('instrumenttype', doc.get('type')), 2) for doc in docs]
+
+        # Sorted (key, doc id) pairs for symbols and names
+        keys = [(symbol, i) for i, symbol in enumerate(self.symbols) if symbol]
+        keys += [(name, i) for i, name in enumerate(self.names) if name and name != self.symbols[i]]
+        keys.sort()
+        self.prefix_keys = [key for key, _ in keys]
+        self.prefix_ids = array('i', [i for _, i in keys])
+
+        # Trigram -> ascending doc ids
+        postings = {}
+        for i, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            for gram in trigrams(symbol) | trigrams(name):
+                postings.setdefault(gram, array('i')).append(i)
+        self.postings = postings
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build an index over the rows of a token DataFrame"""
+        start_time = time.time()
+        docs = [
+            {
+                "tradingsymbol": symbol,
+                "symbol": symbol,
+                "name": name,
+                "token": str(token),
+                "symboltoken": str(token),
+                "exchange": exch_seg,
+                "instrumenttype": instrumenttype
+            }
+            for symbol, name, token, exch_seg, instrumenttype in zip(
+                df['symbol'].tolist(), df['name'].tolist(), df['token'].tolist(),
+                df['exch_seg'].tolist(), df['instrumenttype'].tolist()
+            )
+        ]
+        index = cls(docs)
+        elapsed_ms = (time.time() - start_time) * 1000
+        logger.info(f"Built symbol search index over {len(docs)} instruments in {elapsed_ms:.1f}ms")
+        return index
+
+    def _prefix_matches(self, query):
+        start = bisect_left(self.prefix_keys, query)
+        end = bisect_left(self.prefix_keys, query + '\uffff', lo=start)
+        return {self.prefix_ids[i] for i in range(start, end)}
+
+    def _substring_matches(self, query):
+        grams = sorted(trigrams(query), key=lambda gram: len(self.postings.get(gram, ())))
+        if not grams or grams[0] not in self.postings:
+            return set()
+
+        candidates = set(self.postings[grams[0]])
+        for gram in grams[1:]:
+            candidates.intersection_update(self.postings[gram])
+            if not candidates:
+                return candidates
+
+        # Trigrams can match out of order, check the actual substring
+        return {i for i in candidates if query in self.symbols[i] or query in self.names[i]}
+
+    def _match_rank(self, i, query):
+        if self.symbols[i] == query:
+            return EXACT_SYMBOL
+        if self.names[i] == query:
+            return EXACT_NAME
+        if self.symbols[i].startswith(query):
+            return PREFIX_SYMBOL
+        if self.names[i].startswith(query):
+            return PREFIX_NAME
+        return SUBSTRING
+
+    def search(self, query, limit=DEFAULT_RESULT_LIMIT):
+        """Ranked documents whose symbol or name contains the query"""
+        query = (query or '').strip().upper()
+        if not query:
+            return []
+
+        matches = self._prefix_matches(query)
+        if len(query) >= 3:
+            matches |= self._substring_matches(query)
+
+        ranked = heapq.nsmallest(limit, matches, key=lambda i: (self._match_rank(i, query), self.type_ranks[i],
+                                                                len(self.symbols[i]), self.symbols[i]))
+        return [self.docs[i] for i in ranked]
@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from expiry_calendar import (MONTHLY, QUARTERLY, WEEKLY, ExpiryCalendar, classify_expiries,
+                             projected_weekly_expiries)
+
+
+class FakeIndex:
+    expiries = {
+        ("NIFTY", "NFO"): ["20OCT2026", "27OCT2026", "03NOV2026", "24NOV2026", "29DEC2026"],
+        ("RELIANCE", "NFO"): ["27OCT2026", "24NOV2026"]
+    }
+
+
+class ClassifyExpiriesTest(unittest.TestCase):
+    def test_last_expiry_of_a_month_is_monthly(self):
+        dates = [date(2026, 10, 20), date(2026, 10, 27), date(2026, 11, 3), date(2026, 11, 24), date(2026, 12, 29)]
+        self.assertEqual(classify_expiries(dates), [WEEKLY, MONTHLY, WEEKLY, MONTHLY, QUARTERLY])
+
+    def test_single_expiry_month(self):
+        self.assertEqual(classify_expiries([date(2026, 3, 31)]), [QUARTERLY])
+
+
+class ExpiryCalendarTest(unittest.TestCase):
+    def setUp(self):
+        self.calendar = ExpiryCalendar.build(FakeIndex())
+
+    def test_preferences_before_expiry(self):
+        now = datetime(2026, 10, 16, 10, 0)
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", None, now), "20OCT2026")
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "weekly", now), "20OCT2026")
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "Monthly", now), "27OCT2026")
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "quarterly", now), "29DEC2026")
+
+    def test_expiry_day_rolls_over_at_market_close(self):
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "nearest", datetime(2026, 10, 20, 15, 29)), "20OCT2026")
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "nearest", datetime(2026, 10, 20, 15, 30)), "27OCT2026")
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", "monthly", datetime(2026, 10, 28, 9, 15)), "24NOV2026")
+
+    def test_weekly_falls_back_to_nearest_for_stocks(self):
+        now = datetime(2026, 10, 16, 10, 0)
+        self.assertEqual(self.calendar.resolve("RELIANCE", "NFO", "weekly", now), "27OCT2026")
+
+    def test_explicit_date_is_normalized(self):
+        self.assertEqual(self.calendar.resolve("NIFTY", "NFO", " 3nov2026 "), "03NOV2026")
+
+    def test_unknown_underlying_or_preference(self):
+        now = datetime(2026, 10, 16, 10, 0)
+        self.assertIsNone(self.calendar.resolve("UNKNOWN", "NFO", "weekly", now))
+        self.assertIsNone(self.calendar.resolve("NIFTY", "NFO", "yearly", now))
+        self.assertIsNone(self.calendar.resolve("NIFTY", "NFO", "nearest", datetime(2027, 1, 1)))
+
+    def test_tagged(self):
+        self.assertEqual(self.calendar.get("RELIANCE", "NFO").tagged(),
+                         [{"expiry": "27OCT2026", "type": MONTHLY}, {"expiry": "24NOV2026", "type": MONTHLY}])
+
+
+class ProjectedExpiriesTest(unittest.TestCase):
+    def test_thursdays_from_the_next_one(self):
+        self.assertEqual(projected_weekly_expiries(2, datetime(2026, 10, 16, 10, 0)), ["22OCT2026", "29OCT2026"])
+
+    def test_expiry_thursday_after_close(self):
+        self.assertEqual(projected_weekly_expiries(1, datetime(2026, 10, 22, 10, 0)), ["22OCT2026"])
+        self.assertEqual(projected_weekly_expiries(1, datetime(2026, 10, 22, 16, 0)), ["29OCT2026"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from greeks import GreeksEngine, bs_price, chain_greeks, implied_volatility, norm_cdf, years_to_expiry
+
+SPOT = 22000.0
+YEARS = 30 / 365
+RATE = 0.065
+
+
+class NormCdfTest(unittest.TestCase):
+    def test_known_values(self):
+        np.testing.assert_allclose(norm_cdf([0.0, 1.0, -1.96]), [0.5, 0.8413447, 0.0249979], atol=1e-6)
+
+
+class YearsToExpiryTest(unittest.TestCase):
+    def test_counts_to_the_close_of_the_expiry_day(self):
+        expiry = datetime(2026, 10, 20)
+        self.assertAlmostEqual(years_to_expiry(expiry, datetime(2026, 10, 20, 15, 0)) * 365 * 24 * 60, 30)
+        self.assertEqual(years_to_expiry(expiry, datetime(2026, 10, 20, 15, 31)), 0.0)
+
+
+class ImpliedVolatilityTest(unittest.TestCase):
+    def test_recovers_the_pricing_volatility_across_strikes(self):
+        strikes = np.array([19000, 20500, 22000, 23500, 25000], dtype=np.float64)
+        sigma = np.array([0.28, 0.22, 0.15, 0.17, 0.24])
+        for is_call in (True, False):
+            flags = np.full(strikes.shape, is_call)
+            prices = bs_price(SPOT, strikes, YEARS, RATE, sigma, flags)
+            valid = prices - np.where(is_call, np.maximum(SPOT - strikes * np.exp(-RATE * YEARS), 0),
+                                      np.maximum(strikes * np.exp(-RATE * YEARS) - SPOT, 0)) >= 0.05
+
+            iv = implied_volatility(prices, SPOT, strikes, YEARS, RATE, flags)
+            np.testing.assert_allclose(iv[valid], sigma[valid], atol=1e-4)
+            self.assertTrue(np.isnan(iv[~valid]).all())
+
+    def test_prices_outside_the_bounds_give_nan(self):
+        strikes = np.array([21000, 22000, 22000], dtype=np.float64)
+        prices = np.array([500.0, 0.01, SPOT + 1])
+        iv = implied_volatility(prices, SPOT, strikes, YEARS, RATE, np.full(3, True))
+        self.assertTrue(np.isnan(iv).all())
+
+    def test_expired_contracts_give_nan(self):
+        iv = implied_volatility([100.0], SPOT, [22000.0], 0.0, RATE, np.array([True]))
+        self.assertTrue(np.isnan(iv).all())
+
+
+class ChainGreeksTest(unittest.TestCase):
+    def test_signs_and_put_call_delta(self):
+        strikes = np.array([21500, 22000, 22500], dtype=np.float64)
+        sigma = np.full(3, 0.18)
+        calls = chain_greeks(SPOT, strikes, YEARS, RATE, bs_price(SPOT, strikes, YEARS, RATE, sigma, True), 'CE')
+        puts = chain_greeks(SPOT, strikes, YEARS, RATE, bs_price(SPOT, strikes, YEARS, RATE, sigma, False), 'PE')
+
+        np.testing.assert_allclose(calls["iv"], 18.0, atol=1e-2)
+        np.testing.assert_allclose(calls["delta"] - puts["delta"], 1.0, atol=1e-4)
+        np.testing.assert_allclose(calls["gamma"], puts["gamma"], rtol=1e-3)
+        self.assertTrue((np.diff(calls["delta"]) < 0).all())
+        self.assertTrue((calls["theta"] < 0).all())
+        self.assertTrue((calls["vega"] > 0).all())
+
+
+class GreeksEngineTest(unittest.TestCase):
+    def test_same_batch_within_a_minute_is_cached(self):
+        engine = GreeksEngine(max_size=2)
+        expiry = datetime(2026, 10, 27)
+        strikes, prices = [22000.0], [300.0]
+
+        first = engine.compute(SPOT, strikes, expiry, prices, 'CE', now=datetime(2026, 10, 16, 10, 0, 5))
+        self.assertIs(engine.compute(SPOT, strikes, expiry, prices, 'CE', now=datetime(2026, 10, 16, 10, 0, 50)), first)
+        engine.compute(SPOT, strikes, expiry, prices, 'CE', now=datetime(2026, 10, 16, 10, 1, 0))
+        self.assertEqual((engine.stats()["hits"], engine.stats()["misses"]), (1, 2))
+
+        engine.configure(risk_free_rate="0.07")
+        self.assertEqual((engine.risk_free_rate, engine.stats()["size"]), (0.07, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import instrument_master
+from instrument_master import (IST, InstrumentMasterCache, InstrumentMasterRefresher, MasterColumnBuffers,
+                               SegmentFilter, iter_json_array, load_instrument_master, parse_master_file)
+
+RECORDS = [
+    {"token": "26000", "symbol": "Nifty 50", "name": "NIFTY", "expiry": "", "strike": "-1.000000",
+     "lotsize": "1", "instrumenttype": "AMXIDX", "exch_seg": "NSE", "tick_size": "0.000000"},
+    {"token": "3045", "symbol": "SBIN-EQ", "name": "SBIN", "expiry": "", "strike": "-1.000000",
+     "lotsize": "1", "instrumenttype": "", "exch_seg": "NSE", "tick_size": "5.000000"},
+    {"token": "99999", "symbol": "SBIN-BL", "name": "SBIN", "expiry": "", "strike": "-1.000000",
+     "lotsize": "1", "instrumenttype": "", "exch_seg": "NSE", "tick_size": "5.000000"},
+    {"token": "43210", "symbol": "NIFTY28OCT2622000CE", "name": "NIFTY", "expiry": "28OCT2026",
+     "strike": "2200000.000000", "lotsize": "75", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "43211", "symbol": "NIFTY28OCT2622000PE", "name": "NIFTY", "expiry": "28OCT2026",
+     "strike": "2200000.000000", "lotsize": "75", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "1234", "symbol": "GOLDM", "name": "GOLDM", "expiry": "05NOV2026", "strike": "0",
+     "lotsize": "1", "instrumenttype": "FUTCOM", "exch_seg": "MCX", "tick_size": "100.000000"}
+]
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def parse_master_file_from(raw, tmp_dir):
+    path = os.path.join(tmp_dir, "download.json")
+    with open(path, 'wb') as f:
+        f.write(raw)
+    return parse_master_file(path)
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def test_every_chunk_size_yields_the_same_records(self):
+        raw = json.dumps(RECORDS, indent=1).encode('utf-8')
+        for size in (1, 2, 7, 64, len(raw)):
+            self.assertEqual(list(iter_json_array(chunked(raw, size))), RECORDS, f"chunk size {size}")
+
+    def test_multibyte_characters_split_across_chunks(self):
+        records = [{"symbol": "₹ café"}, {"symbol": "ü"}]
+        raw = b"  \n" + json.dumps(records, ensure_ascii=False).encode('utf-8')
+        self.assertEqual(list(iter_json_array(chunked(raw, 1))), records)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array([b" [ ", b"]"])), [])
+
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"token": "1"}']))
+
+    def test_truncated_download(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[{"token": "1"}, {"tok']))
+
+
+class ParseMasterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "master.json")
+        with open(self.path, 'w') as f:
+            json.dump(RECORDS, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_segment_filter_keeps_indices_equities_and_derivatives(self):
+        df = parse_master_file(self.path, SegmentFilter(["NSE", "NFO"]))
+
+        self.assertEqual(df['symbol'].tolist(), ["Nifty 50", "SBIN-EQ", "NIFTY28OCT2622000CE", "NIFTY28OCT2622000PE"])
+        self.assertEqual(list(df.columns), instrument_master.MASTER_COLUMNS)
+        self.assertEqual(df['strike'].tolist(), [-1, -1, 2200000, 2200000])
+        self.assertEqual(df['expiry'].iloc[2], pd.Timestamp("2026-10-28"))
+        self.assertTrue(pd.isna(df['expiry'].iloc[0]))
+        self.assertIsInstance(df['exch_seg'].dtype, pd.CategoricalDtype)
+
+    def test_unparseable_and_oversized_records_are_skipped(self):
+        buffers = MasterColumnBuffers()
+        buffers.append({"token": "abc"})
+        buffers.append({"token": "4294967296"})
+        buffers.append({"token": "5", "strike": "inf"})
+        buffers.append({"token": "6", "strike": "100", "lotsize": "50"})
+
+        df = buffers.to_frame()
+        self.assertEqual(buffers.rows_skipped, 3)
+        self.assertEqual(df[['token', 'strike', 'lotsize']].values.tolist(), [[6, 100, 50]])
+
+
+class InstrumentMasterCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = InstrumentMasterCache(os.path.join(self.tmp_dir, "cache"))
+        self.raw = json.dumps(RECORDS).encode('utf-8')
+        self.content_hash = InstrumentMasterCache.compute_hash(self.raw)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _download(self, cache):
+        os.makedirs(cache.cache_dir, exist_ok=True)
+        with open(cache.download_path, 'wb') as f:
+            f.write(self.raw)
+        return InstrumentMasterCache.compute_hash(self.raw)
+
+    def test_trade_date_follows_the_publish_cutoff(self):
+        self.assertEqual(InstrumentMasterCache.current_trade_date(datetime(2026, 10, 16, 8, 29, tzinfo=IST)), "2026-10-15")
+        self.assertEqual(InstrumentMasterCache.current_trade_date(datetime(2026, 10, 16, 8, 30, tzinfo=IST)), "2026-10-16")
+
+    def test_round_trip(self):
+        df = parse_master_file_from(self.raw, self.tmp_dir)
+        self.assertTrue(self.cache.save(df, self.content_hash, "v1"))
+
+        loaded = self.cache.load()
+        # Copied out of the memory map, the columns compare like the parsed ones
+        pd.testing.assert_frame_equal(loaded.copy(deep=True), df, check_categorical=False)
+        self.assertTrue(self.cache.is_fresh("v1"))
+        self.assertFalse(self.cache.is_fresh("v2"))
+        self.assertTrue(self.cache.has_content(self.content_hash, "v1"))
+        self.assertFalse(self.cache.has_content("0" * 64, "v1"))
+
+    def test_missing_column_file_invalidates_the_cache(self):
+        self.cache.save(parse_master_file_from(self.raw, self.tmp_dir), self.content_hash)
+        os.remove(os.path.join(self.cache._content_dir(self.content_hash), "token.npy"))
+
+        self.assertIsNone(self.cache.read_manifest())
+        self.assertIsNone(self.cache.load())
+
+    def test_unchanged_download_keeps_the_cached_trade_date(self):
+        with mock.patch.object(instrument_master, 'download_master', self._download):
+            master = load_instrument_master(self.cache)
+            self.assertEqual(master.source, "download")
+
+            manifest = self.cache.read_manifest()
+            manifest["trade_date"] = "2000-01-01"
+            self.cache._write_manifest(manifest)
+
+            master = load_instrument_master(self.cache)
+            self.assertEqual(master.source, "cache")
+            self.assertEqual(master.trade_date, "2000-01-01")
+            self.assertEqual(self.cache.read_manifest()["trade_date"], "2000-01-01")
+
+            # Same content as the published master: nothing is published, the next check tries again
+            published = []
+            refresher = InstrumentMasterRefresher(self.cache, lambda: master, published.append)
+            self.assertTrue(refresher.needs_refresh())
+            self.assertFalse(refresher.refresh())
+            self.assertEqual(published, [])
+            self.assertTrue(refresher.needs_refresh())
+
+
+if __name__ == '__main__':
+    unittest.main()
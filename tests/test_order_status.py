@@ -0,0 +1,99 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from angel_websocket_manager import AngelOneWebSocketManager
+from options_trade_manager import OptionsTradeManager
+from order_status import OrderStatusRegistry, order_status_registry
+
+
+class FakeClient:
+    """Client whose order book shows one order, counting how often it is read"""
+    def __init__(self, client_id, order_id):
+        self.client_id = client_id
+        self.order_id = order_id
+        self.order_book_calls = 0
+
+    def orderBook(self):
+        self.order_book_calls += 1
+        return {"status": True, "data": [
+            {"orderid": self.order_id, "status": "complete", "averageprice": "101.5", "filledshares": "75"}
+        ]}
+
+
+def order_message(order_id, status, avg_price="0", filled="0"):
+    return json.dumps({
+        "order-status": "AB05" if status == "complete" else "AB01",
+        "orderData": {"orderid": order_id, "status": status, "averageprice": avg_price, "filledshares": filled}
+    })
+
+
+class OrderStatusRegistryTest(unittest.TestCase):
+    def test_update_before_wait_is_kept(self):
+        registry = OrderStatusRegistry()
+        registry.update({"orderData": {"orderid": "1", "status": "rejected"}})
+
+        self.assertEqual(registry.wait("1", timeout=0), ("rejected", 0.0, 0))
+
+    def test_status_code_without_status_text(self):
+        registry = OrderStatusRegistry()
+        registry.update({"order-status": "AB05", "orderData": {"orderid": "2", "averageprice": "10", "filledshares": "5"}})
+
+        self.assertEqual(registry.wait("2", timeout=0), ("complete", 10.0, 5))
+
+    def test_open_order_times_out(self):
+        registry = OrderStatusRegistry()
+        registry.update({"orderData": {"orderid": "3", "status": "open"}})
+
+        self.assertIsNone(registry.wait("3", timeout=0.01))
+        self.assertEqual(registry.stats()["timeouts"], 1)
+
+    def test_oldest_orders_are_dropped(self):
+        registry = OrderStatusRegistry(max_size=2)
+        for order_id in ("a", "b", "c"):
+            registry.update({"orderData": {"orderid": order_id, "status": "complete"}})
+
+        self.assertEqual(list(registry.orders), ["b", "c"])
+
+
+class FillConfirmationTest(unittest.TestCase):
+    def setUp(self):
+        self.ws = AngelOneWebSocketManager()
+        self.ws.client_code = "A1"
+        self.ws.order_connected = True
+        self.trade_manager = OptionsTradeManager()
+        self.trade_manager.websocket_manager = self.ws
+
+    def test_fill_from_order_update_stream(self):
+        client = FakeClient("A1", "order-stream-1")
+
+        def deliver():
+            time.sleep(0.05)
+            self.ws._on_order_message(None, order_message("order-stream-1", "open"))
+            self.ws._on_order_message(None, order_message("order-stream-1", "complete", "101.5", "75"))
+
+        threading.Thread(target=deliver).start()
+        started_at = time.perf_counter()
+        result = self.trade_manager.verify_order_execution(client, "order-stream-1", delay=1)
+
+        self.assertEqual(result, (True, "complete", 101.5, 75))
+        self.assertEqual(client.order_book_calls, 0)
+        self.assertLess(time.perf_counter() - started_at, 1)
+        self.assertIsNotNone(order_status_registry.wait("order-stream-1", timeout=0))
+
+    def test_other_accounts_poll_the_order_book(self):
+        client = FakeClient("B2", "order-book-1")
+
+        result = self.trade_manager.verify_order_execution(client, "order-book-1", delay=0)
+
+        self.assertEqual(result, (True, "complete", 101.5, 75))
+        self.assertEqual(client.order_book_calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
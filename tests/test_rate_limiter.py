@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rate_limiter
+from rate_limiter import AccountRateLimiter, RateLimitedSmartApi, TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_callers_queue_up_behind_each_other(self):
+        bucket = TokenBucket(rate=2)
+        bucket.updated = 100.0
+
+        self.assertEqual(bucket.reserve(100.0), 0.0)
+        self.assertAlmostEqual(bucket.reserve(100.0), 0.5)
+        self.assertAlmostEqual(bucket.reserve(100.0), 1.0)
+        self.assertAlmostEqual(bucket.delay(100.0), 1.5)
+
+    def test_refill_is_capped_at_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        bucket.updated = 100.0
+
+        # A long idle spell only banks two tokens
+        self.assertEqual([bucket.reserve(200.0) for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(200.0), 0.1)
+        self.assertEqual(bucket.delay(200.25), 0.0)
+
+
+class AccountRateLimiterTest(unittest.TestCase):
+    def test_tightest_limit_sets_the_rate(self):
+        limiter = AccountRateLimiter("A1", {"placeOrder": {"per_second": 20, "per_minute": 500},
+                                            "orderBook": {"per_second": 1}})
+        self.assertAlmostEqual(limiter.buckets["placeOrder"].rate, 500 / 60)
+        self.assertEqual(limiter.buckets["orderBook"].rate, 1)
+        self.assertFalse(limiter.is_limited("logout"))
+        self.assertEqual(limiter.acquire("logout"), 0.0)
+
+    def test_acquire_sleeps_for_its_token_and_counts_it(self):
+        limiter = AccountRateLimiter("A1", {"orderBook": {"per_second": 1}})
+        with mock.patch.object(rate_limiter.time, 'monotonic', return_value=limiter.buckets["orderBook"].updated), \
+                mock.patch.object(rate_limiter.time, 'sleep') as sleep:
+            self.assertEqual(limiter.acquire("orderBook"), 0.0)
+            self.assertAlmostEqual(limiter.acquire("orderBook"), 1.0)
+            sleep.assert_called_once()
+
+        stats = limiter.stats()["orderBook"]
+        self.assertEqual((stats["calls"], stats["throttled"], stats["max_wait_ms"]), (2, 1, 1000.0))
+
+
+class RateLimitedSmartApiTest(unittest.TestCase):
+    def test_only_limited_endpoints_are_throttled(self):
+        smart_api = mock.Mock()
+        limiter = mock.Mock()
+        limiter.is_limited.side_effect = lambda name: name == "orderBook"
+        api = RateLimitedSmartApi(smart_api, limiter)
+
+        api.orderBook()
+        api.logout()
+
+        limiter.acquire.assert_called_once_with("orderBook")
+        smart_api.orderBook.assert_called_once_with()
+        smart_api.logout.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from signal_dedup import SignalDedupIndex, dedup_key
+from signal_queue import SignalQueue
+
+
+class DedupKeyTest(unittest.TestCase):
+    def test_alert_id_identifies_the_signal(self):
+        self.assertEqual(dedup_key("options", {"alert_id": "a1", "symbol": "NIFTY"}), "options:alert:a1")
+        self.assertEqual(dedup_key("options", {"alert_id": 7}), "options:alert:7")
+        self.assertEqual(dedup_key("options", {"alert_id": "a1", "symbol": "NIFTY"}),
+                         dedup_key("options", {"alert_id": "a1", "symbol": "BANKNIFTY"}))
+
+    def test_payload_hash_ignores_field_order_and_secret(self):
+        first = dedup_key("equity", {"symbol": "SBIN-EQ", "action": "BUY", "webhook_key": "one"})
+        second = dedup_key("equity", {"action": "BUY", "symbol": "SBIN-EQ", "webhook_key": "two"})
+
+        self.assertTrue(first.startswith("equity:sha256:"))
+        self.assertEqual(first, second)
+
+    def test_empty_alert_id_falls_back_to_payload_hash(self):
+        self.assertTrue(dedup_key("equity", {"alert_id": "", "symbol": "SBIN-EQ"}).startswith("equity:sha256:"))
+
+    def test_different_payloads_or_kinds_differ(self):
+        payload = {"symbol": "SBIN-EQ", "action": "BUY"}
+        self.assertNotEqual(dedup_key("equity", payload), dedup_key("equity", dict(payload, action="SELL")))
+        self.assertNotEqual(dedup_key("equity", payload), dedup_key("options", payload))
+
+
+class SignalDedupIndexTest(unittest.TestCase):
+    def test_repeat_within_window_returns_first_signal(self):
+        index = SignalDedupIndex(window=120)
+
+        self.assertIsNone(index.claim("k", "first", received_at=1000))
+        self.assertEqual(index.claim("k", "second", received_at=1120), "first")
+        self.assertEqual(index.stats()["duplicates"], 1)
+
+    def test_repeat_after_window_is_a_new_signal(self):
+        index = SignalDedupIndex(window=120)
+        index.claim("k", "first", received_at=1000)
+
+        self.assertIsNone(index.claim("k", "second", received_at=1121))
+        self.assertEqual(index.claim("k", "third", received_at=1200), "second")
+
+    def test_expired_entries_are_purged(self):
+        index = SignalDedupIndex(window=10)
+        index.claim("a", "1", received_at=1000)
+        index.claim("b", "2", received_at=1005)
+        index.claim("c", "3", received_at=1012)
+
+        self.assertEqual(list(index.entries), ["b", "c"])
+
+    def test_size_bound(self):
+        index = SignalDedupIndex(window=120, max_size=2)
+        for i, key in enumerate("abc"):
+            index.claim(key, str(i), received_at=1000 + i)
+
+        self.assertEqual(list(index.entries), ["b", "c"])
+        self.assertIsNone(index.claim("a", "again", received_at=1004))
+
+    def test_release_only_drops_own_claim(self):
+        index = SignalDedupIndex()
+        index.claim("k", "first", received_at=1000)
+
+        index.release("k", "other")
+        self.assertEqual(index.claim("k", "second", received_at=1001), "first")
+        index.release("k", "first")
+        self.assertIsNone(index.claim("k", "third", received_at=1002))
+
+    def test_restore_skips_claims_outside_the_window(self):
+        index = SignalDedupIndex(window=120)
+        index.restore("old", "1", received_at=0)
+        index.restore("recent", "2", received_at=time.time() - 1)
+
+        self.assertEqual(list(index.entries), ["recent"])
+
+    def test_configure_window(self):
+        index = SignalDedupIndex(window=120)
+        index.configure(window="30")
+        index.configure(window=None)
+
+        self.assertEqual(index.window, 30.0)
+
+
+class QueueDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.signal_queue = SignalQueue(journal_path=os.path.join(self.tmp_dir, "signal_queue.jsonl"))
+        self.signal_queue.register("options", lambda payload: (True, []))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_retried_delivery_is_answered_with_the_first_signal(self):
+        payload = {"symbol": "NIFTY", "option_type": "CE", "webhook_key": "secret"}
+        signal_id, duplicate = self.signal_queue.submit("options", payload)
+
+        self.assertFalse(duplicate)
+        self.assertEqual(self.signal_queue.submit("options", dict(payload)), (signal_id, True))
+        self.assertEqual(self.signal_queue.submit("options", {"alert_id": "x", **payload})[1], False)
+        self.assertEqual(self.signal_queue.submit("options", {"alert_id": "x", "symbol": "BANKNIFTY"})[1], True)
+
+        stats = self.signal_queue.stats()
+        self.assertEqual((stats["accepted"], stats["duplicates"], stats["queue_depth"]), (2, 2, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
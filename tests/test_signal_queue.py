@@ -0,0 +1,174 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from signal_queue import SignalQueue, lane_key
+
+
+def journal_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def journal_record(signal_id, status, age, **fields):
+    record = {"signal_id": signal_id, "kind": "equity", "status": status, "payload": {"symbol": "SBIN-EQ"},
+              "dedup_key": f"equity:alert:{signal_id}", "received_at": time.time() - age, "started_at": None,
+              "finished_at": None, "success": None, "results": None, "error": None}
+    record.update(fields)
+    return record
+
+
+class SignalQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "signal_queue.jsonl")
+        self.queues = []
+
+    def tearDown(self):
+        for signal_queue in self.queues:
+            signal_queue.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def make_queue(self, handler, **kwargs):
+        signal_queue = SignalQueue(journal_path=self.path, **kwargs)
+        signal_queue.register("equity", handler)
+        self.queues.append(signal_queue)
+        return signal_queue
+
+    def wait_for(self, signal_queue, signal_ids, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if all(signal_queue.get(signal_id)["status"] not in ("queued", "processing") for signal_id in signal_ids):
+                return
+            time.sleep(0.01)
+        self.fail(f"Signals not finished within {timeout}s")
+
+    def test_submit_journals_before_processing_without_the_secret(self):
+        signal_queue = self.make_queue(lambda payload: (True, [payload]))
+        signal_id, duplicate = signal_queue.submit("equity", {"symbol": "SBIN-EQ", "webhook_key": "secret"})
+
+        self.assertFalse(duplicate)
+        self.assertEqual([(r["signal_id"], r["status"]) for r in journal_lines(self.path)], [(signal_id, "queued")])
+        self.assertNotIn("secret", open(self.path).read())
+        self.assertEqual(signal_queue.get(signal_id)["queue_position"], 1)
+
+        signal_queue.start()
+        self.wait_for(signal_queue, [signal_id])
+        record = signal_queue.get(signal_id)
+        self.assertEqual(record["status"], "completed")
+        self.assertEqual(record["results"], [{"symbol": "SBIN-EQ"}])
+        self.assertEqual([r["status"] for r in journal_lines(self.path)], ["queued", "processing", "completed"])
+
+    def test_unknown_kind_is_rejected(self):
+        signal_queue = self.make_queue(lambda payload: (True, []))
+        with self.assertRaises(ValueError):
+            signal_queue.submit("futures", {"symbol": "SBIN-EQ"})
+
+    def test_handler_failure_is_recorded(self):
+        def handler(payload):
+            raise RuntimeError("broker down")
+
+        signal_queue = self.make_queue(handler)
+        signal_queue.start()
+        signal_id, _ = signal_queue.submit("equity", {"symbol": "SBIN-EQ"})
+        self.wait_for(signal_queue, [signal_id])
+
+        record = signal_queue.get(signal_id)
+        self.assertEqual((record["status"], record["success"], record["error"]), ("failed", False, "broker down"))
+        self.assertEqual(signal_queue.stats()["failed"], 1)
+
+    def test_replay_resumes_expires_and_interrupts(self):
+        with open(self.path, 'w') as f:
+            for record in [journal_record("fresh", "queued", 5), journal_record("old", "queued", 600),
+                           journal_record("cut", "queued", 3), journal_record("cut", "processing", 3),
+                           journal_record("done", "completed", 30, success=True, results=[])]:
+                f.write(json.dumps(record) + "\n")
+            f.write("{not json\n")
+
+        processed = []
+        signal_queue = self.make_queue(lambda payload: (processed.append(payload) or True, []), replay_max_age=60)
+        signal_queue.start()
+        self.wait_for(signal_queue, ["fresh"])
+
+        self.assertEqual(signal_queue.get("fresh")["status"], "completed")
+        self.assertEqual(signal_queue.get("old")["status"], "expired")
+        self.assertEqual(signal_queue.get("cut")["status"], "interrupted")
+        self.assertEqual(signal_queue.get("done")["status"], "completed")
+        self.assertEqual(len(processed), 1)
+
+        # The journal was rewritten with one line per signal before the resumed one ran
+        self.assertEqual([r["signal_id"] for r in journal_lines(self.path)],
+                         ["fresh", "old", "cut", "done", "fresh", "fresh"])
+
+        # Deliveries from before the restart still count as seen
+        self.assertEqual(signal_queue.submit("equity", {"alert_id": "done"}), ("done", True))
+
+    def test_replay_drops_the_oldest_finished_signals(self):
+        with open(self.path, 'w') as f:
+            for i in range(5):
+                f.write(json.dumps(journal_record(f"s{i}", "completed", 50 - i)) + "\n")
+
+        signal_queue = self.make_queue(lambda payload: (True, []), max_finished=2)
+        signal_queue.start()
+
+        self.assertEqual([r["signal_id"] for r in journal_lines(self.path)], ["s3", "s4"])
+        self.assertIsNone(signal_queue.get("s0"))
+
+    def test_periodic_compaction(self):
+        signal_queue = self.make_queue(lambda payload: (True, []), max_finished=2, compact_every=6)
+        signal_queue.start()
+        signal_ids = []
+        for i in range(4):
+            signal_id, _ = signal_queue.submit("equity", {"symbol": "SBIN-EQ", "n": i})
+            signal_ids.append(signal_id)
+            self.wait_for(signal_queue, [signal_id])
+
+        self.assertEqual(signal_queue.stats()["compactions"], 2)  # On start and after six appends
+        lines = journal_lines(self.path)
+        self.assertLess(len(lines), 12)
+        self.assertNotIn(signal_ids[0], [r["signal_id"] for r in lines])
+
+        # A restart from the compacted journal knows the latest state of the kept signals
+        restarted = self.make_queue(lambda payload: (True, []), max_finished=2)
+        restarted.start()
+        self.assertEqual(restarted.get(signal_ids[-1])["status"], "completed")
+
+    def test_same_symbol_runs_in_order_while_other_symbols_proceed(self):
+        events = []
+        release_slow = threading.Event()
+
+        def handler(payload):
+            events.append(("start", payload["symbol"], payload["n"]))
+            if payload["symbol"] == "SLOW" and payload["n"] == 0:
+                release_slow.wait(5)
+            events.append(("end", payload["symbol"], payload["n"]))
+            return True, []
+
+        signal_queue = self.make_queue(handler, workers=4)
+        self.assertNotEqual(signal_queue._lane({"lane": lane_key("equity", {"symbol": "SLOW"})}),
+                            signal_queue._lane({"lane": lane_key("equity", {"symbol": "FAST"})}))
+        signal_queue.start()
+
+        slow_ids = [signal_queue.submit("equity", {"symbol": "SLOW", "n": n})[0] for n in range(2)]
+        fast_ids = [signal_queue.submit("equity", {"symbol": "FAST", "n": n})[0] for n in range(2)]
+        self.wait_for(signal_queue, fast_ids)
+
+        # FAST finished while the first SLOW signal was still running and the second waited behind it
+        self.assertEqual(signal_queue.get(slow_ids[0])["status"], "processing")
+        self.assertEqual(signal_queue.get(slow_ids[1])["status"], "queued")
+
+        release_slow.set()
+        self.wait_for(signal_queue, slow_ids)
+        slow_events = [event for event in events if event[1] == "SLOW"]
+        self.assertEqual(slow_events, [("start", "SLOW", 0), ("end", "SLOW", 0), ("start", "SLOW", 1), ("end", "SLOW", 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
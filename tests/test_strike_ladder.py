@@ -0,0 +1,114 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from instrument_index import InstrumentIndex, OptionChainSlice, StrikeLadder, nearest_position
+from instrument_master import MasterColumnBuffers
+
+
+def ladder(*strikes):
+    return StrikeLadder(np.array([int(strike * 100) for strike in strikes], dtype=np.int32))
+
+
+class StrikeLadderTest(unittest.TestCase):
+    def setUp(self):
+        # 50-point strikes with one 100-point gap at the far end
+        self.ladder = ladder(21800, 21850, 21900, 21950, 22000, 22050, 22100, 22200)
+
+    def test_modal_step(self):
+        self.assertEqual(self.ladder.step, 50)
+        self.assertEqual(ladder(100).step, 0)
+
+    def test_atm_is_nearest_listed_strike(self):
+        self.assertEqual(self.ladder.atm(21962), 21950)
+        self.assertEqual(self.ladder.atm(21980), 22000)
+        self.assertEqual(self.ladder.atm(10000), 21800)
+        self.assertEqual(self.ladder.atm(30000), 22200)
+
+    def test_atm_tie_goes_to_lower_strike(self):
+        self.assertEqual(self.ladder.atm(21975), 21950)
+
+    def test_itm_and_otm_per_option_type(self):
+        self.assertEqual(self.ladder.select(21960, 'ITM', 2, 'CE'), 21850)
+        self.assertEqual(self.ladder.select(21960, 'ITM', 2, 'PE'), 22050)
+        self.assertEqual(self.ladder.select(21960, 'OTM', 1, 'CE'), 22000)
+        self.assertEqual(self.ladder.select(21960, 'OTM', 1, 'PE'), 21900)
+        self.assertEqual(self.ladder.select(21960, None, 3, 'CE'), 21950)
+
+    def test_selection_stops_at_the_listed_range(self):
+        self.assertEqual(self.ladder.otm(22150, 5, 'CE'), 22200)
+        self.assertEqual(self.ladder.itm(21810, 5, 'CE'), 21800)
+
+    def test_window_around_atm(self):
+        self.assertEqual(self.ladder.window(21960, 1), [21900.0, 21950.0, 22000.0])
+        self.assertEqual(self.ladder.window(21790, 2), [21800.0, 21850.0, 21900.0])
+
+    def test_empty_ladder(self):
+        empty = StrikeLadder(np.array([], dtype=np.int32))
+        self.assertIsNone(empty.atm(100))
+        self.assertIsNone(empty.otm(100, 1, 'CE'))
+        self.assertEqual(empty.window(100, 2), [])
+        self.assertEqual(nearest_position(empty.strikes_paise, 100), -1)
+
+
+class OptionChainSliceTest(unittest.TestCase):
+    def setUp(self):
+        strikes = np.array([2150050, 2200000, 2250000], dtype=np.int32)
+        self.chain = OptionChainSlice(strikes, np.array([11, 12, 13], dtype=np.int32),
+                                      ["A", "B", "C"], np.array([75, 75, 75], dtype=np.int32))
+
+    def test_find_exact_strike_only(self):
+        self.assertEqual(self.chain.find(22000), 1)
+        self.assertEqual(self.chain.find(21500.5), 0)
+        self.assertEqual(self.chain.find(22100), -1)
+
+    def test_positions_of_listed_strikes(self):
+        self.assertEqual(self.chain.positions([22500, 21000, 22000, 22000]).tolist(), [1, 2])
+
+    def test_row(self):
+        self.assertEqual(self.chain.row(2), {'symbol': 'C', 'token': '13', 'strike': 22500.0, 'lotsize': 75})
+
+
+class IndexLadderTest(unittest.TestCase):
+    def setUp(self):
+        records = [{"token": "26000", "symbol": "Nifty 50", "name": "NIFTY", "expiry": "", "strike": "-1",
+                    "lotsize": "1", "instrumenttype": "AMXIDX", "exch_seg": "NSE", "tick_size": "0"}]
+        token = 40000
+        # Out of order, puts missing one strike and a stray 25-point call strike
+        for strike, option_types in [(22100, "CE PE"), (21900, "CE PE"), (22000, "CE PE"), (22050, "CE"),
+                                     (21950, "CE PE"), (21925, "CE")]:
+            for option_type in option_types.split():
+                token += 1
+                records.append({"token": str(token), "symbol": f"NIFTY28OCT26{strike}{option_type}", "name": "NIFTY",
+                                "expiry": "28OCT2026", "strike": f"{strike * 100}.000000", "lotsize": "75",
+                                "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"})
+        buffers = MasterColumnBuffers()
+        for record in records:
+            buffers.append(record)
+        self.index = InstrumentIndex.build(buffers.to_frame())
+
+    def test_ladder_combines_calls_and_puts(self):
+        ladder = self.index.get_ladder("NIFTY", "NFO", "28oct2026")
+        self.assertEqual(ladder.strikes.tolist(), [21900, 21925, 21950, 22000, 22050, 22100])
+        self.assertEqual(ladder.step, 50)
+
+    def test_selection_from_the_index(self):
+        ladder = self.index.get_ladder("NIFTY", "NFO", "28OCT2026")
+        self.assertEqual(ladder.select(22010, "ATM", 0, "CE"), 22000)
+        self.assertEqual(ladder.select(22010, "OTM", 1, "CE"), 22050)
+        self.assertEqual(ladder.select(22010, "ITM", 2, "CE"), 21925)
+
+    def test_chain_slices_per_option_type(self):
+        puts = self.index.get_chain("NIFTY", "NFO", "28OCT2026", "PE")
+        self.assertEqual(puts.strikes.tolist(), [21900, 21950, 22000, 22100])
+        self.assertIsNone(self.index.get_chain("NIFTY", "NFO", "bad", "PE"))
+        self.assertEqual(self.index.get_expiries("NIFTY", "NFO"), ["28OCT2026"])
+        self.assertEqual(self.index.get_token("NIFTY", "NSE"), "26000")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,14 @@ import os
 import time
 import logging
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import uuid
 
 # Import WebSocket manager
 from angel_websocket_manager import websocket_manager, get_exchange_type_id, get_exchange_name
+from price_store import price_store, SOURCE_WS
+from price_resolver import price_resolver
+from client_pool import market_data_pool
 
 # Set up logging
 logging.basicConfig(
@@ -54,10 +57,6 @@ class TradeMonitorService:
         self.websocket_manager = None
         self.using_websocket = False
         self.fallback_to_polling = True
-        
-        # Market data cache (token -> price)
-        self.price_cache = {}
-        self.price_cache_ttl = 5  # Cache TTL in seconds
     
     def initialize(self, clients, price_fetcher=None, websocket_manager=None):
         """Initialize the monitor service with client connections and price fetcher"""
@@ -252,9 +251,6 @@ class TradeMonitorService:
         if not self.active_trades or not self.clients:
             return
         
-        # Get first available client for price checks
-        check_client = next(iter(self.clients.values()))
-        
         # Group trades by underlying symbol for efficient monitoring
         trades_by_underlying = {}
         for trade_key, trade in list(self.active_trades.items()):
@@ -267,6 +263,12 @@ class TradeMonitorService:
         # Monitor each underlying asset
         for underlying, trades in trades_by_underlying.items():
             try:
+                # Spread the price reads across all logged-in accounts
+                check_client = market_data_pool.get_client()
+                if not check_client:
+                    logger.warning("No active clients available for price checks")
+                    break
+                
                 # Get current price of underlying
                 current_price = self.price_fetcher.get_underlying_price(
                     check_client, 
@@ -304,31 +306,14 @@ class TradeMonitorService:
             # Get underlying details
             underlying = trade.get("underlying_symbol")
             
-            # If current price wasn't provided, fetch it or check cache
+            # If current price wasn't provided, fetch it (reads through the shared price store)
             if current_price is None:
-                # Look in price cache first
-                cache_key = f"{trade.get('underlying_exchange', 'NSE')}:{underlying}"
-                
-                if cache_key in self.price_cache:
-                    cache_entry = self.price_cache[cache_key]
-                    if time.time() - cache_entry['timestamp'] < self.price_cache_ttl:
-                        current_price = cache_entry['price']
-                        logger.debug(f"Using cached price for {underlying}: {current_price}")
+                exchange = trade.get("underlying_exchange", "NSE")
+                current_price = self.price_fetcher.get_underlying_price(client, underlying, exchange)
                 
-                # If not in cache, fetch from price fetcher
                 if current_price is None:
-                    exchange = trade.get("underlying_exchange", "NSE")
-                    current_price = self.price_fetcher.get_underlying_price(client, underlying, exchange)
-                    
-                    if current_price is None:
-                        logger.warning(f"Failed to get current price for {underlying}")
-                        return False
-                    
-                    # Update cache
-                    self.price_cache[cache_key] = {
-                        'price': current_price,
-                        'timestamp': time.time()
-                    }
+                    logger.warning(f"Failed to get current price for {underlying}")
+                    return False
             
             # Get price thresholds
             stop_loss = trade["underlying_stop_loss"]
@@ -536,34 +521,8 @@ class TradeMonitorService:
     def get_option_price(self, client, symbol, token):
         """Get current price of an option"""
         try:
-            # Check cache first
-            cache_key = f"NFO:{symbol}"
-            if cache_key in self.price_cache:
-                cache_entry = self.price_cache[cache_key]
-                if time.time() - cache_entry['timestamp'] < self.price_cache_ttl:
-                    return cache_entry['price']
-            
-            # If not in cache, fetch from broker
-            # Handle different client structures
-            try:
-                response = client.smart_api.ltpData("NFO", symbol, token)
-            except AttributeError:
-                # Try direct access if smart_api access fails
-                response = client.ltpData("NFO", symbol, token)
-                
-            if response.get('status'):
-                price = float(response['data']['ltp'])
-                
-                # Update cache
-                self.price_cache[cache_key] = {
-                    'price': price,
-                    'timestamp': time.time()
-                }
-                
-                return price
-            else:
-                logger.error(f"Failed to get LTP for {symbol}: {response.get('message')}")
-                return None
+            # Live WebSocket tick first, then a recent REST price, then ltpData
+            return price_resolver.resolve_ltp(client, "NFO", symbol, token)
         except Exception as e:
             logger.error(f"Error getting option price for {symbol}: {str(e)}")
             return None
@@ -928,12 +887,8 @@ class TradeMonitorService:
         # Map exchange type back to exchange name
         exchange = get_exchange_name(exchange_type)
         
-        # Update price cache
-        cache_key = f"{exchange}:{token}"
-        self.price_cache[cache_key] = {
-            'price': ltp,
-            'timestamp': time.time()
-        }
+        # Update the shared price store
+        price_store.put(exchange, token, ltp, SOURCE_WS)
         
         # Find trades that use this underlying for monitoring
         for trade_key, trade in list(self.active_trades.items()):
@@ -1061,6 +1016,14 @@ class TradeMonitorService:
                 
             if token not in tokens_by_exchange[exchange_type]:
                 tokens_by_exchange[exchange_type].append(token)
+            
+            # Stream the option itself too, so P&L reads are served from live ticks
+            option_exchange_type = get_exchange_type_id(trade.get("exchange", "NFO"))
+            option_token = trade.get("token")
+            if option_exchange_type and option_token:
+                option_tokens = tokens_by_exchange.setdefault(option_exchange_type, [])
+                if option_token not in option_tokens:
+                    option_tokens.append(option_token)
         
         # Prepare token list for subscription
         for exchange_type, tokens in tokens_by_exchange.items():
@@ -1072,7 +1035,7 @@ class TradeMonitorService:
         # Subscribe if we have tokens
         if token_list:
             token_count = sum(len(exchange["tokens"]) for exchange in token_list)
-            logger.info(f"Subscribing to {token_count} underlying tokens for active trades")
+            logger.info(f"Subscribing to {token_count} underlying and option tokens for active trades")
             self.websocket_manager.subscribe_market_data(token_list, mode=1)  # LTP mode
         
     def _unsubscribe_trade(self, trade):
@@ -1080,6 +1043,15 @@ class TradeMonitorService:
         if not self.websocket_manager or not self.websocket_manager.stream_connected:
             return
             
+        # Stop streaming the option unless another active trade holds it
+        option_exchange_type = get_exchange_type_id(trade.get("exchange", "NFO"))
+        option_token = trade.get("token")
+        if option_exchange_type and option_token and not any(
+                other_trade.get("token") == option_token and other_trade != trade
+                for other_trade in self.active_trades.values()):
+            self.websocket_manager.unsubscribe_market_data(
+                [{"exchangeType": option_exchange_type, "tokens": [option_token]}], mode=1)
+        
         underlying_symbol = trade.get("underlying_symbol")
         exchange_name = trade.get("underlying_exchange", "NSE")
         